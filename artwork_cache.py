@@ -0,0 +1,138 @@
+"""
+Persistent cache of Telegram file_ids for Pokemon artwork.
+
+The first successful send of an image by URL makes Telegram download it from
+GitHub. The file_id from that response is stored per species and reused for
+every later send, which Telegram serves from its own storage.
+"""
+
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from telegram.error import BadRequest, RetryAfter
+
+from json_store import data_path, load_json, save_json
+from pokemon_api import get_all_pokemon, get_official_artwork_url, get_pokedex_id_from_url
+
+logger = logging.getLogger(__name__)
+
+ARTWORK_CACHE_FILE = data_path("artwork_file_ids.json")
+
+# Pause between uploads while pre-warming the cache (seconds)
+WARM_UP_DELAY = 1.0
+
+# Формат: {species: {"url": image_url, "file_id": telegram_file_id}}
+_file_ids: Optional[Dict[str, Dict[str, str]]] = None
+
+def _get_cache() -> Dict[str, Dict[str, str]]:
+    """Load the cache from disk on first use."""
+    global _file_ids
+    if _file_ids is None:
+        _file_ids = load_json(ARTWORK_CACHE_FILE, {})
+    return _file_ids
+
+def _species_key(species: str) -> str:
+    return species.strip().lower()
+
+def get_file_id(species: str, image_url: Optional[str] = None) -> Optional[str]:
+    """Get the cached file_id for a species.
+
+    If an image URL is given, the cached entry is only used when it was made
+    from the same URL (custom Pokemon may share a name with a real species).
+    """
+    entry = _get_cache().get(_species_key(species))
+    if not entry:
+        return None
+    if image_url and entry.get("url") != image_url:
+        return None
+    return entry.get("file_id")
+
+def remember_file_id(species: str, image_url: str, message: Any) -> Optional[str]:
+    """Store the file_id of the largest photo size from a sent message."""
+    if not message or not getattr(message, "photo", None):
+        return None
+
+    file_id = message.photo[-1].file_id
+    cache = _get_cache()
+    key = _species_key(species)
+    if cache.get(key) == {"url": image_url, "file_id": file_id}:
+        return file_id
+
+    cache[key] = {"url": image_url, "file_id": file_id}
+    save_json(ARTWORK_CACHE_FILE, cache)
+    return file_id
+
+def forget_file_id(species: str) -> None:
+    """Drop a cached file_id that Telegram no longer accepts."""
+    cache = _get_cache()
+    if cache.pop(_species_key(species), None) is not None:
+        save_json(ARTWORK_CACHE_FILE, cache)
+
+async def send_pokemon_photo(bot, chat_id: int, species: str, image_url: str, **kwargs) -> Any:
+    """Send Pokemon artwork, reusing the cached file_id when there is one.
+
+    Extra keyword arguments (caption, parse_mode, reply_markup...) are passed
+    to send_photo unchanged.
+    """
+    file_id = get_file_id(species, image_url)
+    if file_id:
+        try:
+            return await bot.send_photo(chat_id=chat_id, photo=file_id, **kwargs)
+        except BadRequest as e:
+            logger.warning(f"Кэшированный file_id для {species} отклонен Telegram: {e}")
+            forget_file_id(species)
+
+    message = await bot.send_photo(chat_id=chat_id, photo=image_url, **kwargs)
+    remember_file_id(species, image_url, message)
+    return message
+
+async def warm_up_cache(
+    bot,
+    chat_id: int,
+    limit: int = 500,
+    progress_callback: Optional[Callable[[int, int], Any]] = None
+) -> Tuple[int, int, int]:
+    """Upload the artwork of all species once to a cache chat.
+
+    Returns the number of uploaded, already cached and failed species.
+    """
+    all_pokemon = await get_all_pokemon(limit)
+    uploaded = skipped = failed = 0
+
+    for index, pokemon in enumerate(all_pokemon, start=1):
+        species = pokemon["name"]
+        pokedex_id = get_pokedex_id_from_url(pokemon.get("url", ""))
+        if pokedex_id is None:
+            failed += 1
+            continue
+
+        image_url = get_official_artwork_url(pokedex_id)
+        if get_file_id(species, image_url):
+            skipped += 1
+            continue
+
+        while True:
+            try:
+                message = await bot.send_photo(
+                    chat_id=chat_id,
+                    photo=image_url,
+                    caption=species,
+                    disable_notification=True
+                )
+                remember_file_id(species, image_url, message)
+                uploaded += 1
+                break
+            except RetryAfter as e:
+                await asyncio.sleep(e.retry_after)
+            except Exception as e:
+                logger.error(f"Не удалось загрузить изображение {species} в кэш-чат: {e}")
+                failed += 1
+                break
+
+        if progress_callback and index % 50 == 0:
+            await progress_callback(index, len(all_pokemon))
+
+        await asyncio.sleep(WARM_UP_DELAY)
+
+    return uploaded, skipped, failed
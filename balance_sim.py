@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Offline economy and progression simulator.
+
+Simulates thousands of synthetic players day by day against the real payout,
+cooldown, catch and league formulas from economy.py and config.py, and reports
+coin inflation, catch rates and how long it takes to reach each league.
+Players are processed as NumPy arrays, so 10 000 players over 90 days take a
+few seconds on one CPU.
+
+Usage:
+    python balance_sim.py --players 10000 --days 90 --seed 1
+    python balance_sim.py --json > report.json
+"""
+
+import argparse
+import json
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+import config
+import economy
+
+# Player archetypes: share of players, play sessions per day, summons per day, battles per session
+ARCHETYPES = {
+    "casual": (0.6, 2.0, 0.5, 0.1),
+    "regular": (0.3, 6.0, 2.0, 0.3),
+    "hardcore": (0.1, 16.0, 6.0, 0.5)
+}
+
+# Free encounters with wild Pokemon in group chats per session
+GROUP_ENCOUNTERS_PER_SESSION = 0.3
+# Quiz accuracy is drawn per player from Beta(a, b)
+QUIZ_SKILL = (4.0, 2.0)
+# Base stat ranges of wild Pokemon (attack/defense, hp)
+WILD_ATTACK_DEFENSE = (30, 130)
+WILD_HP = (30, 120)
+# Standard deviation of the power difference between battle opponents
+BATTLE_POWER_SPREAD = 150.0
+
+REPORT_DAYS = (1, 7, 30, 60, 90, 180, 365)
+
+def _sum_per_player(rng: np.random.Generator, counts: np.ndarray, sample) -> np.ndarray:
+    """Sum `counts[i]` random payouts for every player i."""
+    total = int(counts.sum())
+    if total == 0:
+        return np.zeros(counts.shape[0])
+    owners = np.repeat(np.arange(counts.shape[0]), counts)
+    return np.bincount(owners, weights=sample(total), minlength=counts.shape[0])
+
+def simulate(players: int = 10000, days: int = 90, seed: int = 0) -> Dict[str, Any]:
+    """Run the simulation and return the report as a dict."""
+    rng = np.random.default_rng(seed)
+    started = time.perf_counter()
+
+    shares = np.array([archetype[0] for archetype in ARCHETYPES.values()])
+    kind = rng.choice(len(ARCHETYPES), size=players, p=shares / shares.sum())
+    sessions_rate, summons_rate, battle_rate = (
+        np.array([archetype[i] for archetype in ARCHETYPES.values()])[kind] for i in (1, 2, 3)
+    )
+    quiz_skill = rng.beta(*QUIZ_SKILL, size=players)
+
+    # Максимальное число игр в день ограничено кулдаунами
+    daily_caps = {game: 86400 // cooldown for game, cooldown in economy.GAME_COOLDOWNS.items()}
+    slot_payouts, slot_probabilities = economy.slots_payout_distribution()
+
+    balance = np.full(players, float(config.STARTING_BALANCE))
+    caught = np.zeros(players, dtype=np.int64)
+    league = np.ones(players, dtype=np.int64)
+    league_count = len(config.LEAGUES)
+    league_day = np.full((players, league_count + 1), -1, dtype=np.int64)
+    league_day[:, 1] = 0
+
+    minted_total = sunk_total = 0.0
+    encounters_total = catches_total = 0
+    history: List[Dict[str, Any]] = []
+    supply_before = balance.sum()
+
+    for day in range(1, days + 1):
+        sessions = rng.poisson(sessions_rate)
+        plays = {game: np.minimum(sessions, cap) for game, cap in daily_caps.items()}
+        plays["daily"] = (sessions > 0).astype(np.int64)
+
+        # Доход от мини-игр
+        income = _sum_per_player(rng, plays["dice"], lambda k: economy.dice_payout(rng.integers(1, 7, size=k)))
+        income += _sum_per_player(rng, plays["slots"], lambda k: rng.choice(slot_payouts, size=k, p=slot_probabilities))
+        income += rng.binomial(plays["guess_number"], 1 / economy.GUESS_NUMBER_RANGE) * economy.GUESS_NUMBER_REWARD
+        income += rng.binomial(plays["pokemon_quiz"], quiz_skill) * economy.QUIZ_REWARD
+        doubled = rng.random(players) < economy.DAILY_DOUBLE_CHANCE
+        income += economy.daily_bonus(league, doubled) * plays["daily"]
+
+        # Награды за битвы (половина битв выиграна)
+        wins = rng.binomial(rng.poisson(sessions * battle_rate), 0.5)
+        income += _sum_per_player(rng, wins, lambda k: economy.battle_reward(
+            np.abs(rng.normal(0, BATTLE_POWER_SPREAD, size=k)), 0,
+            rng.uniform(*economy.BATTLE_RANDOM_FACTOR, size=k)
+        ))
+        balance += income
+
+        # Призывы покемонов за монеты и бесплатные встречи в группах
+        summons = np.minimum(rng.poisson(summons_rate), (balance // config.POKEMON_CALL_COST).astype(np.int64))
+        spent = summons * config.POKEMON_CALL_COST
+        balance -= spent
+        encounters = summons + rng.poisson(sessions * GROUP_ENCOUNTERS_PER_SESSION)
+
+        def catch_sample(k: int) -> np.ndarray:
+            attack_defense = rng.uniform(*WILD_ATTACK_DEFENSE, size=(k, 2)).sum(axis=1)
+            cp = np.floor(attack_defense * rng.uniform(*WILD_HP, size=k) / 10)
+            owners_league = np.repeat(league, encounters)
+            return rng.random(k) <= economy.catch_rate(cp, owners_league)
+
+        catches = _sum_per_player(rng, encounters, catch_sample).astype(np.int64)
+        caught += catches
+
+        new_league = np.minimum(economy.league_for_caught(caught), league_count)
+        for reached in range(2, league_count + 1):
+            newly = (new_league >= reached) & (league_day[:, reached] < 0)
+            league_day[newly, reached] = day
+        league = new_league
+
+        minted_total += income.sum()
+        sunk_total += spent.sum()
+        encounters_total += int(encounters.sum())
+        catches_total += int(catches.sum())
+
+        if day in REPORT_DAYS or day == days:
+            supply = balance.sum()
+            history.append({
+                "day": day,
+                "mean_balance": round(float(balance.mean()), 1),
+                "median_balance": round(float(np.median(balance)), 1),
+                "coin_supply": int(supply),
+                "daily_inflation_pct": round(float(((supply / supply_before) ** (1 / day) - 1) * 100), 3),
+                "mean_league": round(float(league.mean()), 2)
+            })
+
+    time_to_league = {}
+    for reached in range(2, league_count + 1):
+        reached_days = league_day[:, reached][league_day[:, reached] >= 0]
+        time_to_league[reached] = {
+            "reached_pct": round(100 * reached_days.size / players, 1),
+            "median_days": float(np.median(reached_days)) if reached_days.size else None,
+            "p90_days": float(np.percentile(reached_days, 90)) if reached_days.size else None
+        }
+
+    trainers = {
+        trainer_id: round(100 * float((balance >= data["cost"]).mean()), 1)
+        for trainer_id, data in config.TRAINERS.items()
+    }
+
+    return {
+        "players": players,
+        "days": days,
+        "seed": seed,
+        "elapsed_seconds": round(time.perf_counter() - started, 2),
+        "minted_coins": int(minted_total),
+        "sunk_coins": int(sunk_total),
+        "minted_per_player_day": round(minted_total / players / days, 1),
+        "encounters": encounters_total,
+        "catches": catches_total,
+        "catch_rate_pct": round(100 * catches_total / max(1, encounters_total), 1),
+        "history": history,
+        "time_to_league": time_to_league,
+        "can_afford_trainer_pct": trainers
+    }
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Render the report as a text table."""
+    lines = [
+        f"Players: {report['players']}, days: {report['days']}, seed: {report['seed']} "
+        f"({report['elapsed_seconds']} s)",
+        f"Coins minted: {report['minted_coins']} ({report['minted_per_player_day']} per player per day), "
+        f"sunk into summons: {report['sunk_coins']}",
+        f"Catch rate: {report['catch_rate_pct']}% of {report['encounters']} encounters",
+        "",
+        f"{'day':>5} {'mean bal':>12} {'median bal':>12} {'supply':>14} {'infl %/day':>11} {'league':>7}"
+    ]
+    for row in report["history"]:
+        lines.append(
+            f"{row['day']:>5} {row['mean_balance']:>12} {row['median_balance']:>12} "
+            f"{row['coin_supply']:>14} {row['daily_inflation_pct']:>11} {row['mean_league']:>7}"
+        )
+
+    lines += ["", f"{'league':>6} {'reached %':>10} {'median days':>12} {'p90 days':>9}"]
+    for league, row in report["time_to_league"].items():
+        lines.append(
+            f"{league:>6} {row['reached_pct']:>10} {str(row['median_days']):>12} {str(row['p90_days']):>9}"
+        )
+
+    lines += ["", "Players able to afford a trainer at the end:"]
+    for trainer_id, pct in report["can_afford_trainer_pct"].items():
+        lines.append(f"  {trainer_id}: {pct}%")
+    return "\n".join(lines)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulate the game economy with synthetic players.")
+    parser.add_argument("--players", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    report = simulate(args.players, args.days, args.seed)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_report(report))
+
+if __name__ == "__main__":
+    main()
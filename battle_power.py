@@ -0,0 +1,122 @@
+"""
+Cached battle power of Pokemon.
+
+Effective power depends on the Pokemon's stats and on its owner's league,
+trainer and trainer level. Results are cached per
+(pokemon_id, league, trainer, trainer_level) together with the stats they were
+computed from, so a stat change (evolution, custom edits) or a bonus change
+(new league, trainer upgrade) is recomputed automatically while repeated
+renders and battles reuse the cached value.
+"""
+
+import functools
+import logging
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import config
+from models.trainer import Trainer
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of cached entries of each cache
+MAX_CACHED_POWERS = 10000
+
+_Stats = Tuple[int, int, int]
+
+# Ключ -> (характеристики, сила)
+_power_cache: "OrderedDict[Tuple, Tuple[_Stats, int]]" = OrderedDict()
+_cp_cache: "OrderedDict[str, Tuple[_Stats, int]]" = OrderedDict()
+
+def _stats(pokemon) -> _Stats:
+    return (pokemon.attack, pokemon.defense, pokemon.hp)
+
+def _cache_get(cache: OrderedDict, key, stats: _Stats) -> Optional[int]:
+    entry = cache.get(key)
+    if entry is None or entry[0] != stats:
+        return None
+    cache.move_to_end(key)
+    return entry[1]
+
+def _cache_put(cache: OrderedDict, key, stats: _Stats, value: int) -> None:
+    cache[key] = (stats, value)
+    cache.move_to_end(key)
+    if len(cache) > MAX_CACHED_POWERS:
+        cache.popitem(last=False)
+
+@functools.lru_cache(maxsize=None)
+def get_league_bonus(league: int) -> int:
+    """Get the flat power bonus of a league."""
+    league_data = config.LEAGUES.get(league, config.LEAGUES[1])
+    return (
+        league_data.get("attack_bonus", 0)
+        + league_data.get("defense_bonus", 0)
+        + league_data.get("health_bonus", 0)
+    )
+
+@functools.lru_cache(maxsize=None)
+def get_trainer_multiplier(trainer: Optional[str], trainer_level: int) -> float:
+    """Get the power multiplier of a trainer at the given level."""
+    if not trainer:
+        return 1.0
+
+    trainer_id = trainer.lower()
+    trainer_data = config.TRAINERS.get(trainer_id)
+    if not trainer_data:
+        return 1.0
+
+    bonuses = Trainer(
+        name=trainer_data.get("name", trainer_id),
+        trainer_id=trainer_id,
+        cost=trainer_data.get("cost", 0),
+        power_bonus=trainer_data.get("power_bonus", 0.0),
+        upgrade_cost=trainer_data.get("upgrade_cost")
+    ).calculate_bonus_at_level(trainer_level)
+    return 1.0 + bonuses["power"]
+
+def get_cp(pokemon) -> int:
+    """Get a Pokemon's CP, recomputed only when its stats change."""
+    stats = _stats(pokemon)
+    cp = _cache_get(_cp_cache, pokemon.pokemon_id, stats)
+    if cp is None:
+        cp = pokemon.calculate_cp()
+        _cache_put(_cp_cache, pokemon.pokemon_id, stats, cp)
+    return cp
+
+def get_battle_power(user, pokemon) -> int:
+    """Get a Pokemon's battle power with its owner's league and trainer bonuses."""
+    key = (pokemon.pokemon_id, user.league, user.trainer, user.trainer_level)
+    stats = _stats(pokemon)
+    power = _cache_get(_power_cache, key, stats)
+    if power is None:
+        total_power = get_cp(pokemon) * get_trainer_multiplier(user.trainer, user.trainer_level)
+        power = int(total_power + get_league_bonus(user.league))
+        _cache_put(_power_cache, key, stats, power)
+    return power
+
+def get_battle_stats(user, pokemon) -> Tuple[int, int, int]:
+    """Get a Pokemon's (attack, defense, hp) with its owner's bonuses applied.
+
+    The trainer multiplier scales the base stats and the league adds its flat
+    attack, defense and health bonuses.
+    """
+    multiplier = get_trainer_multiplier(user.trainer, user.trainer_level)
+    league_data = config.LEAGUES.get(user.league, config.LEAGUES[1])
+    return (
+        int(pokemon.attack * multiplier + league_data.get("attack_bonus", 0)),
+        int(pokemon.defense * multiplier + league_data.get("defense_bonus", 0)),
+        int(pokemon.hp * multiplier + league_data.get("health_bonus", 0))
+    )
+
+def invalidate_pokemon(pokemon_id: str) -> None:
+    """Drop the cached values of one Pokemon."""
+    _cp_cache.pop(pokemon_id, None)
+    for key in [key for key in _power_cache if key[0] == pokemon_id]:
+        del _power_cache[key]
+
+def clear_cache() -> None:
+    """Drop every cached value, e.g. after league or trainer config changes."""
+    _power_cache.clear()
+    _cp_cache.clear()
+    get_league_bonus.cache_clear()
+    get_trainer_multiplier.cache_clear()
@@ -0,0 +1,99 @@
+"""
+Battle sessions between two players.
+
+State machine:
+    challenged -> accepted -> selecting -> resolved
+Any state can also end as declined or expire. A session only stores user and
+Pokemon IDs, so it is persisted in data/battle_sessions.json and survives a
+restart. Finished sessions are removed right away; abandoned ones are removed
+by the session sweeper when their state's time to live runs out.
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+from session_store import SessionStore
+
+logger = logging.getLogger(__name__)
+
+CHALLENGED = "challenged"
+ACCEPTED = "accepted"
+SELECTING = "selecting"
+RESOLVED = "resolved"
+
+# Time to live of each state (seconds)
+BATTLE_TTL = {
+    CHALLENGED: 10 * 60,
+    ACCEPTED: 15 * 60,
+    SELECTING: 15 * 60,
+    RESOLVED: 60
+}
+
+# Roles and their Pokemon fields
+POKEMON_FIELDS = {
+    "challenger": "challenger_pokemon_id",
+    "opponent": "opponent_pokemon_id"
+}
+
+_store = SessionStore("battle_sessions", BATTLE_TTL)
+
+def create_battle(challenger_id: int, opponent_id: int) -> Dict[str, Any]:
+    """Create a battle challenge."""
+    return _store.create(
+        CHALLENGED,
+        user1_id=challenger_id,
+        user2_id=opponent_id,
+        challenger_pokemon_id=None,
+        opponent_pokemon_id=None
+    )
+
+def get_battle(battle_id: str) -> Optional[Dict[str, Any]]:
+    """Get an active battle session."""
+    return _store.get(battle_id)
+
+def accept_battle(battle_id: str, user_id: int) -> Optional[Dict[str, Any]]:
+    """Accept a challenge. Only the challenged player can do it, and only once."""
+    return _store.mutate(battle_id, lambda battle: (
+        _store.advance(battle, ACCEPTED)
+        if battle["state"] == CHALLENGED and battle["user2_id"] == user_id else None
+    ))
+
+def decline_battle(battle_id: str, user_id: int) -> Optional[Dict[str, Any]]:
+    """Decline a challenge and remove the session."""
+    battle = _store.get(battle_id)
+    if not battle or battle["state"] != CHALLENGED or battle["user2_id"] != user_id:
+        return None
+    if not _store.delete(battle_id):
+        return None
+    return battle
+
+def select_pokemon(battle_id: str, role: str, user_id: int, pokemon_id: str) -> Optional[Dict[str, Any]]:
+    """Store a player's Pokemon choice.
+
+    Returns the updated session. Its state is "resolved" for exactly one
+    caller: the one whose choice completed the battle. Returns None if the
+    choice is not allowed (wrong player, already chosen, battle over).
+    """
+    field = POKEMON_FIELDS.get(role)
+    expected_user = "user1_id" if role == "challenger" else "user2_id"
+
+    def apply(battle: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if field is None or battle[expected_user] != user_id:
+            return None
+        if battle["state"] not in (ACCEPTED, SELECTING) or battle.get(field):
+            return None
+
+        battle[field] = pokemon_id
+        both_selected = battle["challenger_pokemon_id"] and battle["opponent_pokemon_id"]
+        return _store.advance(battle, RESOLVED if both_selected else SELECTING)
+
+    return _store.mutate(battle_id, apply)
+
+def finish_battle(battle_id: str, **result) -> None:
+    """Remove a resolved battle, logging its result."""
+    if _store.delete(battle_id):
+        logger.info(f"Битва {battle_id} завершена: {result}")
+
+def cancel_battle(battle_id: str) -> bool:
+    """Remove a battle that can't be finished."""
+    return _store.delete(battle_id)
@@ -0,0 +1,263 @@
+"""
+Turn-based battle simulation with type effectiveness.
+
+Two Pokemon exchange attacks until one runs out of HP. Damage depends on the
+attacker's attack, the defender's defense, the type effectiveness of the
+attacker's best type against the defender's types, a random roll and critical
+hits. All randomness comes from one seedable NumPy generator, so a battle is
+reproducible from its seed.
+
+The engine is vectorised: simulate_batch runs many independent battles as
+arrays, which live battles (a batch of one, with a log) and offline balancing
+(Monte-Carlo win rates) share.
+"""
+
+import logging
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TYPES = [
+    "normal", "fire", "water", "electric", "grass", "ice",
+    "fighting", "poison", "ground", "flying", "psychic", "bug",
+    "rock", "ghost", "dragon", "dark", "steel", "fairy"
+]
+TYPE_INDEX = {name: i for i, name in enumerate(TYPES)}
+
+# Russian type names used for custom Pokemon
+TYPE_ALIASES = {
+    "нормальный": "normal", "обычный": "normal",
+    "огонь": "fire", "огненный": "fire",
+    "вода": "water", "водный": "water",
+    "электрический": "electric", "электричество": "electric",
+    "трава": "grass", "травяной": "grass",
+    "лед": "ice", "лёд": "ice", "ледяной": "ice",
+    "боевой": "fighting", "боец": "fighting",
+    "яд": "poison", "ядовитый": "poison",
+    "земля": "ground", "земляной": "ground",
+    "летающий": "flying",
+    "психический": "psychic",
+    "жук": "bug",
+    "камень": "rock", "каменный": "rock",
+    "призрак": "ghost",
+    "дракон": "dragon",
+    "темный": "dark", "тёмный": "dark",
+    "сталь": "steel", "стальной": "steel",
+    "фея": "fairy", "волшебный": "fairy"
+}
+
+# Attacking type -> (super effective against, not very effective against, no effect on)
+_EFFECTIVENESS = {
+    "normal": ((), ("rock", "steel"), ("ghost",)),
+    "fire": (("grass", "ice", "bug", "steel"), ("fire", "water", "rock", "dragon"), ()),
+    "water": (("fire", "ground", "rock"), ("water", "grass", "dragon"), ()),
+    "electric": (("water", "flying"), ("electric", "grass", "dragon"), ("ground",)),
+    "grass": (("water", "ground", "rock"), ("fire", "grass", "poison", "flying", "bug", "dragon", "steel"), ()),
+    "ice": (("grass", "ground", "flying", "dragon"), ("fire", "water", "ice", "steel"), ()),
+    "fighting": (("normal", "ice", "rock", "dark", "steel"), ("poison", "flying", "psychic", "bug", "fairy"), ("ghost",)),
+    "poison": (("grass", "fairy"), ("poison", "ground", "rock", "ghost"), ("steel",)),
+    "ground": (("fire", "electric", "poison", "rock", "steel"), ("grass", "bug"), ("flying",)),
+    "flying": (("grass", "fighting", "bug"), ("electric", "rock", "steel"), ()),
+    "psychic": (("fighting", "poison"), ("psychic", "steel"), ("dark",)),
+    "bug": (("grass", "psychic", "dark"), ("fire", "fighting", "poison", "flying", "ghost", "steel", "fairy"), ()),
+    "rock": (("fire", "ice", "flying", "bug"), ("fighting", "ground", "steel"), ()),
+    "ghost": (("psychic", "ghost"), ("dark",), ("normal",)),
+    "dragon": (("dragon",), ("steel",), ("fairy",)),
+    "dark": (("psychic", "ghost"), ("fighting", "dark", "fairy"), ()),
+    "steel": (("ice", "rock", "fairy"), ("fire", "water", "electric", "steel"), ()),
+    "fairy": (("fighting", "dragon", "dark"), ("fire", "poison", "steel"), ())
+}
+
+def _build_type_chart() -> np.ndarray:
+    chart = np.ones((len(TYPES), len(TYPES)), dtype=np.float64)
+    for attacker, (strong, weak, immune) in _EFFECTIVENESS.items():
+        row = TYPE_INDEX[attacker]
+        for defender in strong:
+            chart[row, TYPE_INDEX[defender]] = 2.0
+        for defender in weak:
+            chart[row, TYPE_INDEX[defender]] = 0.5
+        for defender in immune:
+            chart[row, TYPE_INDEX[defender]] = 0.0
+    chart.setflags(write=False)
+    return chart
+
+# TYPE_CHART[attacking type, defending type] -> damage multiplier
+TYPE_CHART = _build_type_chart()
+
+DAMAGE_SCALE = 0.5
+ROLL_MIN = 0.85
+CRIT_CHANCE = 1 / 16
+CRIT_MULTIPLIER = 1.5
+# After this many turns the Pokemon with the larger share of HP left wins
+MAX_TURNS = 100
+
+class Combatant(NamedTuple):
+    """A Pokemon's battle stats."""
+    name: str
+    types: Tuple[str, ...]
+    attack: float
+    defense: float
+    hp: float
+
+class BattleResult(NamedTuple):
+    """The outcome of one simulated battle."""
+    winner: int                                     # 0 или 1 - индекс победителя
+    turns: int
+    remaining_hp: Tuple[int, int]
+    seed: Optional[int]
+    # (ход, атакующий, урон, множитель типа, критический удар, HP защищающегося после атаки)
+    log: List[Tuple[int, int, int, float, bool, int]]
+
+def type_indexes(types: Sequence[str]) -> List[int]:
+    """Map type names (English or Russian) to chart indexes, skipping unknown ones."""
+    indexes = []
+    for name in types:
+        key = name.strip().lower()
+        key = TYPE_ALIASES.get(key, key)
+        if key in TYPE_INDEX:
+            indexes.append(TYPE_INDEX[key])
+    return indexes
+
+def type_multiplier(attacker_types: Sequence[str], defender_types: Sequence[str]) -> float:
+    """Get the multiplier of the attacker's most effective type against the defender."""
+    attacking = type_indexes(attacker_types)
+    defending = type_indexes(defender_types)
+    if not attacking or not defending:
+        return 1.0
+    # Произведение по типам защищающегося, максимум по типам атакующего
+    return float(TYPE_CHART[np.ix_(attacking, defending)].prod(axis=1).max())
+
+def _run(
+    attack: np.ndarray,
+    defense: np.ndarray,
+    hp: np.ndarray,
+    multiplier: np.ndarray,
+    rng: np.random.Generator,
+    log: Optional[list] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Run n battles given (n, 2) stat arrays; multiplier[:, i] is side i attacking the other side."""
+    n = attack.shape[0]
+    rows = np.arange(n)
+    max_hp = np.maximum(hp, 1.0)
+    hp = hp.astype(np.float64).copy()
+
+    # Урон без случайности для каждой стороны
+    opponent_defense = defense[:, ::-1]
+    base_damage = DAMAGE_SCALE * attack * attack / np.maximum(attack + opponent_defense, 1.0) * multiplier
+
+    first = rng.integers(0, 2, size=n)
+    winner = np.full(n, -1, dtype=np.int64)
+    turns = np.full(n, MAX_TURNS, dtype=np.int64)
+    active = np.ones(n, dtype=bool)
+
+    for step in range(2 * MAX_TURNS):
+        if not active.any():
+            break
+        attacker = (first + step) % 2
+        defender = 1 - attacker
+
+        roll = rng.uniform(ROLL_MIN, 1.0, size=n)
+        crit = rng.random(size=n) < CRIT_CHANCE
+        damage = np.floor(base_damage[rows, attacker] * roll * np.where(crit, CRIT_MULTIPLIER, 1.0))
+        damage = np.where(multiplier[rows, attacker] > 0, np.maximum(damage, 1.0), 0.0)
+        damage = np.where(active, damage, 0.0)
+
+        hp[rows, defender] -= damage
+
+        if log is not None:
+            log.append((
+                step // 2 + 1, int(attacker[0]), int(damage[0]),
+                float(multiplier[0, attacker[0]]), bool(crit[0]), max(0, int(hp[0, defender[0]]))
+            ))
+
+        knocked_out = active & (hp[rows, defender] <= 0)
+        winner[knocked_out] = attacker[knocked_out]
+        turns[knocked_out] = step // 2 + 1
+        active &= ~knocked_out
+
+    if active.any():
+        share = hp / max_hp
+        winner[active] = np.where(share[active, 0] >= share[active, 1], 0, 1)
+
+    return winner, turns, np.maximum(hp, 0).astype(np.int64)
+
+def _stat_arrays(first: Sequence[Combatant], second: Sequence[Combatant]):
+    attack = np.array([[a.attack, b.attack] for a, b in zip(first, second)], dtype=np.float64)
+    defense = np.array([[a.defense, b.defense] for a, b in zip(first, second)], dtype=np.float64)
+    hp = np.array([[a.hp, b.hp] for a, b in zip(first, second)], dtype=np.float64)
+    multiplier = np.array([
+        [type_multiplier(a.types, b.types), type_multiplier(b.types, a.types)]
+        for a, b in zip(first, second)
+    ], dtype=np.float64)
+    return attack, defense, hp, multiplier
+
+def simulate(first: Combatant, second: Combatant, seed: Optional[int] = None) -> BattleResult:
+    """Simulate one battle with a full log."""
+    rng = np.random.default_rng(seed)
+    log: list = []
+    winner, turns, remaining = _run(*_stat_arrays([first], [second]), rng, log=log)
+    winner_index = int(winner[0])
+
+    # Лог обрезается на атаке, завершившей бой
+    for i, entry in enumerate(log):
+        if entry[5] <= 0:
+            log = log[:i + 1]
+            break
+
+    return BattleResult(
+        winner=winner_index,
+        turns=int(turns[0]),
+        remaining_hp=(int(remaining[0, 0]), int(remaining[0, 1])),
+        seed=seed,
+        log=log
+    )
+
+def simulate_batch(
+    first: Sequence[Combatant],
+    second: Sequence[Combatant],
+    seed: Optional[int] = None
+) -> np.ndarray:
+    """Simulate first[i] against second[i] for every i and return the winner indexes."""
+    if len(first) != len(second):
+        raise ValueError("Списки участников должны быть одинаковой длины")
+    if not first:
+        return np.zeros(0, dtype=np.int64)
+    winner, _, _ = _run(*_stat_arrays(first, second), np.random.default_rng(seed))
+    return winner
+
+def estimate_win_rate(first: Combatant, second: Combatant, battles: int = 1000, seed: Optional[int] = None) -> float:
+    """Estimate the probability that `first` beats `second` by Monte-Carlo simulation."""
+    rng = np.random.default_rng(seed)
+    arrays = _stat_arrays([first], [second])
+    attack, defense, hp, multiplier = (np.repeat(array, battles, axis=0) for array in arrays)
+    winner, _, _ = _run(attack, defense, hp, multiplier, rng)
+    return float(np.mean(winner == 0))
+
+def format_log(result: BattleResult, names: Tuple[str, str], max_lines: int = 6) -> str:
+    """Render the battle log as short text lines."""
+    lines = []
+    entries = result.log
+    if len(entries) > max_lines:
+        entries = entries[:max_lines // 2] + [None] + entries[-(max_lines // 2):]
+
+    for entry in entries:
+        if entry is None:
+            lines.append("…")
+            continue
+        turn, attacker, damage, multiplier, crit, defender_hp = entry
+        note = ""
+        if multiplier > 1:
+            note = " (super effective!)"
+        elif multiplier == 0:
+            note = " (no effect)"
+        elif multiplier < 1:
+            note = " (not very effective)"
+        if crit:
+            note += " (critical hit!)"
+        lines.append(
+            f"T{turn}: {names[attacker]} deals {damage}{note}, "
+            f"{names[1 - attacker]} has {defender_hp} HP"
+        )
+    return "\n".join(lines)
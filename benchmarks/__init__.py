@@ -0,0 +1,14 @@
+"""
+Micro-benchmarks of the storage, model and game math hot paths.
+
+Every benchmark is parameterised by data size (Pokemon per user, users in the
+file) and reports the time per call. Results can be written as JSON and
+compared with a stored baseline; the run fails when a benchmark got slower
+than the baseline by more than the threshold:
+    python -m benchmarks --save-baseline          # before a change
+    python -m benchmarks                          # after it, compares with the baseline
+    python -m benchmarks -k user_ --param pokemons=1000 --json results.json
+
+Storage and model optimisations should come with a run of the affected
+benchmarks against the baseline taken before the change.
+"""
@@ -0,0 +1,112 @@
+"""
+Run the benchmarks:
+    python -m benchmarks [-k NAME] [--param users=1000,10000] [--json results.json]
+                         [--baseline PATH | --save-baseline] [--threshold 0.15]
+
+Exits with status 1 if a benchmark is slower than the baseline by more than
+the threshold, or if a case of the baseline could not be run. Data files are
+written to a temporary directory that is removed afterwards.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+from typing import Any, Dict, List
+
+import session_store
+from benchmarks import core
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+def _parse_value(value: str) -> Any:
+    for convert in (int, float):
+        try:
+            return convert(value)
+        except ValueError:
+            pass
+    return {"true": True, "false": False}.get(value.lower(), value)
+
+def parse_params(values: List[str]) -> Dict[str, List[Any]]:
+    params = {}
+    for value in values:
+        name, _, options = value.partition("=")
+        params[name] = [_parse_value(option) for option in options.split(",") if option]
+    return params
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Run the micro-benchmarks.")
+    parser.add_argument("-k", dest="pattern", default="", help="run only benchmarks whose name contains this")
+    parser.add_argument("--param", action="append", default=[], metavar="NAME=V1,V2",
+                        help="replace the values of a parameter, e.g. pokemons=10,1000")
+    parser.add_argument("--rounds", type=int, default=core.ROUNDS, help="timed rounds per case")
+    parser.add_argument("--min-time", type=float, default=core.MIN_ROUND_TIME, help="minimum seconds per round")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline results to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=core.DEFAULT_THRESHOLD,
+                        help="slowdown that fails the run (0.15 - 15%%)")
+    args = parser.parse_args(argv)
+
+    json_path = os.path.abspath(args.json) if args.json else None
+    baseline_path = os.path.abspath(args.baseline)
+
+    # Бенчмарки регистрируются при импорте модулей
+    from benchmarks import bench_models, bench_storage, bench_game  # noqa: F401
+
+    benchmarks = core.get_benchmarks(args.pattern)
+    if not benchmarks:
+        print(f"No benchmarks match {args.pattern!r}")
+        return 1
+
+    def progress(case: str, result: Dict[str, Any]) -> None:
+        if "skipped" in result:
+            print(f"{case:64} skipped: {result['skipped']}")
+        else:
+            print(f"{case:64} {result['median_us']:12.2f} us  (min {result['min_us']:.2f})")
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="benchmarks-") as workdir:
+        os.chdir(workdir)
+        try:
+            results = core.run_benchmarks(
+                benchmarks, parse_params(args.param), args.min_time, args.rounds, progress
+            )
+            # Отложенная запись хранилищ - пока каталог на месте
+            session_store.flush_all()
+        finally:
+            os.chdir(cwd)
+
+    if json_path:
+        core.save_results(json_path, results)
+    if args.save_baseline:
+        core.save_results(baseline_path, results)
+        print(f"Baseline saved to {baseline_path}")
+        return 0
+
+    baseline = core.load_results(baseline_path)
+    if baseline is None:
+        print(f"No baseline at {baseline_path}, run with --save-baseline to create one")
+        return 0
+
+    # С -k или --param запущена только часть бенчмарков, остальные случаи базы не проверяются
+    complete = not args.pattern and not args.param
+    rows = core.compare(results, baseline, args.threshold, complete)
+    regressions = [row for row in rows if row["regression"]]
+    skipped = [row for row in rows if "skipped" in row]
+    print()
+    for row in rows:
+        if "skipped" in row:
+            print(f"{row['case']:64} {row['baseline_us']:12.2f} -> {'':>12}     SKIPPED: {row['skipped']}")
+            continue
+        marker = "  REGRESSION" if row["regression"] else ""
+        print(f"{row['case']:64} {row['baseline_us']:12.2f} -> {row['current_us']:12.2f} us  "
+              f"{(row['ratio'] - 1) * 100:+6.1f}%{marker}")
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) slower than the baseline by more than {args.threshold:.0%}")
+    if skipped:
+        print(f"\n{len(skipped)} baseline benchmark(s) could not be run")
+    return 1 if regressions or skipped else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
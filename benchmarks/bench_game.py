@@ -0,0 +1,48 @@
+"""Game math and rendering: catch chance, battle power and Pokedex pages."""
+
+import importlib
+
+from benchmarks.core import benchmark
+from benchmarks.fixtures import make_user_dict
+from models.user import User
+from pokemon_dataset import SEED_SPECIES
+
+@benchmark("calculate_catch_success", pokeballs=("none", "pokeball"), special_group=(False, True))
+def calculate_catch_success(pokeballs: str, special_group: bool):
+    """handlers.start.calculate_catch_success; with a Pokeball it also spends it and saves the user."""
+    start = importlib.import_module("handlers.start")
+    user = User.from_dict(make_user_dict(1, 10))
+    # Покеболов хватает на все вызовы, чтобы каждый проходил одну и ту же ветку
+    user.pokeballs = {} if pokeballs == "none" else {pokeballs: 10 ** 9}
+    wild = user.pokemons[-1]
+    return lambda: start.calculate_catch_success(user, wild, special_group)
+
+@benchmark("calculate_battle_power", cache=("warm", "cold"))
+def calculate_battle_power(cache: str):
+    """handlers.battle.calculate_battle_power of one Pokemon, cached or after a cache reset."""
+    battle = importlib.import_module("handlers.battle")
+    import battle_power
+
+    user = User.from_dict(make_user_dict(1, 10))
+    user.trainer, user.trainer_level, user.league = "misty", 3, 4
+    pokemon = user.pokemons[0]
+    if cache == "warm":
+        return lambda: battle.calculate_battle_power(user, pokemon)
+
+    def call():
+        battle_power.clear_cache()
+        return battle.calculate_battle_power(user, pokemon)
+
+    return call
+
+@benchmark("pokedex_page", mode=("all", "my"), pokemons=(10, 100, 1000))
+def pokedex_page(mode: str, pokemons: int):
+    """handlers.pokedex.render_pokedex_page of the second page of the list."""
+    pokedex = importlib.import_module("handlers.pokedex")
+    user = User.from_dict(make_user_dict(1, pokemons))
+    # Список всех покемонов в формате PokeAPI, как его возвращает get_all_pokemon(500)
+    all_pokemon = [
+        {"name": SEED_SPECIES[i % len(SEED_SPECIES)]["name"], "url": f"https://pokeapi.co/api/v2/pokemon/{i + 1}/"}
+        for i in range(500)
+    ]
+    return lambda: pokedex.render_pokedex_page(user, mode, 2, all_pokemon)
@@ -0,0 +1,19 @@
+"""User and Pokemon model (de)serialisation."""
+
+from benchmarks.core import benchmark
+from benchmarks.fixtures import make_user_dict
+from models.user import User
+
+POKEMON_COUNTS = (10, 100, 1000)
+
+@benchmark("user_from_dict", pokemons=POKEMON_COUNTS)
+def user_from_dict(pokemons: int):
+    """User.from_dict of a stored user record."""
+    data = make_user_dict(1, pokemons)
+    return lambda: User.from_dict(data)
+
+@benchmark("user_to_dict", pokemons=POKEMON_COUNTS)
+def user_to_dict(pokemons: int):
+    """User.to_dict of a loaded user."""
+    user = User.from_dict(make_user_dict(1, pokemons))
+    return user.to_dict
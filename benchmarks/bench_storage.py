@@ -0,0 +1,33 @@
+"""save_user on users files of different sizes.
+
+Every case writes its own data/users.json in the benchmark working directory
+and reloads the storage module, so no state is shared between sizes.
+"""
+
+import importlib
+
+from benchmarks.core import benchmark
+from benchmarks.fixtures import make_user_dict
+from json_store import data_path, save_json
+
+USERS_FILE = data_path("users.json")
+FIRST_USER_ID = 10_000_000
+
+@benchmark("save_user", users=(1_000, 10_000, 100_000), pokemons=(3,))
+def save_user(users: int, pokemons: int):
+    """storage.save_user of one changed user in a file of N users."""
+    save_json(
+        USERS_FILE,
+        {str(FIRST_USER_ID + i): make_user_dict(FIRST_USER_ID + i, pokemons) for i in range(users)},
+        indent=None
+    )
+    storage = importlib.reload(importlib.import_module("storage"))
+    storage.initialize_data()
+
+    user = storage.get_user(FIRST_USER_ID + users // 2)
+
+    def call():
+        user.balance += 1
+        storage.save_user(user)
+
+    return call
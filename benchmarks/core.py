@@ -0,0 +1,165 @@
+"""Benchmark registry, timing and baseline comparison."""
+
+import gc
+import itertools
+import json
+import platform
+import statistics
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Minimum duration of one timed round; the number of calls per round is picked to reach it
+MIN_ROUND_TIME = 0.2
+ROUNDS = 5
+# Slowdown against the baseline that fails the run (0.15 - 15% slower)
+DEFAULT_THRESHOLD = 0.15
+
+class Benchmark:
+    """A function that prepares data for one set of parameters and returns the call to time."""
+
+    def __init__(self, name: str, setup: Callable[..., Callable[[], Any]], params: Dict[str, Sequence[Any]]):
+        self.name = name
+        self.setup = setup
+        self.params = params
+        self.description = (setup.__doc__ or "").strip().splitlines()[0] if setup.__doc__ else ""
+
+    def cases(self, overrides: Optional[Dict[str, Sequence[Any]]] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (case name, parameters) for every combination of parameter values."""
+        params = dict(self.params)
+        for key, values in (overrides or {}).items():
+            if key in params:
+                params[key] = values
+        keys = list(params)
+        for values in itertools.product(*(params[key] for key in keys)):
+            kwargs = dict(zip(keys, values))
+            suffix = ",".join(f"{key}={value}" for key, value in kwargs.items())
+            yield (f"{self.name}[{suffix}]" if suffix else self.name), kwargs
+
+_registry: Dict[str, Benchmark] = {}
+
+def benchmark(name: str, **params: Sequence[Any]):
+    """Register a benchmark with the values of each of its parameters."""
+    def register(setup: Callable[..., Callable[[], Any]]):
+        _registry[name] = Benchmark(name, setup, params)
+        return setup
+    return register
+
+def get_benchmarks(pattern: str = "") -> List[Benchmark]:
+    return [bench for name, bench in _registry.items() if pattern in name]
+
+def measure(call: Callable[[], Any], min_round_time: float = MIN_ROUND_TIME, rounds: int = ROUNDS) -> Dict[str, Any]:
+    """Time a call: calibrate the calls per round, then time several rounds.
+
+    The garbage collector is off while timing, as in timeit, so a collection
+    triggered by earlier garbage does not land in a random round.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            call()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_round_time or number >= 1_000_000:
+            break
+        number = max(number * 2, int(number * min_round_time / max(elapsed, 1e-9) * 1.1))
+
+    per_call = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for _ in range(number):
+                call()
+            per_call.append((time.perf_counter() - start) / number)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    return {
+        "median_us": statistics.median(per_call) * 1e6,
+        "min_us": min(per_call) * 1e6,
+        "max_us": max(per_call) * 1e6,
+        "calls_per_round": number,
+        "rounds": rounds
+    }
+
+def run_benchmarks(
+    benchmarks: List[Benchmark],
+    overrides: Optional[Dict[str, Sequence[Any]]] = None,
+    min_round_time: float = MIN_ROUND_TIME,
+    rounds: int = ROUNDS,
+    progress: Optional[Callable[[str, Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """Run every case of the benchmarks and collect the results as a JSON-ready dict."""
+    results: Dict[str, Any] = {}
+    for bench in benchmarks:
+        for case, kwargs in bench.cases(overrides):
+            try:
+                call = bench.setup(**kwargs)
+            except ImportError as e:
+                # Модуль, который нужен бенчмарку, недоступен в этом окружении
+                result = {"skipped": str(e)}
+            else:
+                result = measure(call, min_round_time, rounds)
+            results[case] = result
+            if progress:
+                progress(case, result)
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results
+    }
+
+def compare(
+    results: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float = DEFAULT_THRESHOLD,
+    complete: bool = True
+) -> List[Dict[str, Any]]:
+    """Compare median times with a baseline. Returns one row per measured baseline case.
+
+    A baseline case that was skipped in this run gets a row with the reason
+    in "skipped" instead of times, so it can't pass unnoticed. So does a
+    baseline case missing from the results, unless complete is False (only
+    some of the benchmarks were run).
+    """
+    rows = []
+    for case, before in baseline.get("results", {}).items():
+        if "median_us" not in before:
+            continue
+        result = results["results"].get(case)
+        if result is None and not complete:
+            continue
+        if result is None or "median_us" not in result:
+            rows.append({
+                "case": case,
+                "baseline_us": before["median_us"],
+                "current_us": None,
+                "ratio": None,
+                "regression": False,
+                "skipped": result["skipped"] if result else "not in this run"
+            })
+            continue
+        ratio = result["median_us"] / before["median_us"] if before["median_us"] else 1.0
+        rows.append({
+            "case": case,
+            "baseline_us": before["median_us"],
+            "current_us": result["median_us"],
+            "ratio": ratio,
+            "regression": ratio > 1 + threshold
+        })
+    return rows
+
+def load_results(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def save_results(path: str, results: Dict[str, Any]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+        f.write("\n")
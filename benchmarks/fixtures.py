@@ -0,0 +1,39 @@
+"""Deterministic test data of realistic shape for the benchmarks."""
+
+import random
+from typing import Any, Dict
+
+from pokemon_dataset import SEED_SPECIES
+
+def make_pokemon_dict(rng: random.Random) -> Dict[str, Any]:
+    """A stored Pokemon record like the ones in data/users.json."""
+    species = rng.choice(SEED_SPECIES)
+    stats = species["stats"]
+    return {
+        "pokemon_id": "%032x" % rng.getrandbits(128),
+        "name": species["name"].capitalize(),
+        "types": list(species["types"]),
+        "attack": stats["attack"] + rng.randint(0, 15),
+        "defense": stats["defense"] + rng.randint(0, 15),
+        "hp": stats["hp"] + rng.randint(0, 15),
+        "image_url": f"https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/other/official-artwork/{species['id']}.png",
+        "custom": False
+    }
+
+def make_user_dict(user_id: int, pokemons: int, seed: int = 0) -> Dict[str, Any]:
+    """A stored user record with the given number of Pokemon."""
+    rng = random.Random(seed * 1_000_003 + user_id)
+    collection = [make_pokemon_dict(rng) for _ in range(pokemons)]
+    return {
+        "user_id": user_id,
+        "balance": rng.randint(0, 50000),
+        "pokemons": collection,
+        "main_pokemon": collection[0] if collection else None,
+        "caught_pokemon_count": pokemons,
+        "trainer": rng.choice([None, "brock", "misty"]),
+        "trainer_level": rng.randint(0, 5),
+        "league": rng.randint(1, 5),
+        "pokeballs": {"pokeball": rng.randint(0, 20), "greatball": rng.randint(0, 5)},
+        "used_promocodes": [],
+        "username": f"trainer{user_id}"
+    }
@@ -7,26 +7,63 @@ from telegram.ext import (
 )
 from telegram import Bot, Update
 import config
+import logging_setup
+import storage_hooks
+
+# Логирование настраивается до импорта остальных модулей
+logging_setup.setup_logging()
+
+# Хуки хранилища должны быть установлены до импорта обработчиков
+storage_hooks.install()
+
 from handlers import (
     start, admin, battle, pokedex, shop, 
-    evolution, info, trading, test, games, account
+    evolution, info, trading, test, games, account, top
 )
 from storage import initialize_data
+from broadcast import resume_broadcasts
+from session_store import flush_all, run_sweeper
+from trade_engine import recover_trades
+import pokemon_index
+from handlers import pokemon_picker
+import leaderboard
+import loop_watchdog
+import metrics
+import tracing
+import update_recorder
+from telegram_metrics import InstrumentedRequest, instrument_application
 
-# Настройка логирования
-logging.basicConfig(level=logging.DEBUG,
-                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 # Инициализация бота
-bot = Bot(token=config.BOT_TOKEN)
+bot = Bot(token=config.BOT_TOKEN, base_url=config.TELEGRAM_API_BASE_URL)
 
 # Инициализация приложения и передача токена вашего бота
-application = Application.builder().token(config.BOT_TOKEN).build()
+application = (
+    Application.builder()
+    .token(config.BOT_TOKEN)
+    .base_url(config.TELEGRAM_API_BASE_URL)
+    .request(InstrumentedRequest())
+    .build()
+)
 
 # Загрузка начальных данных
 initialize_data()
 
+# Завершение обменов, прерванных перезапуском
+recover_trades()
+
+# Построение таблиц лидеров и подписка на изменения пользователей
+leaderboard.install()
+leaderboard.build()
+
+# Сброс кэша сортировок выбора покемонов при изменении коллекций
+pokemon_picker.install()
+
+# Глобальный индекс владельцев покемонов
+pokemon_index.install()
+pokemon_index.build()
+
 def register_handlers():
     """Регистрация всех обработчиков команд и сообщений."""
     # Обработчики команд
@@ -43,6 +80,10 @@ def register_handlers():
     application.add_handler(CommandHandler("games", games.games_command))
     application.add_handler(CommandHandler("catch", start.catch_command))
     application.add_handler(CommandHandler("delete_account", account.delete_account_command))
+    application.add_handler(CommandHandler("warm_artwork", admin.warm_artwork_command))
+    application.add_handler(CommandHandler("top", top.top_command))
+    application.add_handler(CommandHandler("logdebug", admin.log_debug_command))
+    application.add_handler(CommandHandler("lagreport", admin.lag_report_command))
     
     # Обработчики обратных вызовов
     application.add_handler(CallbackQueryHandler(start.choose_starter_callback, pattern=r'^starter_'))
@@ -56,6 +97,7 @@ def register_handlers():
     application.add_handler(CallbackQueryHandler(games.games_callback, pattern=r'^guess_'))
     application.add_handler(CallbackQueryHandler(games.games_callback, pattern=r'^quiz_'))
     application.add_handler(CallbackQueryHandler(account.delete_account_callback, pattern=r'^delete_account_'))
+    application.add_handler(CallbackQueryHandler(top.top_callback, pattern=r'^top_'))
     
     # Обработчик команд призыва покемонов (работает во всех чатах)
     application.add_handler(MessageHandler(
@@ -93,6 +135,12 @@ def register_handlers():
         start.handle_group_message
     ))
     
+    # Учет участников групп для рейтинга чата (отдельная группа, не мешает остальным обработчикам)
+    application.add_handler(MessageHandler(
+        filters.ChatType.GROUPS,
+        top.track_group_member
+    ), group=1)
+    
     # Обработчик ошибок
     application.add_error_handler(error_handler)
     
@@ -121,13 +169,34 @@ async def setup_webhook():
         
 async def run_polling():
     """Запуск бота с использованием поллинга (для разработки)."""
+    # Фоновые задачи, которые отменяются при остановке
+    background_tasks = []
     try:
         logger.info("Запуск бота с поллингом...")
+        
+        # Запись входящих обновлений для нагрузочных тестов (UPDATE_RECORD_FILE)
+        update_recorder.install(application)
         await application.initialize()
         await application.start()
         await application.updater.start_polling()
         logger.info("Поллинг бота успешно запущен")
         
+        # Продолжаем рассылки, прерванные перезапуском
+        resumed = await resume_broadcasts(application.bot)
+        if resumed:
+            logger.info(f"Возобновлено рассылок: {resumed}")
+        
+        # Единственная задача очистки истекших сессий битв и обменов
+        background_tasks.append(asyncio.create_task(run_sweeper()))
+        
+        # Метрики: задержка цикла событий и эндпоинт /metrics
+        background_tasks.append(asyncio.create_task(metrics.run_loop_lag_monitor()))
+        
+        # Поиск кода, блокирующего цикл событий (/lagreport)
+        loop_watchdog.start()
+        if config.METRICS_PORT:
+            metrics.start_http_server(config.METRICS_PORT)
+        
         # Поддержка поллинга до прерывания
         while True:
             await asyncio.sleep(1)
@@ -136,8 +205,19 @@ async def run_polling():
     finally:
         # Правильное закрытие приложения при остановке
         logger.info("Остановка бота...")
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
         await application.stop()
         await application.shutdown()
+        # Хранилища с отложенной записью сохраняют изменения
+        flush_all()
 
 # Регистрация всех обработчиков
 register_handlers()
+
+# Время выполнения каждого обработчика
+instrument_application(application)
+
+# Трассировка медленных обновлений (после instrument_application, чтобы не замерять сами трассировщики)
+tracing.install(application)
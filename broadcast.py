@@ -0,0 +1,212 @@
+"""
+Admin broadcasts to every user of the bot.
+
+Jobs are persisted in data/broadcasts.json together with the number of
+processed users and the last of them, so an interrupted broadcast continues
+after that user following a restart. Recipients are streamed from the users
+file in batches, and sends are limited both in concurrency and in rate to
+stay under Telegram's limits.
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+import uuid
+from typing import Dict, Iterator, List, Optional
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest, Forbidden, RetryAfter
+
+from json_store import data_path, load_json, save_json
+from models.broadcast import BroadcastJob
+from user_scan import count_users, iter_user_ids_after
+
+logger = logging.getLogger(__name__)
+
+BROADCASTS_FILE = data_path("broadcasts.json")
+
+# Telegram allows about 30 messages per second to different chats
+BROADCAST_RATE_LIMIT = 25
+BROADCAST_CONCURRENCY = 10
+BROADCAST_BATCH_SIZE = 200
+# Minimal interval between progress message updates (seconds)
+PROGRESS_UPDATE_INTERVAL = 5.0
+MAX_SEND_ATTEMPTS = 3
+
+_jobs: Optional[Dict[str, BroadcastJob]] = None
+_tasks: Dict[str, asyncio.Task] = {}
+
+class RateLimiter:
+    """Spaces out sends so that no more than `rate` start per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        """Wait for the next free send slot."""
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        """Hold all sends back, e.g. after a flood-wait error."""
+        self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+def _get_jobs() -> Dict[str, BroadcastJob]:
+    global _jobs
+    if _jobs is None:
+        data = load_json(BROADCASTS_FILE, {})
+        _jobs = {job_id: BroadcastJob.from_dict(job_data) for job_id, job_data in data.items()}
+    return _jobs
+
+def _save_jobs() -> None:
+    save_json(BROADCASTS_FILE, {job_id: job.to_dict() for job_id, job in _get_jobs().items()})
+
+def _save_job(job: BroadcastJob) -> None:
+    job.updated_at = time.time()
+    _save_jobs()
+
+def get_job(job_id: str) -> Optional[BroadcastJob]:
+    """Get a broadcast job by its ID."""
+    return _get_jobs().get(job_id)
+
+def create_job(text: str, created_by: int, chat_id: int) -> BroadcastJob:
+    """Create and persist a new broadcast job."""
+    job = BroadcastJob(
+        job_id=uuid.uuid4().hex[:8],
+        text=text,
+        created_by=created_by,
+        chat_id=chat_id
+    )
+    _get_jobs()[job.job_id] = job
+    _save_job(job)
+    return job
+
+def cancel_job(job_id: str) -> bool:
+    """Cancel an active broadcast. The running batch is finished first."""
+    job = get_job(job_id)
+    if not job or not job.is_active():
+        return False
+
+    job.status = "cancelled"
+    _save_job(job)
+    return True
+
+def start_job(bot, job: BroadcastJob) -> None:
+    """Run a broadcast job in the background."""
+    if job.job_id in _tasks and not _tasks[job.job_id].done():
+        return
+    _tasks[job.job_id] = asyncio.create_task(_run_job(bot, job))
+
+async def resume_broadcasts(bot) -> int:
+    """Restart the broadcasts interrupted by a bot restart."""
+    resumed = 0
+    for job in _get_jobs().values():
+        if job.is_active():
+            logger.info(f"Возобновляем рассылку {job.job_id} после пользователя {job.last_user_id} (обработано {job.offset})")
+            start_job(bot, job)
+            resumed += 1
+    return resumed
+
+def create_progress_keyboard(job: BroadcastJob) -> Optional[InlineKeyboardMarkup]:
+    """Create the keyboard shown under the progress message."""
+    if not job.is_active():
+        return None
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton("🛑 Отменить рассылку", callback_data=f"admin_broadcast_cancel_{job.job_id}")]
+    ])
+
+async def _report_progress(bot, job: BroadcastJob) -> None:
+    if not job.progress_message_id:
+        return
+    try:
+        await bot.edit_message_text(
+            chat_id=job.chat_id,
+            message_id=job.progress_message_id,
+            text=job.get_progress_text(),
+            reply_markup=create_progress_keyboard(job),
+            parse_mode="Markdown"
+        )
+    except BadRequest as e:
+        # "Message is not modified" и подобные ошибки не мешают рассылке
+        logger.debug(f"Не удалось обновить прогресс рассылки {job.job_id}: {e}")
+    except Exception as e:
+        logger.warning(f"Ошибка при обновлении прогресса рассылки {job.job_id}: {e}")
+
+async def _send_one(bot, user_id: int, text: str, limiter: RateLimiter, semaphore: asyncio.Semaphore) -> str:
+    """Send the broadcast to one user and return the delivery result."""
+    async with semaphore:
+        for _ in range(MAX_SEND_ATTEMPTS):
+            await limiter.wait()
+            try:
+                await bot.send_message(chat_id=user_id, text=text)
+                return "sent"
+            except RetryAfter as e:
+                logger.warning(f"Flood control при рассылке, пауза {e.retry_after} сек.")
+                limiter.pause(e.retry_after)
+            except Forbidden:
+                return "blocked"
+            except Exception as e:
+                logger.debug(f"Не удалось отправить рассылку пользователю {user_id}: {e}")
+                return "failed"
+        return "failed"
+
+async def _send_batch(bot, job: BroadcastJob, user_ids: List[int], limiter: RateLimiter, semaphore: asyncio.Semaphore) -> None:
+    results = await asyncio.gather(*(
+        _send_one(bot, user_id, job.text, limiter, semaphore) for user_id in user_ids
+    ))
+    job.sent += results.count("sent")
+    job.blocked += results.count("blocked")
+    job.failed += results.count("failed")
+    job.offset += len(user_ids)
+    job.last_user_id = user_ids[-1]
+    _save_job(job)
+
+def _next_batch(recipients: Iterator[int]) -> List[int]:
+    return list(itertools.islice(recipients, BROADCAST_BATCH_SIZE))
+
+async def _run_job(bot, job: BroadcastJob) -> None:
+    """Deliver a broadcast, persisting progress after every batch."""
+    try:
+        if job.total is None:
+            # Подсчет выполняется в отдельном потоке, чтобы не блокировать цикл событий
+            job.total = await asyncio.to_thread(count_users)
+        job.status = "running"
+        _save_job(job)
+        await _report_progress(bot, job)
+
+        limiter = RateLimiter(BROADCAST_RATE_LIMIT)
+        semaphore = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+        last_report = time.monotonic()
+
+        recipients = iter_user_ids_after(job.last_user_id, job.offset)
+        while job.status == "running":
+            # Чтение файла (и поиск курсора при продолжении) - в отдельном потоке
+            batch = await asyncio.to_thread(_next_batch, recipients)
+            if not batch:
+                job.status = "completed"
+                _save_job(job)
+                break
+
+            await _send_batch(bot, job, batch, limiter, semaphore)
+
+            if time.monotonic() - last_report >= PROGRESS_UPDATE_INTERVAL:
+                await _report_progress(bot, job)
+                last_report = time.monotonic()
+
+        logger.info(
+            f"Рассылка {job.job_id} остановлена со статусом {job.status}: "
+            f"доставлено {job.sent}, заблокировали {job.blocked}, ошибок {job.failed}"
+        )
+        await _report_progress(bot, job)
+    except Exception as e:
+        # Статус остается "running", поэтому рассылка продолжится после перезапуска
+        logger.error(f"Ошибка при выполнении рассылки {job.job_id}: {e}")
+    finally:
+        _tasks.pop(job.job_id, None)
@@ -0,0 +1,136 @@
+"""
+Admin grants of many Pokemon to many users at once.
+
+Names are resolved concurrently: the local species dataset and the custom
+Pokemon are checked first, and only names missing from both are looked up on
+PokeAPI, with at most GRANT_CONCURRENCY requests in flight. The resolved
+Pokemon are then added to every target user with a single save per user,
+whatever the number of Pokemon.
+"""
+
+import asyncio
+import logging
+import uuid
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import config
+import custom_pokemon_registry
+from models.pokemon import Pokemon
+from pokemon_api import get_official_artwork_url, get_pokemon_data
+from pokemon_dataset import get_species
+from storage import get_user, save_user
+
+logger = logging.getLogger(__name__)
+
+# Maximum concurrent PokeAPI lookups of names missing locally
+GRANT_CONCURRENCY = 8
+
+def _from_species(record) -> Optional[Pokemon]:
+    stats = record.get("stats")
+    if not stats:
+        return None
+    return Pokemon(
+        pokemon_id=str(uuid.uuid4()),
+        name=record["name"].capitalize(),
+        types=list(record["types"]),
+        attack=stats["attack"],
+        defense=stats["defense"],
+        hp=stats["hp"],
+        image_url=get_official_artwork_url(record["id"])
+    )
+
+def _from_custom(name: str) -> Optional[Pokemon]:
+    # Из нескольких уникальных покемонов с одним именем выбирается новейший
+    definition = custom_pokemon_registry.resolve(name)
+    return custom_pokemon_registry.create_pokemon(definition) if definition else None
+
+async def _resolve(name: str, semaphore: asyncio.Semaphore) -> Optional[Pokemon]:
+    record = get_species(name)
+    pokemon = _from_species(record) if record else None
+    if pokemon is None:
+        pokemon = _from_custom(name)
+    if pokemon is None:
+        async with semaphore:
+            data = await get_pokemon_data(name.lower())
+        if data:
+            pokemon = Pokemon.create_from_data(data)
+    return pokemon
+
+async def resolve_pokemon_names(names: Sequence[str]) -> Dict[str, Optional[Pokemon]]:
+    """Resolve Pokemon names to template Pokemon, each distinct name once.
+
+    Returns {name: Pokemon or None if it wasn't found}.
+    """
+    unique_names = list(dict.fromkeys(name for name in names if name))
+    semaphore = asyncio.Semaphore(GRANT_CONCURRENCY)
+    results = await asyncio.gather(
+        *(_resolve(name, semaphore) for name in unique_names),
+        return_exceptions=True
+    )
+
+    resolved: Dict[str, Optional[Pokemon]] = {}
+    for name, result in zip(unique_names, results):
+        if isinstance(result, Exception):
+            logger.error(f"Ошибка при получении данных покемона {name}: {result}")
+            result = None
+        resolved[name] = result
+    return resolved
+
+def copy_pokemon(template: Pokemon) -> Pokemon:
+    """Make a new Pokemon with its own ID from a resolved template."""
+    pokemon = Pokemon.from_dict(template.to_dict())
+    pokemon.pokemon_id = str(uuid.uuid4())
+    return pokemon
+
+def grant_to_user(
+    user_id: int,
+    names: Sequence[str],
+    resolved: Dict[str, Optional[Pokemon]]
+) -> Tuple[List[str], List[str]]:
+    """Add the resolved Pokemon to one user and save them once.
+
+    Returns the granted names and the failed names with a reason. The limit
+    of config.MAX_SAME_POKEMON copies of one Pokemon per user still applies.
+    """
+    user = get_user(user_id)
+    if user is None:
+        return [], [f"{name} (пользователь не найден)" for name in names]
+
+    counts: Dict[str, int] = {}
+    for pokemon in user.pokemons:
+        counts[pokemon.name.lower()] = counts.get(pokemon.name.lower(), 0) + 1
+
+    granted, failed = [], []
+    for name in names:
+        template = resolved.get(name)
+        if template is None:
+            failed.append(f"{name} (не найден)")
+            continue
+
+        key = template.name.lower()
+        if counts.get(key, 0) >= config.MAX_SAME_POKEMON:
+            failed.append(f"{name} (уже {config.MAX_SAME_POKEMON} таких)")
+            continue
+
+        user.pokemons.append(copy_pokemon(template))
+        user.caught_pokemon_count += 1
+        counts[key] = counts.get(key, 0) + 1
+        granted.append(name)
+
+    if granted:
+        save_user(user)
+    return granted, failed
+
+async def grant_pokemon(
+    user_ids: Sequence[int],
+    names: Sequence[str]
+) -> Dict[int, Tuple[List[str], List[str]]]:
+    """Grant the named Pokemon to every user.
+
+    Returns {user_id: (granted names, failed names with reasons)}.
+    """
+    resolved = await resolve_pokemon_names(names)
+    results = {user_id: grant_to_user(user_id, names, resolved) for user_id in user_ids}
+    granted = sum(len(result[0]) for result in results.values())
+    logger.info(f"Выдано покемонов: {granted} для {len(user_ids)} пользователей")
+    return results
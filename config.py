@@ -3,9 +3,37 @@ import os
 # Bot configuration
 BOT_TOKEN = os.environ.get("BOT_TOKEN", "YOUR_BOT_TOKEN")
 WEBHOOK_URL = os.environ.get("WEBHOOK_URL", "https://your-app-url.repl.co")
+# Bot API base URL; the load tests point it at a local stand-in (loadtest/)
+TELEGRAM_API_BASE_URL = os.environ.get("TELEGRAM_API_BASE_URL", "https://api.telegram.org/bot")
+
+# Logging configuration (see logging_setup.py)
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")  # "json" или "text"
+LOG_FILE = os.environ.get("LOG_FILE", "")  # пусто - только stderr
+# Levels of noisy third-party loggers
+LOG_LEVELS = {"httpx": "INFO", "httpcore": "WARNING", "telegram": "INFO", "apscheduler": "WARNING"}
+# Logger -> (records per second, burst) for high-volume loggers
+LOG_RATE_LIMITS = {"handlers.start": (20, 100), "main": (20, 100), "__main__": (20, 100)}
+# Logger -> share of records kept (every Bot API request is logged by httpx)
+LOG_SAMPLING = {"httpx": 0.01}
+
+# Port of the /metrics endpoint in polling mode (0 - disabled); the webhook app serves /metrics itself
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9100"))
+
+# Updates slower than this are logged with their span tree (milliseconds, 0 - tracing disabled)
+TRACE_SLOW_UPDATE_MS = int(os.environ.get("TRACE_SLOW_UPDATE_MS", "1000"))
+
+# Event loop stalls longer than this are reported by /lagreport (milliseconds, 0 - watchdog disabled)
+LOOP_WATCHDOG_THRESHOLD_MS = int(os.environ.get("LOOP_WATCHDOG_THRESHOLD_MS", "200"))
+
+# Append anonymised incoming updates to this gzip file for load test replay (empty - disabled, see update_recorder.py)
+UPDATE_RECORD_FILE = os.environ.get("UPDATE_RECORD_FILE", "")
 
 # PokeAPI configuration
-POKEAPI_BASE_URL = "https://pokeapi.co/api/v2"
+POKEAPI_BASE_URL = os.environ.get("POKEAPI_BASE_URL", "https://pokeapi.co/api/v2")
+
+# Private chat used to pre-upload Pokemon artwork and collect Telegram file_ids (0 - disabled)
+ARTWORK_CACHE_CHAT_ID = int(os.environ.get("ARTWORK_CACHE_CHAT_ID", "0"))
 
 # Admin user IDs (comma-separated list of Telegram user IDs)
 ADMIN_IDS = list(map(int, os.environ.get("ADMIN_IDS", "12345678").split(',')))
@@ -0,0 +1,181 @@
+"""
+Registry of custom (admin-made) Pokemon.
+
+Definitions stay in data/custom_pokemons.json under their existing IDs, so
+promocodes and old references keep working. On top of that the registry keeps:
+- a case-insensitive name index, so lookups by name are O(1) and pick
+  deterministically: the newest definition with that name wins;
+- a version number per definition, bumped by every update, so a change is
+  visible and a definition ID always points to its current version;
+- content-addressed image references: every image URL is stored once in
+  data/custom_pokemon_assets.json under the hash of the normalised URL, and
+  definitions refer to that hash.
+
+The admin, promocode and grant paths all look custom Pokemon up through this
+module.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Sequence
+
+from json_store import data_path, load_json, save_json
+from models.pokemon import Pokemon
+
+logger = logging.getLogger(__name__)
+
+DEFINITIONS_FILE = data_path("custom_pokemons.json")
+ASSETS_FILE = data_path("custom_pokemon_assets.json")
+
+_lock = threading.RLock()
+# definition_id -> определение
+_definitions: Optional[Dict[str, Dict[str, Any]]] = None
+# hash -> image URL
+_assets: Dict[str, str] = {}
+# name.lower() -> definition_ids, от старых к новым
+_by_name: Dict[str, List[str]] = {}
+# Дополнительные ID (поле "id" старых записей) -> definition_id
+_aliases: Dict[str, str] = {}
+
+def _asset_key(url: str) -> str:
+    """Hash of a normalised image URL."""
+    normalised = url.strip()
+    scheme, sep, rest = normalised.partition("://")
+    if sep:
+        host, slash, path = rest.partition("/")
+        normalised = f"{scheme.lower()}://{host.lower()}{slash}{path}"
+    return hashlib.sha256(normalised.encode("utf-8")).hexdigest()[:16]
+
+def _add_asset(url: Optional[str]) -> Optional[str]:
+    # В URL не бывает пробелов: в старых записях встречается один URL, повторенный дважды
+    url = url.split()[0] if url and url.split() else None
+    if not url:
+        return None
+    key = _asset_key(url)
+    _assets.setdefault(key, url)
+    return key
+
+def _index(definition_id: str, definition: Dict[str, Any]) -> None:
+    _by_name.setdefault(definition["name"].lower(), []).append(definition_id)
+    alias = definition.get("id")
+    if alias and alias != definition_id:
+        _aliases[alias] = definition_id
+
+def _load() -> Dict[str, Dict[str, Any]]:
+    global _definitions
+    if _definitions is None:
+        _assets.update(load_json(ASSETS_FILE, {}))
+        definitions = load_json(DEFINITIONS_FILE, {})
+        migrated = False
+        for order, (definition_id, definition) in enumerate(definitions.items()):
+            # Старые записи получают версию, порядок создания и ссылку на изображение
+            if "version" not in definition:
+                definition["version"] = 1
+                definition.setdefault("created_at", order)
+                definition["image"] = _add_asset(definition.get("image_url"))
+                migrated = True
+            _index(definition_id, definition)
+        _definitions = definitions
+        if migrated:
+            _save()
+        logger.info(f"Загружено уникальных покемонов: {len(definitions)}, изображений: {len(_assets)}")
+    return _definitions
+
+def _save() -> None:
+    save_json(DEFINITIONS_FILE, _definitions)
+    save_json(ASSETS_FILE, _assets)
+
+def get(definition_id: str) -> Optional[Dict[str, Any]]:
+    """Get a definition by its ID."""
+    with _lock:
+        definitions = _load()
+        definition = definitions.get(definition_id) or definitions.get(_aliases.get(definition_id, ""))
+        return dict(definition) if definition else None
+
+def find_by_name(name: str) -> List[Dict[str, Any]]:
+    """Get every definition with a name (case-insensitive), newest first."""
+    with _lock:
+        definitions = _load()
+        return [dict(definitions[i]) for i in reversed(_by_name.get(name.strip().lower(), []))]
+
+def resolve(name_or_id: str) -> Optional[Dict[str, Any]]:
+    """Get a definition by ID, or the newest one with that name."""
+    with _lock:
+        definition = get(name_or_id.strip())
+        if definition:
+            return definition
+        ids = _by_name.get(name_or_id.strip().lower())
+        return dict(_load()[ids[-1]]) if ids else None
+
+def get_image_url(definition: Dict[str, Any]) -> Optional[str]:
+    """Get the image URL of a definition."""
+    image = definition.get("image")
+    return _assets.get(image) if image else definition.get("image_url")
+
+def register(
+    name: str,
+    types: Sequence[str],
+    attack: int,
+    defense: int,
+    hp: int,
+    image_url: Optional[str] = None
+) -> Dict[str, Any]:
+    """Add a new custom Pokemon definition and return it."""
+    with _lock:
+        definitions = _load()
+        definition_id = str(uuid.uuid4())
+        image = _add_asset(image_url)
+        definition = {
+            "id": definition_id,
+            "name": name,
+            "types": list(types),
+            "image_url": _assets.get(image) if image else None,
+            "image": image,
+            "stats": {"attack": attack, "defense": defense, "hp": hp},
+            "custom": True,
+            "version": 1,
+            "created_at": time.time()
+        }
+        definitions[definition_id] = definition
+        _index(definition_id, definition)
+        _save()
+        logger.info(f"Создан уникальный покемон {name} ({definition_id})")
+        return dict(definition)
+
+def update(definition_id: str, **changes) -> Optional[Dict[str, Any]]:
+    """Change a definition's fields (name, types, stats, image_url) and bump its version."""
+    with _lock:
+        definitions = _load()
+        definition = definitions.get(definition_id)
+        if not definition:
+            return None
+
+        old_name = definition["name"].lower()
+        if "image_url" in changes:
+            changes["image"] = _add_asset(changes["image_url"])
+            changes["image_url"] = _assets.get(changes["image"]) if changes["image"] else None
+        definition.update(changes)
+        definition["version"] = definition.get("version", 1) + 1
+
+        if definition["name"].lower() != old_name:
+            _by_name[old_name].remove(definition_id)
+            if not _by_name[old_name]:
+                del _by_name[old_name]
+            _by_name.setdefault(definition["name"].lower(), []).append(definition_id)
+        _save()
+        return dict(definition)
+
+def create_pokemon(definition: Dict[str, Any]) -> Pokemon:
+    """Create a new Pokemon instance of a definition."""
+    stats = definition.get("stats", definition)
+    return Pokemon.create_custom_pokemon(
+        name=definition["name"],
+        types=list(definition.get("types", [])),
+        attack=stats.get("attack", 0),
+        defense=stats.get("defense", 0),
+        hp=stats.get("hp", 0),
+        image_url=get_image_url(definition)
+    )
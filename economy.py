@@ -0,0 +1,110 @@
+"""
+Game economy formulas: mini-game payouts, cooldowns, battle rewards, catch
+chances and league progression.
+
+The handlers and the offline balancing simulator (balance_sim.py) use the same
+functions, so a balance change made here is what the simulator evaluates.
+Formulas work on plain numbers and on NumPy arrays alike; the random parts
+(dice rolls, slot symbols, random factors) are passed in by the caller.
+"""
+
+import itertools
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+import config
+
+# Время ожидания между играми в секундах
+GAME_COOLDOWNS = {
+    "dice": 3600,  # 1 час
+    "slots": 1800,  # 30 минут
+    "guess_number": 600,  # 10 минут
+    "pokemon_quiz": 1200,  # 20 минут
+    "daily": 86400,  # 24 часа
+}
+
+DICE_PAYOUT_PER_POINT = 10
+
+SLOT_SYMBOLS = ["🍇", "🍊", "🍒", "🍋", "🍉", "🍓", "💎"]
+SLOT_WEIGHTS = [20, 20, 20, 15, 15, 8, 2]  # Вероятности выпадения
+SLOT_DIAMOND = "💎"
+
+GUESS_NUMBER_RANGE = 10
+GUESS_NUMBER_REWARD = 50
+QUIZ_REWARD = 80
+
+DAILY_BASE_BONUS = 100
+DAILY_LEAGUE_STEP = 0.2  # +20% за каждую лигу
+DAILY_DOUBLE_CHANCE = 0.1
+
+BATTLE_BASE_REWARD = 500
+BATTLE_MAX_POWER_BONUS = 1000
+BATTLE_RANDOM_FACTOR = (0.8, 1.2)
+
+def dice_payout(roll):
+    """Coins for a dice roll of 1-6."""
+    return roll * DICE_PAYOUT_PER_POINT
+
+def slots_outcome(result: Sequence[str]) -> Tuple[str, int]:
+    """Get the outcome kind and payout of three slot symbols.
+
+    Kinds: "jackpot" (three equal), "pair" (two equal), "diamonds" (any
+    diamond) and "none".
+    """
+    if result[0] == result[1] == result[2]:
+        return "jackpot", 500 if result[0] == SLOT_DIAMOND else 100
+    if result[0] == result[1] or result[1] == result[2] or result[0] == result[2]:
+        return "pair", 100 if result.count(SLOT_DIAMOND) >= 2 else 20
+    if SLOT_DIAMOND in result:
+        return "diamonds", 10 * result.count(SLOT_DIAMOND)
+    return "none", 0
+
+def slots_payout_distribution() -> Tuple[np.ndarray, np.ndarray]:
+    """Get every possible slots payout and its probability."""
+    total_weight = sum(SLOT_WEIGHTS)
+    probabilities: Dict[int, float] = {}
+    for combination in itertools.product(range(len(SLOT_SYMBOLS)), repeat=3):
+        probability = 1.0
+        for i in combination:
+            probability *= SLOT_WEIGHTS[i] / total_weight
+        _, payout = slots_outcome([SLOT_SYMBOLS[i] for i in combination])
+        probabilities[payout] = probabilities.get(payout, 0.0) + probability
+    payouts = sorted(probabilities)
+    return np.array(payouts), np.array([probabilities[p] for p in payouts])
+
+def daily_bonus(league, doubled=False):
+    """Daily bonus for a league; doubled with DAILY_DOUBLE_CHANCE."""
+    bonus = np.floor(DAILY_BASE_BONUS * (1 + league * DAILY_LEAGUE_STEP)).astype(int)
+    return bonus * np.where(doubled, 2, 1)
+
+def battle_reward(winner_power, loser_power, random_factor):
+    """Coins for winning a battle; random_factor is drawn from BATTLE_RANDOM_FACTOR."""
+    power_difference = np.maximum(0, winner_power - loser_power)
+    power_bonus = np.minimum(BATTLE_MAX_POWER_BONUS, power_difference / 10)
+    return np.floor((BATTLE_BASE_REWARD + power_bonus) * random_factor).astype(int)
+
+def catch_rate(cp, league, pokeball_bonus=0.0, special_group=False):
+    """Probability of catching a wild Pokemon.
+
+    Higher CP lowers the chance, the league and the best Pokeball raise it.
+    The special group has a higher base chance, a softer CP penalty, doubled
+    league and 1.5x Pokeball bonuses and a 40% minimum.
+    """
+    base_catch_rate = 0.65 if special_group else 0.5
+    cp_factor = np.maximum(0.2 if special_group else 0.1, 1 - (cp / 1000))
+    league_bonus = (league - 1) * 0.05 * (2 if special_group else 1)
+    ball_bonus = pokeball_bonus * (1.5 if special_group else 1)
+
+    rate = np.minimum(0.95, base_catch_rate + cp_factor + league_bonus + ball_bonus)
+    if special_group:
+        rate = np.maximum(0.4, rate)
+    return rate
+
+def league_thresholds() -> List[int]:
+    """Caught Pokemon required for each league, in league order."""
+    return [config.LEAGUES[league]["pokemon_required"] for league in sorted(config.LEAGUES)]
+
+def league_for_caught(caught_count):
+    """League that a number of caught Pokemon qualifies for."""
+    return np.searchsorted(np.array(league_thresholds()), caught_count, side="right")
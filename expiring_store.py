@@ -0,0 +1,199 @@
+"""
+Persistent key-value store with per-entry expiry.
+
+Used for game cooldowns and short game sessions. Entries hold integer Unix
+timestamps (whole seconds), so they are compact in JSON and stay valid across
+restarts; a cooldown started before a restart is still running after it.
+
+Lookups are O(1) dict reads that treat an expired entry as missing (lazy
+expiry). Every entry is also filed in a timing wheel of BUCKET_SECONDS wide
+buckets, so the periodic sweep (session_store.run_sweeper) only visits buckets
+that are due instead of scanning the whole store. Changes only mark the store
+dirty; data/{name}.json is rewritten on the sweep and on shutdown
+(session_store.flush_all), never on the handler's path. Entries that must
+survive a kill between two writes (long cooldowns such as the daily bonus)
+are also appended to an fsync'd journal, data/{name}.log, which is folded
+back in on load.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional, Set, Tuple
+
+import session_store
+from json_store import append_json_line, data_path, load_json, load_json_lines, save_json, truncate_json_lines
+
+logger = logging.getLogger(__name__)
+
+# Width of one timing wheel bucket (seconds)
+BUCKET_SECONDS = 60
+# Cooldowns at least this long are journaled, so a restart can't reset them
+DURABLE_COOLDOWN = 10 * 60
+
+def now() -> int:
+    """Current time as an integer Unix timestamp."""
+    return int(time.time())
+
+class ExpiringStore:
+    """A persisted dict whose entries disappear after their time to live."""
+
+    def __init__(self, name: str, max_entries: int = 100000, durable_ttl: Optional[int] = None):
+        self.name = name
+        self.path = data_path(f"{name}.json")
+        self.journal_path = data_path(f"{name}.log")
+        self.max_entries = max_entries
+        # Записи с таким или большим временем жизни пишутся в журнал сразу
+        self.durable_ttl = durable_ttl
+        # key -> (expires_at, value)
+        self._entries: Optional[Dict[str, Tuple[int, Any]]] = None
+        # bucket -> keys expiring in it
+        self._wheel: Dict[int, Set[str]] = {}
+        self._next_bucket = now() // BUCKET_SECONDS
+        self._dirty = False
+        self._lock = threading.RLock()
+        session_store.register_store(self)
+
+    def _get_entries(self) -> Dict[str, Tuple[int, Any]]:
+        if self._entries is None:
+            current = now()
+            self._entries = {}
+            for key, (expires_at, value) in load_json(self.path, {}).items():
+                if expires_at > current:
+                    self._entries[key] = (expires_at, value)
+                    self._file(key, expires_at)
+            # Изменения после последней записи файла
+            journal = load_json_lines(self.journal_path)
+            for record in journal:
+                if record.get("removed"):
+                    self._entries.pop(record["key"], None)
+                elif record["expires_at"] > current:
+                    self._entries[record["key"]] = (record["expires_at"], record["value"])
+                    self._file(record["key"], record["expires_at"])
+            if journal:
+                self._dirty = True
+            if self._entries:
+                logger.info(f"Восстановлено записей {self.name}: {len(self._entries)}")
+        return self._entries
+
+    def _save(self) -> None:
+        save_json(self.path, self._entries, indent=None, durable=self.durable_ttl is not None)
+        if self.durable_ttl is not None:
+            truncate_json_lines(self.journal_path)
+        self._dirty = False
+
+    def _is_durable(self, ttl: int) -> bool:
+        return self.durable_ttl is not None and ttl >= self.durable_ttl
+
+    def _file(self, key: str, expires_at: int) -> None:
+        self._wheel.setdefault(expires_at // BUCKET_SECONDS, set()).add(key)
+
+    def _sweep(self, current: int) -> int:
+        removed = 0
+        due_bucket = current // BUCKET_SECONDS
+        while self._next_bucket < due_bucket:
+            for key in self._wheel.pop(self._next_bucket, ()):
+                entry = self._entries.get(key)
+                # Запись могла быть продлена и перенесена в другую корзину
+                if entry and entry[0] <= current:
+                    del self._entries[key]
+                    removed += 1
+            self._next_bucket += 1
+        return removed
+
+    def set(self, key: str, value: Any, ttl: int) -> int:
+        """Store a value for ttl seconds. Returns its expiry timestamp."""
+        with self._lock:
+            entries = self._get_entries()
+            current = now()
+            expires_at = current + int(ttl)
+
+            if key not in entries and len(entries) >= self.max_entries:
+                self._sweep(current)
+                while len(entries) >= self.max_entries:
+                    # Вытесняем запись, которая истекает раньше всех
+                    bucket = min(self._wheel)
+                    keys = self._wheel[bucket]
+                    evicted = keys.pop()
+                    if not keys:
+                        del self._wheel[bucket]
+                    entry = entries.get(evicted)
+                    # Продленная запись уже лежит в более поздней корзине
+                    if entry and entry[0] // BUCKET_SECONDS == bucket:
+                        del entries[evicted]
+
+            if self._is_durable(int(ttl)):
+                append_json_line(self.journal_path, {"key": key, "expires_at": expires_at, "value": value})
+            entries[key] = (expires_at, value)
+            self._file(key, expires_at)
+            self._dirty = True
+            return expires_at
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get a value that hasn't expired yet."""
+        with self._lock:
+            entry = self._get_entries().get(key)
+            if entry is None or entry[0] <= now():
+                return default
+            return entry[1]
+
+    def remaining(self, key: str) -> int:
+        """Get the seconds left until an entry expires, 0 if it is missing."""
+        with self._lock:
+            entry = self._get_entries().get(key)
+            if entry is None:
+                return 0
+            return max(0, entry[0] - now())
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        """Remove an entry and return its value if it hasn't expired."""
+        with self._lock:
+            entry = self._get_entries().pop(key, None)
+            if entry is None:
+                return default
+            if self._is_durable(entry[0] - now()):
+                append_json_line(self.journal_path, {"key": key, "removed": True})
+            self._dirty = True
+            return entry[1] if entry[0] > now() else default
+
+    def flush(self) -> None:
+        """Write pending changes to disk now."""
+        with self._lock:
+            if self._entries is not None and self._dirty:
+                self._save()
+
+    def sweep(self) -> int:
+        """Remove the entries of every due bucket and write pending changes. Returns the number removed."""
+        with self._lock:
+            self._get_entries()
+            removed = self._sweep(now())
+            if removed or self._dirty:
+                self._save()
+            return removed
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._get_entries())
+
+class CooldownStore:
+    """Per-user action cooldowns on top of an ExpiringStore."""
+
+    def __init__(self, name: str, cooldowns: Dict[str, int]):
+        self.cooldowns = cooldowns
+        self._store = ExpiringStore(name, durable_ttl=DURABLE_COOLDOWN)
+
+    @staticmethod
+    def _key(user_id: int, action: str) -> str:
+        return f"{user_id}:{action}"
+
+    def is_active(self, user_id: int, action: str) -> bool:
+        """Check if an action is still on cooldown for a user."""
+        return self._store.remaining(self._key(user_id, action)) > 0
+
+    def remaining(self, user_id: int, action: str) -> int:
+        """Get the seconds left on a user's cooldown."""
+        return self._store.remaining(self._key(user_id, action))
+
+    def start(self, user_id: int, action: str) -> None:
+        """Start the cooldown of an action for a user."""
+        self._store.set(self._key(user_id, action), 1, self.cooldowns.get(action, 0))
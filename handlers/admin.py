@@ -1,15 +1,19 @@
 import logging
-import uuid
 import json
+import asyncio
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 import config
-from storage import (
-    get_user, save_user, create_promocode, add_custom_pokemon, add_pokemon_to_user,
-    get_all_users, get_custom_pokemon
-)
-from models.pokemon import Pokemon
+from storage import get_user, save_user
+from promocode_engine import create_promocode
+from user_scan import find_user_ids_by_usernames
 from pokemon_api import get_pokemon_data_sync
+from artwork_cache import warm_up_cache
+import broadcast
+import logging_setup
+import loop_watchdog
+import custom_pokemon_registry
+from bulk_grant import grant_pokemon
 
 logger = logging.getLogger(__name__)
 
@@ -27,7 +31,8 @@ async def admin_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         [InlineKeyboardButton("🧠 Создать уникального покемона", callback_data="admin_create_pokemon")],
         [InlineKeyboardButton("🎁 Выдать покемона игроку", callback_data="admin_give_pokemon")],
         [InlineKeyboardButton("💰 Изменить баланс пользователя", callback_data="admin_change_balance")],
-        [InlineKeyboardButton("🎁 Создать промокод", callback_data="admin_create_promocode")]
+        [InlineKeyboardButton("🎁 Создать промокод", callback_data="admin_create_promocode")],
+        [InlineKeyboardButton("📢 Рассылка всем игрокам", callback_data="admin_broadcast")]
     ]
     
     reply_markup = InlineKeyboardMarkup(keyboard)
@@ -39,6 +44,90 @@ async def admin_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         parse_mode="Markdown"
     )
 
+async def warm_artwork_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the /warm_artwork command - upload all Pokemon artwork to the cache chat."""
+    user_id = update.effective_user.id
+    
+    # Check if the user is an admin
+    if user_id not in config.ADMIN_IDS:
+        await update.message.reply_text("⛔ У вас нет доступа к панели администратора.")
+        return
+    
+    if not config.ARTWORK_CACHE_CHAT_ID:
+        await update.message.reply_text(
+            "❌ Кэш-чат для изображений не настроен.\n\n"
+            "Укажите ID приватного чата в переменной окружения ARTWORK_CACHE_CHAT_ID."
+        )
+        return
+    
+    status_message = await update.message.reply_text("⏳ Загружаем изображения покемонов в кэш-чат...")
+    
+    async def report_progress(done, total):
+        try:
+            await status_message.edit_text(f"⏳ Загружаем изображения покемонов в кэш-чат: {done}/{total}")
+        except Exception as e:
+            logger.warning(f"Не удалось обновить прогресс прогрева кэша: {e}")
+    
+    async def run_warm_up():
+        try:
+            uploaded, skipped, failed = await warm_up_cache(
+                context.bot,
+                config.ARTWORK_CACHE_CHAT_ID,
+                progress_callback=report_progress
+            )
+            await status_message.edit_text(
+                "✅ Кэш изображений прогрет!\n\n"
+                f"Загружено: {uploaded}\n"
+                f"Уже было в кэше: {skipped}\n"
+                f"Ошибок: {failed}"
+            )
+        except Exception as e:
+            logger.error(f"Ошибка при прогреве кэша изображений: {e}")
+            await status_message.edit_text(f"❌ Ошибка при прогреве кэша изображений: {e}")
+    
+    # Загрузка занимает несколько минут, поэтому выполняем ее в фоне
+    asyncio.create_task(run_warm_up())
+
+async def log_debug_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the /logdebug command - toggle detailed logging for the current chat."""
+    user_id = update.effective_user.id
+    chat_id = update.effective_chat.id
+    
+    # Check if the user is an admin
+    if user_id not in config.ADMIN_IDS:
+        await update.message.reply_text("⛔ У вас нет доступа к панели администратора.")
+        return
+    
+    # /logdebug on|off, без аргумента - переключение
+    if context.args and context.args[0].lower() in ("on", "off"):
+        enabled = context.args[0].lower() == "on"
+    else:
+        enabled = not logging_setup.is_chat_debug(chat_id)
+    
+    logging_setup.set_chat_debug(chat_id, enabled)
+    logger.info(f"Администратор {user_id} {'включил' if enabled else 'выключил'} подробное логирование чата {chat_id}")
+    await update.message.reply_text(
+        f"🔍 Подробное логирование для этого чата {'включено' if enabled else 'выключено'}."
+    )
+
+async def lag_report_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the /lagreport command - show the code that blocked the event loop."""
+    user_id = update.effective_user.id
+    
+    # Check if the user is an admin
+    if user_id not in config.ADMIN_IDS:
+        await update.message.reply_text("⛔ У вас нет доступа к панели администратора.")
+        return
+    
+    # /lagreport reset - очистить отчет
+    if context.args and context.args[0].lower() == "reset":
+        loop_watchdog.reset()
+        await update.message.reply_text("🧹 Отчет о блокировках цикла событий очищен.")
+        return
+    
+    # Без parse_mode: в стеках встречаются символы разметки; лимит сообщения 4096 символов
+    await update.message.reply_text(loop_watchdog.format_report()[:4000])
+
 async def admin_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle callback queries from the admin panel."""
     query = update.callback_query
@@ -49,10 +138,18 @@ async def admin_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await query.answer("⛔ У вас нет доступа к панели администратора.")
         return
     
-    await query.answer()
-    
     action = query.data
     
+    # На запрос можно ответить только один раз, поэтому текст ответа выбирается заранее
+    cancelled = None
+    if action.startswith("admin_broadcast_cancel_"):
+        cancelled = broadcast.cancel_job(action.replace("admin_broadcast_cancel_", ""))
+    
+    if cancelled is False:
+        await query.answer("Рассылка уже завершена или не найдена.", show_alert=True)
+    else:
+        await query.answer()
+    
     if action == "admin_create_pokemon":
         # Start the process of creating a custom Pokemon
         context.user_data["admin_state"] = "create_pokemon_name"
@@ -85,9 +182,28 @@ async def admin_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         context.user_data["admin_state"] = "give_pokemon_username"
         await query.edit_message_text(
             "🎁 *Выдача покемона игроку*\n\n"
-            "Введите @username пользователя Telegram (начиная с символа @):",
+            "Введите @username пользователя Telegram (начиная с символа @).\n"
+            "Чтобы выдать покемонов нескольким игрокам, перечислите их через запятую.",
+            parse_mode="Markdown"
+        )
+        
+    elif action == "admin_broadcast":
+        # Start the process of creating a broadcast
+        context.user_data["admin_state"] = "broadcast_text"
+        await query.edit_message_text(
+            "📢 *Рассылка всем игрокам*\n\n"
+            "Введите текст сообщения для рассылки:",
             parse_mode="Markdown"
         )
+    
+    elif action.startswith("admin_broadcast_cancel_"):
+        job_id = action.replace("admin_broadcast_cancel_", "")
+        
+        if cancelled:
+            await query.edit_message_text(
+                broadcast.get_job(job_id).get_progress_text(),
+                parse_mode="Markdown"
+            )
         
     elif action == "admin_back":
         # Go back to the main admin panel
@@ -95,7 +211,8 @@ async def admin_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             [InlineKeyboardButton("🧠 Создать уникального покемона", callback_data="admin_create_pokemon")],
             [InlineKeyboardButton("🎁 Выдать покемона игроку", callback_data="admin_give_pokemon")],
             [InlineKeyboardButton("💰 Изменить баланс пользователя", callback_data="admin_change_balance")],
-            [InlineKeyboardButton("🎁 Создать промокод", callback_data="admin_create_promocode")]
+            [InlineKeyboardButton("🎁 Создать промокод", callback_data="admin_create_promocode")],
+            [InlineKeyboardButton("📢 Рассылка всем игрокам", callback_data="admin_broadcast")]
         ]
         
         reply_markup = InlineKeyboardMarkup(keyboard)
@@ -244,40 +361,18 @@ async def handle_admin_message(update: Update, context: ContextTypes.DEFAULT_TYP
             types = [t.strip() for t in context.user_data["custom_pokemon_type"].split(",")]
             image_url = context.user_data["custom_pokemon_image_url"]
             
-            pokemon_data = {
-                "id": str(uuid.uuid4()),
-                "name": name,
-                "types": types,
-                "image_url": image_url,
-                "stats": {
-                    "attack": attack,
-                    "defense": defense,
-                    "hp": hp
-                },
-                "custom": True
-            }
-            
-            # Сохраняем пользовательского покемона
-            pokemon_id = add_custom_pokemon(pokemon_data)
-            
-            # Создаем объект покемона для добавления в коллекцию администратора
-            custom_pokemon = Pokemon.create_custom_pokemon(
-                name=name,
-                types=types,
-                attack=attack,
-                defense=defense,
-                hp=hp,
-                image_url=image_url
-            )
+            # Сохраняем пользовательского покемона в реестре
+            definition = custom_pokemon_registry.register(name, types, attack, defense, hp, image_url)
+            pokemon_id = definition["id"]
             
             # Добавляем покемона администратору (3 штуки)
             admin_msg = ""
             admin_user = get_user(user_id)
             
-            # Добавляем 3 копии покемона администратору
+            # Добавляем 3 копии покемона администратору, у каждой свой ID
             for i in range(3):
                 # Обходим ограничение на максимальное количество одинаковых покемонов
-                admin_user.pokemons.append(custom_pokemon)
+                admin_user.pokemons.append(custom_pokemon_registry.create_pokemon(definition))
                 admin_user.caught_pokemon_count += 1
             
             # Сохраняем обновленные данные администратора
@@ -539,19 +634,21 @@ async def handle_admin_message(update: Update, context: ContextTypes.DEFAULT_TYP
         return True
         
     elif admin_state == "create_promocode_reward_custom_pokemon":
-        # Получаем ID уникального покемона
-        custom_pokemon_id = message_text.strip()
+        # Получаем ID или имя уникального покемона
+        custom_pokemon_ref = message_text.strip()
         
-        # Проверка на существование уникального покемона
-        pokemon_data = get_custom_pokemon(custom_pokemon_id)
+        # Проверка на существование уникального покемона (по ID или новейший с таким именем)
+        pokemon_data = custom_pokemon_registry.resolve(custom_pokemon_ref)
         if not pokemon_data:
             await update.message.reply_text(
-                f"❌ Уникальный покемон с ID '{custom_pokemon_id}' не найден.\n\n"
-                "Введите корректный ID уникального покемона:",
+                f"❌ Уникальный покемон с ID '{custom_pokemon_ref}' не найден.\n\n"
+                "Введите корректный ID или имя уникального покемона:",
                 parse_mode="Markdown"
             )
             return True
-            
+        
+        custom_pokemon_id = pokemon_data["id"]
+
         code = context.user_data["promocode_code"]
         pokemon_name = pokemon_data["name"]
         
@@ -577,47 +674,60 @@ async def handle_admin_message(update: Update, context: ContextTypes.DEFAULT_TYP
         del context.user_data["promocode_code"]
         return True
         
+    elif admin_state == "broadcast_text":
+        job = broadcast.create_job(message_text, created_by=user_id, chat_id=update.effective_chat.id)
+        
+        status_message = await update.message.reply_text(
+            job.get_progress_text(),
+            reply_markup=broadcast.create_progress_keyboard(job),
+            parse_mode="Markdown"
+        )
+        job.progress_message_id = status_message.message_id
+        
+        broadcast.start_job(context.bot, job)
+        logger.info(f"Администратор {user_id} запустил рассылку {job.job_id}")
+        
+        # Clear the admin state
+        del context.user_data["admin_state"]
+        return True
+    
     elif admin_state == "give_pokemon_username":
+        # Можно указать несколько пользователей через запятую или пробел
+        usernames = [name for name in message_text.replace(",", " ").split() if name]
+        
         # Проверяем формат username
-        if not message_text.startswith('@'):
+        if not usernames or not all(name.startswith('@') and len(name) > 1 for name in usernames):
             await update.message.reply_text(
-                "❌ Неверный формат username. Введите @username пользователя Telegram:",
+                "❌ Неверный формат username. Введите @username пользователя Telegram "
+                "(несколько пользователей - через запятую):",
                 parse_mode="Markdown"
             )
             return True
-            
-        username = message_text[1:]  # Удаляем символ @
-        context.user_data["target_username"] = username
         
-        # Поиск пользователя по username
-        found_user = None
+        # Поиск пользователей по username
         try:
-            # Загружаем всех пользователей
-            all_users = get_all_users()
-            
-            for user_id, user_data in all_users.items():
-                # Проверяем наличие поля username в данных пользователя
-                if hasattr(user_data, 'username') and user_data.username and user_data.username.lower() == username.lower():
-                    found_user = user_data
-                    context.user_data["target_user_id"] = int(user_id)
-                    break
-                    
-            if found_user is None:
+            # Все пользователи ищутся за один проход по хранилищу
+            found = find_user_ids_by_usernames(usernames)
+            missing = [username for username, found_user_id in found.items() if found_user_id is None]
+            
+            if missing:
                 await update.message.reply_text(
-                    f"❌ Пользователь с username @{username} не найден в базе данных бота.\n\n"
-                    "Пользователь должен хотя бы раз начать общение с ботом командой /start",
-                    parse_mode="Markdown"
+                    "❌ Не найдены в базе данных бота: "
+                    + ", ".join(f"@{username}" for username in missing)
+                    + "\n\nПользователь должен хотя бы раз начать общение с ботом командой /start"
                 )
                 return True
-                
+            
+            context.user_data["target_users"] = found
+            
             # Переходим к выбору покемона для выдачи
             context.user_data["admin_state"] = "give_pokemon_name"
             
+            found_text = ", ".join(f"@{username}" for username in found)
             await update.message.reply_text(
-                f"✅ Пользователь @{username} найден!\n\n"
-                "Введите название покемона, которого вы хотите выдать пользователю\n"
-                "(можно ввести несколько имен через запятую для выдачи нескольких покемонов):",
-                parse_mode="Markdown"
+                f"✅ Найдено пользователей: {len(found)} ({found_text})\n\n"
+                "Введите название покемона, которого вы хотите выдать\n"
+                "(можно ввести несколько имен через запятую для выдачи нескольких покемонов):"
             )
             
         except Exception as e:
@@ -629,89 +739,33 @@ async def handle_admin_message(update: Update, context: ContextTypes.DEFAULT_TYP
             )
             # Сбрасываем состояние
             del context.user_data["admin_state"]
-            if "target_username" in context.user_data:
-                del context.user_data["target_username"]
+            context.user_data.pop("target_users", None)
                 
         return True
         
     elif admin_state == "give_pokemon_name":
-        pokemon_names = [name.strip() for name in message_text.split(',')]
-        target_username = context.user_data["target_username"]
-        target_user_id = context.user_data["target_user_id"]
-        target_user = get_user(target_user_id)
-        
-        if target_user is None:
-            await update.message.reply_text(
-                f"❌ Ошибка: пользователь с ID {target_user_id} не найден.",
-                parse_mode="Markdown"
-            )
-            # Сбрасываем состояние
-            del context.user_data["admin_state"]
-            del context.user_data["target_username"]
-            del context.user_data["target_user_id"]
-            return True
+        pokemon_names = [name.strip() for name in message_text.split(',') if name.strip()]
+        target_users = context.user_data["target_users"]
         
-        successful = []
-        failed = []
-        
-        for pokemon_name in pokemon_names:
-            try:
-                # Получаем данные покемона
-                try:
-                    # Пытаемся получить данные из API напрямую (асинхронно)
-                    from pokemon_api import get_pokemon_data
-                    pokemon_data = await get_pokemon_data(pokemon_name.lower())
-                    
-                    if pokemon_data:
-                        # Если данные получены, создаем покемона
-                        pokemon = Pokemon.create_from_data(pokemon_data)
-                    else:
-                        # Проверяем, может быть это кастомный покемон
-                        custom_pokemons = get_custom_pokemon(pokemon_name)
-                        if custom_pokemons:
-                            # Используем первого найденного кастомного покемона
-                            pokemon_data = next(iter(custom_pokemons.values()))
-                            pokemon = Pokemon.from_dict(pokemon_data)
-                        else:
-                            pokemon = None
-                except Exception as e:
-                    logger.error(f"Ошибка при получении данных покемона {pokemon_name}: {e}")
-                    custom_pokemons = get_custom_pokemon(pokemon_name)
-                    if custom_pokemons:
-                        # Используем первого найденного кастомного покемона
-                        pokemon_data = next(iter(custom_pokemons.values()))
-                        pokemon = Pokemon.from_dict(pokemon_data)
-                    else:
-                        pokemon = None
-                
-                if pokemon is None:
-                    failed.append(f"{pokemon_name} (не найден)")
-                    continue
-                
-                # Добавляем покемона пользователю
-                if add_pokemon_to_user(target_user_id, pokemon):
-                    successful.append(pokemon_name)
-                else:
-                    failed.append(f"{pokemon_name} (ошибка добавления)")
-                    
-            except Exception as e:
-                logger.error(f"Ошибка при выдаче покемона {pokemon_name}: {e}")
-                failed.append(f"{pokemon_name} (ошибка: {str(e)})")
+        # Имена разрешаются параллельно, затем каждый пользователь сохраняется один раз
+        results = await grant_pokemon(list(target_users.values()), pokemon_names)
         
         # Формируем сообщение о результате
-        result_message = f"📊 *Результат выдачи покемонов пользователю @{target_username}:*\n\n"
-        
-        if successful:
-            result_message += "✅ Успешно выдано:\n"
-            for name in successful:
-                result_message += f"- {name}\n"
+        result_message = "📊 *Результат выдачи покемонов:*\n"
         
-        if failed:
+        for username, target_user_id in target_users.items():
+            successful, failed = results[target_user_id]
+            result_message += f"\n*@{username}*\n"
+            
             if successful:
-                result_message += "\n"
-            result_message += "❌ Не удалось выдать:\n"
-            for name in failed:
-                result_message += f"- {name}\n"
+                result_message += "✅ Успешно выдано:\n"
+                for name in successful:
+                    result_message += f"- {name}\n"
+            
+            if failed:
+                result_message += "❌ Не удалось выдать:\n"
+                for name in failed:
+                    result_message += f"- {name}\n"
         
         await update.message.reply_text(
             result_message,
@@ -720,8 +774,7 @@ async def handle_admin_message(update: Update, context: ContextTypes.DEFAULT_TYP
         
         # Сбрасываем состояние
         del context.user_data["admin_state"]
-        del context.user_data["target_username"]
-        del context.user_data["target_user_id"]
+        del context.user_data["target_users"]
         
         return True
     
@@ -2,14 +2,23 @@ import logging
 import random
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
-from storage import (
-    get_user, start_battle, get_battle, set_user_ready_for_battle,
-    finish_battle
+from storage import get_user, save_user
+from battle_sessions import (
+    RESOLVED, create_battle, get_battle, accept_battle, decline_battle,
+    select_pokemon, finish_battle, cancel_battle
 )
-import config
+from battle_power import get_battle_power, get_battle_stats
+from battle_sim import Combatant, simulate, format_log
+from economy import BATTLE_RANDOM_FACTOR, battle_reward
+from pokemon_index import find_pokemon
+from handlers.pokemon_picker import create_picker_keyboard, parse_picker_action, resolve_selection
 
 logger = logging.getLogger(__name__)
 
+# Compact role codes used in picker callbacks
+ROLE_CODES = {"challenger": "c", "opponent": "o"}
+ROLES_BY_CODE = {code: role for role, code in ROLE_CODES.items()}
+
 async def battle_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the /battle command - initiate a battle with another user."""
     # Check if the command is a reply to another user's message
@@ -46,7 +55,7 @@ async def battle_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         return
     
     # Start a battle
-    battle_id = start_battle(challenger_id, opponent_id)
+    battle_id = create_battle(challenger_id, opponent_id)["id"]
     
     # Store the battle ID in the context
     context.user_data["current_battle"] = battle_id
@@ -94,8 +103,10 @@ async def battle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                 await query.edit_message_text("This battle challenge is not for you.")
                 return
             
-            # Mark the opponent as ready
-            set_user_ready_for_battle(battle_id, user_id)
+            # Accept the challenge (only once, even if the button is pressed twice)
+            if not accept_battle(battle_id, user_id):
+                await query.edit_message_text("This battle challenge has already been accepted.")
+                return
             
             # Get the users
             challenger = get_user(battle["user1_id"])
@@ -135,6 +146,11 @@ async def battle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                 await query.edit_message_text("This battle challenge is not for you.")
                 return
             
+            # Remove the challenge
+            if not decline_battle(battle_id, user_id):
+                await query.edit_message_text("This battle is no longer available.")
+                return
+            
             # Let the challenger know the battle was declined
             await context.bot.send_message(
                 chat_id=battle["user1_id"],
@@ -143,81 +159,108 @@ async def battle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             
             await query.edit_message_text("You declined the battle challenge.")
             
+        elif action == "pick" and battle_id:
+            # Paginated Pokemon picker: page change or selection
+            role = ROLES_BY_CODE.get(parts[3])
+            picker_action, value, number = parse_picker_action(parts[4:])
+            
+            if picker_action == "page":
+                user = get_user(user_id)
+                await query.edit_message_reply_markup(
+                    reply_markup=create_pokemon_selection_keyboard(user, battle_id, role, sort=value, page=number)
+                )
+            elif picker_action == "select":
+                user = get_user(user_id)
+                selected_pokemon = resolve_selection(user, number, value)
+                if not selected_pokemon:
+                    await query.edit_message_text(
+                        "Your collection has changed. Select your Pokemon for battle:",
+                        reply_markup=create_pokemon_selection_keyboard(user, battle_id, role)
+                    )
+                    return
+                await select_battle_pokemon(query, context, battle_id, role, user_id, selected_pokemon)
+            
         elif action == "select" and battle_id:
-            # This is a Pokemon selection callback
-            # Extract the role and Pokemon index
+            # Selection from keyboards sent before the paginated picker
             role = parts[3]
             pokemon_index = int(parts[4])
             
-            # Get the battle
-            battle = get_battle(battle_id)
-            if not battle:
-                await query.edit_message_text("This battle is no longer available.")
-                return
-            
-            # Make sure this user is in the battle
-            if (role == "challenger" and user_id != battle["user1_id"]) or \
-               (role == "opponent" and user_id != battle["user2_id"]):
-                await query.edit_message_text("This battle is not for you.")
-                return
-            
-            # Get the user and their Pokemon
             user = get_user(user_id)
             if pokemon_index >= len(user.pokemons):
                 await query.edit_message_text("Invalid Pokemon selection.")
                 return
             
-            selected_pokemon = user.pokemons[pokemon_index]
-            
-            # Store the selected Pokemon in the battle
-            if role == "challenger":
-                battle["challenger_pokemon"] = selected_pokemon
-                battle["user1_ready"] = True
-            else:
-                battle["opponent_pokemon"] = selected_pokemon
-                battle["user2_ready"] = True
-            
-            await query.edit_message_text(f"You selected {selected_pokemon.name} for battle! Waiting for opponent...")
-            
-            # If both users have selected their Pokemon, start the battle
-            if battle.get("user1_ready") and battle.get("user2_ready"):
-                await execute_battle(context, battle_id)
+            await select_battle_pokemon(query, context, battle_id, role, user_id, user.pokemons[pokemon_index])
                 
     except Exception as e:
         logger.error(f"Error in battle callback: {e}")
         await query.edit_message_text(f"An error occurred: {str(e)}")
 
-def create_pokemon_selection_keyboard(user, battle_id, role):
-    """Create a keyboard for selecting Pokemon for battle."""
-    keyboard = []
-    for i, pokemon in enumerate(user.pokemons):
-        button = InlineKeyboardButton(
-            f"{pokemon.name} (CP: {pokemon.calculate_cp()})",
-            callback_data=f"battle_select_{battle_id}_{role}_{i}"
-        )
-        keyboard.append([button])
-    
-    return InlineKeyboardMarkup(keyboard)
-
-async def execute_battle(context, battle_id):
-    """Execute a battle between two users."""
+async def select_battle_pokemon(query, context, battle_id, role, user_id, selected_pokemon):
+    """Store a user's Pokemon choice and start the battle once both have chosen."""
     # Get the battle
     battle = get_battle(battle_id)
     if not battle:
+        await query.edit_message_text("This battle is no longer available.")
+        return
+    
+    # Make sure this user is in the battle
+    if (role == "challenger" and user_id != battle["user1_id"]) or \
+       (role == "opponent" and user_id != battle["user2_id"]):
+        await query.edit_message_text("This battle is not for you.")
+        return
+    
+    # Store the selected Pokemon in the battle
+    battle = select_pokemon(battle_id, role, user_id, selected_pokemon.pokemon_id)
+    if not battle:
+        await query.edit_message_text("You have already selected your Pokemon for this battle.")
         return
     
+    await query.edit_message_text(f"You selected {selected_pokemon.name} for battle! Waiting for opponent...")
+    
+    # Only the selection that completed the battle resolves it
+    if battle["state"] == RESOLVED:
+        await execute_battle(context, battle)
+
+def create_pokemon_selection_keyboard(user, battle_id, role, sort="c", page=0):
+    """Create a paginated keyboard for selecting Pokemon for battle."""
+    return create_picker_keyboard(user, f"battle_pick_{battle_id}_{ROLE_CODES[role]}", sort=sort, page=page)
+
+async def execute_battle(context, battle):
+    """Execute a resolved battle between two users."""
+    battle_id = battle["id"]
+    
     # Get the users and their Pokemon
     challenger = get_user(battle["user1_id"])
     opponent = get_user(battle["user2_id"])
-    challenger_pokemon = battle["challenger_pokemon"]
-    opponent_pokemon = battle["opponent_pokemon"]
+    challenger_pokemon = find_pokemon(challenger, battle["challenger_pokemon_id"])
+    opponent_pokemon = find_pokemon(opponent, battle["opponent_pokemon_id"])
+    
+    # A selected Pokemon may have been traded away in the meantime
+    if not challenger_pokemon or not opponent_pokemon:
+        cancel_battle(battle_id)
+        for chat_id in (challenger.user_id, opponent.user_id):
+            await context.bot.send_message(
+                chat_id=chat_id,
+                text="⚠️ The battle was cancelled: a selected Pokemon is no longer available."
+            )
+        return
     
     # Calculate Pokemon power with league and trainer bonuses
     challenger_power = calculate_battle_power(challenger, challenger_pokemon)
     opponent_power = calculate_battle_power(opponent, opponent_pokemon)
     
+    # Simulate the battle turn by turn; the seed is logged so it can be replayed
+    seed = random.getrandbits(32)
+    result = simulate(
+        Combatant(challenger_pokemon.name, tuple(challenger_pokemon.types), *get_battle_stats(challenger, challenger_pokemon)),
+        Combatant(opponent_pokemon.name, tuple(opponent_pokemon.types), *get_battle_stats(opponent, opponent_pokemon)),
+        seed=seed
+    )
+    logger.info(f"Battle {battle_id} simulated with seed {seed}: winner side {result.winner} after {result.turns} turns")
+    
     # Determine the winner
-    if challenger_power > opponent_power:
+    if result.winner == 0:
         winner_id = challenger.user_id
         loser_id = opponent.user_id
         winner_pokemon = challenger_pokemon
@@ -235,14 +278,18 @@ async def execute_battle(context, battle_id):
     # Calculate the reward (based on the difference in power)
     reward = calculate_battle_reward(winner_power, loser_power)
     
-    # Finish the battle
-    finish_battle(battle_id, winner_id, loser_id, reward)
+    # Pay the reward and finish the battle
+    winner = challenger if winner_id == challenger.user_id else opponent
+    winner.balance += reward
+    save_user(winner)
+    finish_battle(battle_id, winner_id=winner_id, loser_id=loser_id, reward=reward)
     
     # Prepare the battle result message
     battle_result = (
         f"⚔️ *Battle Results* ⚔️\n\n"
         f"{challenger.get_display_name()}'s {challenger_pokemon.name} (Power: {challenger_power}) "
         f"VS {opponent.get_display_name()}'s {opponent_pokemon.name} (Power: {opponent_power})\n\n"
+        f"{format_log(result, (challenger_pokemon.name, opponent_pokemon.name))}\n\n"
         f"🏆 Winner: {get_user(winner_id).get_display_name()}'s {winner_pokemon.name}\n"
         f"💰 Reward: {reward} coins\n\n"
         f"Better luck next time, {get_user(loser_id).get_display_name()}!"
@@ -264,40 +311,10 @@ async def execute_battle(context, battle_id):
 
 def calculate_battle_power(user, pokemon):
     """Calculate a Pokemon's battle power with league and trainer bonuses."""
-    # Get the base Pokemon power (CP)
-    base_power = pokemon.calculate_cp()
-    
-    # Apply league bonuses
-    league_data = config.LEAGUES.get(user.league, config.LEAGUES[1])
-    attack_bonus = league_data.get("attack_bonus", 0)
-    defense_bonus = league_data.get("defense_bonus", 0)
-    health_bonus = league_data.get("health_bonus", 0)
-    
-    # Apply trainer bonuses if the user has a trainer
-    trainer_bonus = 1.0
-    if user.trainer:
-        trainer_data = config.TRAINERS.get(user.trainer.lower(), {})
-        trainer_bonus += trainer_data.get("power_bonus", 0)
-    
-    # Calculate total power
-    total_power = base_power * trainer_bonus
-    
-    # Add stat bonuses
-    total_power += (attack_bonus + defense_bonus + health_bonus)
-    
-    return int(total_power)
+    return get_battle_power(user, pokemon)
 
 def calculate_battle_reward(winner_power, loser_power):
     """Calculate the reward for winning a battle."""
-    # Base reward
-    base_reward = 500
-    
-    # Bonus based on power difference (with a cap)
-    power_difference = max(0, winner_power - loser_power)
-    power_bonus = min(1000, power_difference / 10)
-    
     # Random factor (80% to 120% of the calculated reward)
-    random_factor = random.uniform(0.8, 1.2)
-    
-    total_reward = int((base_reward + power_bonus) * random_factor)
-    return total_reward
+    random_factor = random.uniform(*BATTLE_RANDOM_FACTOR)
+    return int(battle_reward(winner_power, loser_power, random_factor))
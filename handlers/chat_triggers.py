@@ -0,0 +1,41 @@
+"""
+Phrases that summon and catch Pokemon in chats.
+
+Shared by the group message handler (start.py) and update_recorder.py, which
+keeps these phrases when it anonymises recorded messages so that a replay
+summons and catches exactly where the real chat did.
+"""
+
+# Группа с расширенным набором команд
+SPECIAL_GROUP_ID = -1002435502062
+
+# Сообщения, целиком являющиеся командой призыва (в нижнем регистре)
+SUMMON_PHRASES = (
+    "призвать", "покемон призыв", "вызвать покемон", "вызвать покемона", "зови покемон",
+    "зови покемона", "призови покемона", "покемон", "👾 покемон"
+)
+# Начало сообщения, которое тоже считается призывом ("призвать покемона")
+SUMMON_PREFIX = "призвать покемон"
+
+# Слова ловли: сообщение, содержащее любое из них, - попытка поймать покемона
+CATCH_WORDS = (
+    "ловлю", "поймать", "catch", "ловить", "схватить", "ловля",
+    "поймал", "лови его", "хватай", "лови", "бросить покебол"
+)
+
+# В специальной группе призывом считается любое сообщение с этими словами
+SPECIAL_SUMMON_WORDS = ("покемон", "поке", "призвать", "призыв", "вызвать", "pokemon")
+# и список слов ловли шире
+SPECIAL_CATCH_WORDS = (
+    "поймаю", "ловите", "захват", "беру", "моё", "мой",
+    "хочу", "нужен", "забираю", "словить", "словлю",
+    "ловушка", "выбираю", "я выбираю тебя", "покебол"
+)
+
+# Все слова, которые ищутся внутри сообщения
+TRIGGER_WORDS = CATCH_WORDS + SPECIAL_SUMMON_WORDS + SPECIAL_CATCH_WORDS
+
+def is_summon_phrase(text: str) -> bool:
+    """Check if a whole message is a summon command."""
+    text = text.lower().strip()
+    return text in SUMMON_PHRASES or text.startswith(SUMMON_PREFIX)
@@ -4,6 +4,7 @@ from telegram.ext import ContextTypes
 from storage import get_user, get_user_pokemon, save_user
 from pokemon_api import can_evolve
 from models.pokemon import Pokemon
+from trade_engine import is_escrowed
 
 logger = logging.getLogger(__name__)
 
@@ -23,8 +24,8 @@ async def evolution_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     # Get the Pokemon name
     pokemon_name = context.args[0].lower()
     
-    # Get the user's Pokemon with this name
-    user_pokemon = get_user_pokemon(user_id, pokemon_name)
+    # Get the user's Pokemon with this name (Pokemon offered in a trade can't be used)
+    user_pokemon = [p for p in get_user_pokemon(user_id, pokemon_name) if not is_escrowed(p.pokemon_id)]
     
     # Check if the user has enough of this Pokemon
     if len(user_pokemon) < 3:
@@ -56,7 +57,7 @@ async def evolution_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     removed_count = 0
     pokemon_ids_to_remove = []
     for pokemon in user.pokemons:
-        if pokemon.name.lower() == pokemon_name and removed_count < 3:
+        if pokemon.name.lower() == pokemon_name and removed_count < 3 and not is_escrowed(pokemon.pokemon_id):
             pokemon_ids_to_remove.append(pokemon.pokemon_id)
             removed_count += 1
     
@@ -4,32 +4,30 @@
 
 import asyncio
 import random
-from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Union, Tuple
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
-from storage import get_user, save_user, get_all_users
+from storage import get_user, save_user
+from expiring_store import CooldownStore, ExpiringStore
+from quiz_bank import get_question
+from economy import (
+    GAME_COOLDOWNS, SLOT_SYMBOLS, SLOT_WEIGHTS, GUESS_NUMBER_RANGE, GUESS_NUMBER_REWARD,
+    QUIZ_REWARD, DAILY_DOUBLE_CHANCE, dice_payout, slots_outcome, daily_bonus
+)
 
-# Словарь для хранения времени последнего использования игры каждым пользователем
-# Формат: {user_id: {game_name: datetime}}
-user_cooldowns = {}
+# Время жизни незавершенной игры в секундах
+GAME_SESSION_TTL = 15 * 60
 
-# Время ожидания между играми в секундах
-GAME_COOLDOWNS = {
-    "dice": 3600,  # 1 час
-    "slots": 1800,  # 30 минут
-    "guess_number": 600,  # 10 минут
-    "pokemon_quiz": 1200,  # 20 минут
-    "daily": 86400,  # 24 часа
-}
+# Кулдауны игр сохраняются на диск и переживают перезапуск бота
+user_cooldowns = CooldownStore("game_cooldowns", GAME_COOLDOWNS)
 
-# Активные игры "Угадай число"
-active_guess_games = {}
+# Активные игры "Угадай число": {user_id: загаданное число}
+active_guess_games = ExpiringStore("guess_games")
 
-# Активные игры "Покемон-викторина"
-active_quiz_games = {}
+# Активные игры "Покемон-викторина": {user_id: данные вопроса}
+active_quiz_games = ExpiringStore("quiz_games")
 
 
 async def games_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -133,7 +131,7 @@ async def handle_dice_game(query, user):
     dice_result = random.randint(1, 6)
     
     # Рассчитываем выигрыш
-    winnings = dice_result * 10
+    winnings = dice_payout(dice_result)
     user.balance += winnings
     save_user(user)
     
@@ -172,39 +170,25 @@ async def handle_slots_game(query, user):
         )
         return
     
-    # Символы для слотов
-    symbols = ["🍇", "🍊", "🍒", "🍋", "🍉", "🍓", "💎"]
-    weights = [20, 20, 20, 15, 15, 8, 2]  # Вероятности выпадения
-    
     # Генерируем результаты
-    result = random.choices(symbols, weights=weights, k=3)
+    result = random.choices(SLOT_SYMBOLS, weights=SLOT_WEIGHTS, k=3)
     
     # Определяем выигрыш
-    winnings = 0
+    outcome, winnings = slots_outcome(result)
     result_text = " | ".join(result)
     
-    if result[0] == result[1] == result[2]:
+    if outcome == "jackpot":
         # Джекпот - все три символа совпадают
-        if result[0] == "💎":
-            winnings = 500  # Специальный джекпот для бриллиантов
-        else:
-            winnings = 100
         result_description = f"*ДЖЕКПОТ!* Три одинаковых символа! +{winnings} 💰"
-    elif result[0] == result[1] or result[1] == result[2] or result[0] == result[2]:
+    elif outcome == "pair":
         # Два совпадающих символа
-        if (result[0] == "💎" and result[1] == "💎") or (result[1] == "💎" and result[2] == "💎") or (result[0] == "💎" and result[2] == "💎"):
-            winnings = 100  # Специальный выигрыш для двух бриллиантов
-        else:
-            winnings = 20
         result_description = f"*Удача!* Два одинаковых символа! +{winnings} 💰"
-    elif "💎" in result:
+    elif outcome == "diamonds":
         # Есть хотя бы один бриллиант
         diamond_count = result.count("💎")
-        winnings = 10 * diamond_count
         result_description = f"*Неплохо!* {diamond_count} бриллиант(ов)! +{winnings} 💰"
     else:
         # Ничего не совпало
-        winnings = 0
         result_description = "*Не повезло!* Попробуйте еще раз."
     
     # Обновляем баланс
@@ -246,8 +230,8 @@ async def handle_guess_number_game(query, user):
         return
     
     # Генерируем случайное число от 1 до 10
-    secret_number = random.randint(1, 10)
-    active_guess_games[user_id] = secret_number
+    secret_number = random.randint(1, GUESS_NUMBER_RANGE)
+    active_guess_games.set(str(user_id), secret_number, GAME_SESSION_TTL)
     
     # Создаем клавиатуру с числами
     keyboard = []
@@ -275,8 +259,9 @@ async def process_guess_number(query, user, guessed_number):
     """Обработка ответа в игре 'Угадай число'."""
     user_id = user.user_id
     
-    # Проверяем, есть ли активная игра
-    if user_id not in active_guess_games:
+    # Проверяем, есть ли активная игра, и удаляем ее после хода
+    secret_number = active_guess_games.pop(str(user_id))
+    if secret_number is None:
         await query.edit_message_text(
             "Ошибка: игра не найдена. Пожалуйста, начните новую игру.",
             reply_markup=InlineKeyboardMarkup([
@@ -285,13 +270,10 @@ async def process_guess_number(query, user, guessed_number):
         )
         return
     
-    secret_number = active_guess_games[user_id]
-    del active_guess_games[user_id]  # Удаляем игру после хода
-    
     # Определяем результат
     if guessed_number == secret_number:
         # Победа
-        winnings = 50
+        winnings = GUESS_NUMBER_REWARD
         user.balance += winnings
         result_text = f"🎉 *Правильно!*\nЗагаданное число: {secret_number}\nВы выиграли {winnings} 💰"
     else:
@@ -332,9 +314,9 @@ async def handle_pokemon_quiz(query, user, context):
         )
         return
     
-    # Загружаем данные для викторины из контекста
-    quiz_data = await generate_pokemon_quiz()
-    active_quiz_games[user_id] = quiz_data
+    # Вопрос из банка, который пользователь давно не видел
+    quiz_data = generate_pokemon_quiz(user_id)
+    active_quiz_games.set(str(user_id), quiz_data, GAME_SESSION_TTL)
     
     # Создаем клавиатуру с вариантами ответов
     keyboard = []
@@ -354,178 +336,18 @@ async def handle_pokemon_quiz(query, user, context):
     )
 
 
-async def generate_pokemon_quiz() -> Dict:
-    """Генерирует случайный вопрос для покемон-викторины."""
-    # Список типов вопросов
-    question_types = [
-        "type_question",
-        "evolution_question",
-        "generation_question",
-        "ability_question"
-    ]
-    
-    # Выбираем случайный тип вопроса
-    question_type = random.choice(question_types)
-    
-    # Генерируем вопрос на основе выбранного типа
-    if question_type == "type_question":
-        # Вопрос о типе покемона
-        pokemon_types = [
-            "Огненный", "Водный", "Травяной", "Электрический", 
-            "Ледяной", "Боевой", "Ядовитый", "Земляной", 
-            "Летающий", "Психический", "Насекомый", "Каменный", 
-            "Призрачный", "Драконий", "Темный", "Стальной", "Волшебный"
-        ]
-        
-        pokemon_list = [
-            ("Пикачу", "Электрический"),
-            ("Чармандер", "Огненный"),
-            ("Бульбазавр", "Травяной"),
-            ("Сквиртл", "Водный"),
-            ("Джиглипафф", "Волшебный"),
-            ("Генгар", "Призрачный"),
-            ("Драгонайт", "Драконий"),
-            ("Магикарп", "Водный"),
-            ("Мьюту", "Психический"),
-            ("Снорлакс", "Нормальный")
-        ]
-        
-        # Выбираем случайного покемона
-        pokemon, correct_type = random.choice(pokemon_list)
-        
-        # Генерируем варианты ответов
-        options = [correct_type]
-        while len(options) < 4:
-            random_type = random.choice(pokemon_types)
-            if random_type not in options:
-                options.append(random_type)
-        
-        # Перемешиваем варианты
-        random.shuffle(options)
-        
-        # Определяем правильный ответ
-        correct_answer = options.index(correct_type)
-        
-        return {
-            "question": f"Какого типа покемон {pokemon}?",
-            "options": options,
-            "correct_answer": correct_answer
-        }
-    
-    elif question_type == "evolution_question":
-        # Вопрос об эволюции покемона
-        evolution_pairs = [
-            ("Пикачу", "Райчу"),
-            ("Чармандер", "Чармелеон"),
-            ("Бульбазавр", "Ивизавр"),
-            ("Сквиртл", "Вартортл"),
-            ("Гастли", "Хонтер"),
-            ("Иви", "Вапореон"),
-            ("Абра", "Кадабра"),
-            ("Магикарп", "Гиарадос"),
-            ("Дратини", "Драгонэйр"),
-            ("Поливаг", "Поливирл")
-        ]
-        
-        # Выбираем случайную пару эволюций
-        base_pokemon, evolved_pokemon = random.choice(evolution_pairs)
-        
-        # Генерируем неправильные варианты
-        all_evolved = [pair[1] for pair in evolution_pairs]
-        wrong_options = [evo for evo in all_evolved if evo != evolved_pokemon]
-        options = [evolved_pokemon] + random.sample(wrong_options, 3)
-        
-        # Перемешиваем варианты
-        random.shuffle(options)
-        
-        # Определяем правильный ответ
-        correct_answer = options.index(evolved_pokemon)
-        
-        return {
-            "question": f"В какого покемона эволюционирует {base_pokemon}?",
-            "options": options,
-            "correct_answer": correct_answer
-        }
-    
-    elif question_type == "generation_question":
-        # Вопрос о поколении покемона
-        generation_data = [
-            ("Пикачу", "Первое"),
-            ("Чикорита", "Второе"),
-            ("Мадкип", "Третье"),
-            ("Чимчар", "Четвертое"),
-            ("Ошавотт", "Пятое"),
-            ("Фрокки", "Шестое"),
-            ("Роулет", "Седьмое"),
-            ("Скорбанни", "Восьмое")
-        ]
-        
-        # Выбираем случайного покемона
-        pokemon, correct_gen = random.choice(generation_data)
-        
-        # Генерируем варианты ответов
-        generations = ["Первое", "Второе", "Третье", "Четвертое", "Пятое", "Шестое", "Седьмое", "Восьмое"]
-        options = [correct_gen]
-        while len(options) < 4:
-            random_gen = random.choice(generations)
-            if random_gen not in options:
-                options.append(random_gen)
-        
-        # Перемешиваем варианты
-        random.shuffle(options)
-        
-        # Определяем правильный ответ
-        correct_answer = options.index(correct_gen)
-        
-        return {
-            "question": f"К какому поколению относится покемон {pokemon}?",
-            "options": options,
-            "correct_answer": correct_answer
-        }
-    
-    else:  # ability_question
-        # Вопрос о способности покемона
-        ability_data = [
-            ("Пикачу", "Статическое электричество"),
-            ("Чармандер", "Солнечная сила"),
-            ("Бульбазавр", "Хлорофилл"),
-            ("Сквиртл", "Шелковый панцирь"),
-            ("Генгар", "Левитация"),
-            ("Слоубро", "Собственный темп"),
-            ("Мачамп", "Непробиваемый"),
-            ("Алаказам", "Внутренний фокус"),
-            ("Гиарадос", "Запугивание"),
-            ("Драгонайт", "Мультисила")
-        ]
-        
-        # Выбираем случайного покемона
-        pokemon, correct_ability = random.choice(ability_data)
-        
-        # Генерируем варианты ответов
-        all_abilities = [data[1] for data in ability_data]
-        options = [correct_ability]
-        wrong_options = [ability for ability in all_abilities if ability != correct_ability]
-        options.extend(random.sample(wrong_options, 3))
-        
-        # Перемешиваем варианты
-        random.shuffle(options)
-        
-        # Определяем правильный ответ
-        correct_answer = options.index(correct_ability)
-        
-        return {
-            "question": f"Какая способность у покемона {pokemon}?",
-            "options": options,
-            "correct_answer": correct_answer
-        }
+def generate_pokemon_quiz(user_id: Optional[int] = None) -> Dict:
+    """Генерирует случайный вопрос для покемон-викторины из локального банка вопросов."""
+    return get_question(user_id)
 
 
 async def process_pokemon_quiz_answer(query, user, answer_index):
     """Обработка ответа в игре 'Покемон-викторина'."""
     user_id = user.user_id
     
-    # Проверяем, есть ли активная игра
-    if user_id not in active_quiz_games:
+    # Проверяем, есть ли активная игра, и удаляем ее после ответа
+    quiz_data = active_quiz_games.pop(str(user_id))
+    if quiz_data is None:
         await query.edit_message_text(
             "Ошибка: викторина не найдена. Пожалуйста, начните новую игру.",
             reply_markup=InlineKeyboardMarkup([
@@ -534,14 +356,12 @@ async def process_pokemon_quiz_answer(query, user, answer_index):
         )
         return
     
-    quiz_data = active_quiz_games[user_id]
     correct_answer = quiz_data["correct_answer"]
-    del active_quiz_games[user_id]  # Удаляем игру после ответа
     
     # Определяем результат
     if answer_index == correct_answer:
         # Правильный ответ
-        winnings = 80
+        winnings = QUIZ_REWARD
         user.balance += winnings
         result_text = f"🎉 *Правильно!*\nВы выиграли {winnings} 💰"
     else:
@@ -586,24 +406,22 @@ async def handle_daily_bonus(query, user):
     # Начисляем бонус
     # Размер бонуса зависит от лиги игрока
     league_id = getattr(user, 'league', 0) or 0
-    base_bonus = 100
-    league_multiplier = 1 + (league_id * 0.2)  # Увеличиваем на 20% за каждую лигу
-    bonus = int(base_bonus * league_multiplier)
     
     # Шанс на двойной бонус (10%)
-    if random.random() < 0.1:
-        bonus *= 2
+    doubled = random.random() < DAILY_DOUBLE_CHANCE
+    bonus = int(daily_bonus(league_id, doubled))
+    if doubled:
         bonus_text = f"🎉 *ДВОЙНОЙ БОНУС!* Вы получили {bonus} 💰"
     else:
         bonus_text = f"🎁 Вы получили ежедневный бонус в размере {bonus} 💰"
     
+    # Кулдаун ставится до начисления, чтобы сбой не позволил получить бонус дважды
+    set_cooldown(user_id, "daily")
+    
     # Обновляем баланс
     user.balance += bonus
     save_user(user)
     
-    # Устанавливаем кулдаун
-    set_cooldown(user_id, "daily")
-    
     # Отображаем результат
     await query.edit_message_text(
         f"💰 *Ежедневный бонус*\n\n"
@@ -619,39 +437,17 @@ async def handle_daily_bonus(query, user):
 
 def is_on_cooldown(user_id: int, game_name: str) -> bool:
     """Проверяет, находится ли игра на кулдауне для пользователя."""
-    if user_id not in user_cooldowns:
-        return False
-    
-    if game_name not in user_cooldowns[user_id]:
-        return False
-    
-    last_play_time = user_cooldowns[user_id][game_name]
-    cooldown_seconds = GAME_COOLDOWNS.get(game_name, 0)
-    
-    return datetime.now() < last_play_time + timedelta(seconds=cooldown_seconds)
+    return user_cooldowns.is_active(user_id, game_name)
 
 
 def get_cooldown_remaining(user_id: int, game_name: str) -> int:
     """Возвращает оставшееся время кулдауна в секундах."""
-    if user_id not in user_cooldowns or game_name not in user_cooldowns[user_id]:
-        return 0
-    
-    last_play_time = user_cooldowns[user_id][game_name]
-    cooldown_seconds = GAME_COOLDOWNS.get(game_name, 0)
-    cooldown_end = last_play_time + timedelta(seconds=cooldown_seconds)
-    
-    if datetime.now() >= cooldown_end:
-        return 0
-    
-    return int((cooldown_end - datetime.now()).total_seconds())
+    return user_cooldowns.remaining(user_id, game_name)
 
 
 def set_cooldown(user_id: int, game_name: str) -> None:
     """Устанавливает кулдаун для игры."""
-    if user_id not in user_cooldowns:
-        user_cooldowns[user_id] = {}
-    
-    user_cooldowns[user_id][game_name] = datetime.now()
+    user_cooldowns.start(user_id, game_name)
 
 
 def format_time_remaining(seconds: int) -> str:
@@ -3,6 +3,7 @@ from telegram import Update
 from telegram.ext import ContextTypes
 from storage import get_user
 from pokemon_api import get_pokemon_image_url
+from artwork_cache import send_pokemon_photo
 import config
 
 logger = logging.getLogger(__name__)
@@ -85,9 +86,11 @@ async def show_user_info(update: Update, context: ContextTypes.DEFAULT_TYPE, use
             
             # Если изображение найдено, отправляем его с информацией
             if image_url:
-                await context.bot.send_photo(
-                    chat_id=update.effective_chat.id,
-                    photo=image_url,
+                await send_pokemon_photo(
+                    context.bot,
+                    update.effective_chat.id,
+                    user.main_pokemon.name,
+                    image_url,
                     caption=info_message,
                     parse_mode="Markdown"
                 )
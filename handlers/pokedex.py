@@ -4,7 +4,9 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from storage import get_user
 from pokemon_api import get_pokemon_data, get_pokemon_image_url, get_all_pokemon
+from artwork_cache import send_pokemon_photo
 import asyncio
+from typing import Dict, List, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +25,95 @@ async def pokedex_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     # Show the Pokedex
     await show_pokedex_page(update, context)
 
+def render_pokedex_page(user, mode: str, page: int, all_pokemon: List[Dict]) -> Tuple[str, InlineKeyboardMarkup]:
+    """Build the text and keyboard of a Pokedex list page ("all" or "my" mode)."""
+    if mode == "all":
+        pokemon_list = all_pokemon
+        
+        # Calculate pagination
+        total_pages = (len(pokemon_list) + POKEDEX_PAGE_SIZE - 1) // POKEDEX_PAGE_SIZE
+        start_idx = (page - 1) * POKEDEX_PAGE_SIZE
+        end_idx = min(start_idx + POKEDEX_PAGE_SIZE, len(pokemon_list))
+        
+        # Get the Pokemon for this page
+        page_pokemon = pokemon_list[start_idx:end_idx]
+        
+        # Create the message
+        message = f"📚 *Покедекс* (Все Покемоны - Страница {page}/{total_pages})\n\n"
+        
+        # Add Pokemon to the message
+        for i, pokemon in enumerate(page_pokemon, start=1):
+            # Check if the user has this Pokemon
+            has_pokemon = any(p.name.lower() == pokemon["name"].lower() for p in user.pokemons)
+            status = "✅" if has_pokemon else "❌"
+            message += f"{status} {i + start_idx}. {pokemon['name'].capitalize()}\n"
+        
+    else:  # mode == "my"
+        # Get the user's Pokemon
+        user_pokemon = user.pokemons
+        
+        # Calculate pagination
+        total_pages = (len(user_pokemon) + POKEDEX_PAGE_SIZE - 1) // POKEDEX_PAGE_SIZE
+        start_idx = (page - 1) * POKEDEX_PAGE_SIZE
+        end_idx = min(start_idx + POKEDEX_PAGE_SIZE, len(user_pokemon))
+        
+        # Get the Pokemon for this page
+        page_pokemon = user_pokemon[start_idx:end_idx]
+        
+        # Create the message
+        message = f"📚 *Мои Покемоны* (Страница {page}/{total_pages or 1})\n\n"
+        
+        # Add Pokemon to the message
+        for i, pokemon in enumerate(page_pokemon, start=1):
+            cp = pokemon.calculate_cp()
+            message += f"{i + start_idx}. {pokemon.name} (CP: {cp})\n"
+    
+    # Create navigation buttons
+    keyboard = []
+    
+    # Add page navigation
+    nav_buttons = []
+    if page > 1:
+        nav_buttons.append(InlineKeyboardButton("◀️", callback_data=f"pokedex_page_{page-1}"))
+    else:
+        nav_buttons.append(InlineKeyboardButton(" ", callback_data="pokedex_noop"))
+    
+    nav_buttons.append(InlineKeyboardButton(f"{page}/{total_pages or 1}", callback_data="pokedex_noop"))
+    
+    if page < total_pages:
+        nav_buttons.append(InlineKeyboardButton("▶️", callback_data=f"pokedex_page_{page+1}"))
+    else:
+        nav_buttons.append(InlineKeyboardButton(" ", callback_data="pokedex_noop"))
+    
+    keyboard.append(nav_buttons)
+    
+    # Add mode toggle button
+    toggle_text = "👤 Мои Покемоны" if mode == "all" else "🌍 Все Покемоны"
+    toggle_data = "pokedex_mode_my" if mode == "all" else "pokedex_mode_all"
+    keyboard.append([InlineKeyboardButton(toggle_text, callback_data=toggle_data)])
+    
+    # Add search button
+    keyboard.append([InlineKeyboardButton("🔍 Поиск", callback_data="pokedex_search")])
+    
+    # Add view buttons for Pokemon
+    if mode == "all" and page_pokemon:
+        # Для каждого покемона в общем списке добавляем кнопку просмотра
+        for i, pokemon in enumerate(page_pokemon, start=1):
+            idx = i + start_idx - 1
+            keyboard.append([
+                InlineKeyboardButton(f"ℹ️ #{idx}: {pokemon['name'].capitalize()}", callback_data=f"pokedex_view_all_{idx}")
+            ])
+    elif mode == "my" and page_pokemon:
+        # Для каждого покемона пользователя добавляем кнопки просмотра и установки в качестве основного
+        for i, pokemon in enumerate(page_pokemon, start=1):
+            idx = i + start_idx - 1
+            keyboard.append([
+                InlineKeyboardButton(f"ℹ️ #{i}: {pokemon.name}", callback_data=f"pokedex_view_{idx}"),
+                InlineKeyboardButton("⭐ Основной", callback_data=f"pokedex_main_{idx}")
+            ])
+    
+    return message, InlineKeyboardMarkup(keyboard)
+
 async def show_pokedex_page(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Show a page in the Pokedex."""
     user_id = update.effective_user.id
@@ -109,21 +200,18 @@ async def show_pokedex_page(update: Update, context: ContextTypes.DEFAULT_TYPE)
         
         # Если у нас есть URL изображения, отправляем его вместе с сообщением
         if image_url:
+            species = pokemon_name if isinstance(selected_pokemon, dict) else pokemon.name
+            await send_pokemon_photo(
+                context.bot,
+                update.effective_chat.id,
+                species,
+                image_url,
+                caption=message,
+                reply_markup=reply_markup,
+                parse_mode="Markdown"
+            )
             if update.callback_query:
-                await update.callback_query.message.reply_photo(
-                    photo=image_url,
-                    caption=message,
-                    reply_markup=reply_markup,
-                    parse_mode="Markdown"
-                )
                 await update.callback_query.message.delete()
-            else:
-                await update.message.reply_photo(
-                    photo=image_url,
-                    caption=message,
-                    reply_markup=reply_markup,
-                    parse_mode="Markdown"
-                )
         else:
             # Просто отправляем сообщение, если у нас нет изображения
             if update.callback_query:
@@ -141,94 +229,8 @@ async def show_pokedex_page(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return
     
     # Get the list of Pokemon based on mode
-    if mode == "all":
-        # Get all Pokemon from the API
-        all_pokemon = await get_all_pokemon(500)
-        pokemon_list = all_pokemon
-        
-        # Calculate pagination
-        total_pages = (len(pokemon_list) + POKEDEX_PAGE_SIZE - 1) // POKEDEX_PAGE_SIZE
-        start_idx = (page - 1) * POKEDEX_PAGE_SIZE
-        end_idx = min(start_idx + POKEDEX_PAGE_SIZE, len(pokemon_list))
-        
-        # Get the Pokemon for this page
-        page_pokemon = pokemon_list[start_idx:end_idx]
-        
-        # Create the message
-        message = f"📚 *Покедекс* (Все Покемоны - Страница {page}/{total_pages})\n\n"
-        
-        # Add Pokemon to the message
-        for i, pokemon in enumerate(page_pokemon, start=1):
-            # Check if the user has this Pokemon
-            has_pokemon = any(p.name.lower() == pokemon["name"].lower() for p in user.pokemons)
-            status = "✅" if has_pokemon else "❌"
-            message += f"{status} {i + start_idx}. {pokemon['name'].capitalize()}\n"
-        
-    else:  # mode == "my"
-        # Get the user's Pokemon
-        user_pokemon = user.pokemons
-        
-        # Calculate pagination
-        total_pages = (len(user_pokemon) + POKEDEX_PAGE_SIZE - 1) // POKEDEX_PAGE_SIZE
-        start_idx = (page - 1) * POKEDEX_PAGE_SIZE
-        end_idx = min(start_idx + POKEDEX_PAGE_SIZE, len(user_pokemon))
-        
-        # Get the Pokemon for this page
-        page_pokemon = user_pokemon[start_idx:end_idx]
-        
-        # Create the message
-        message = f"📚 *Мои Покемоны* (Страница {page}/{total_pages or 1})\n\n"
-        
-        # Add Pokemon to the message
-        for i, pokemon in enumerate(page_pokemon, start=1):
-            cp = pokemon.calculate_cp()
-            message += f"{i + start_idx}. {pokemon.name} (CP: {cp})\n"
-    
-    # Create navigation buttons
-    keyboard = []
-    
-    # Add page navigation
-    nav_buttons = []
-    if page > 1:
-        nav_buttons.append(InlineKeyboardButton("◀️", callback_data=f"pokedex_page_{page-1}"))
-    else:
-        nav_buttons.append(InlineKeyboardButton(" ", callback_data="pokedex_noop"))
-    
-    nav_buttons.append(InlineKeyboardButton(f"{page}/{total_pages or 1}", callback_data="pokedex_noop"))
-    
-    if page < total_pages:
-        nav_buttons.append(InlineKeyboardButton("▶️", callback_data=f"pokedex_page_{page+1}"))
-    else:
-        nav_buttons.append(InlineKeyboardButton(" ", callback_data="pokedex_noop"))
-    
-    keyboard.append(nav_buttons)
-    
-    # Add mode toggle button
-    toggle_text = "👤 Мои Покемоны" if mode == "all" else "🌍 Все Покемоны"
-    toggle_data = "pokedex_mode_my" if mode == "all" else "pokedex_mode_all"
-    keyboard.append([InlineKeyboardButton(toggle_text, callback_data=toggle_data)])
-    
-    # Add search button
-    keyboard.append([InlineKeyboardButton("🔍 Поиск", callback_data="pokedex_search")])
-    
-    # Add view buttons for Pokemon
-    if mode == "all" and page_pokemon:
-        # Для каждого покемона в общем списке добавляем кнопку просмотра
-        for i, pokemon in enumerate(page_pokemon, start=1):
-            idx = i + start_idx - 1
-            keyboard.append([
-                InlineKeyboardButton(f"ℹ️ #{idx}: {pokemon['name'].capitalize()}", callback_data=f"pokedex_view_all_{idx}")
-            ])
-    elif mode == "my" and page_pokemon:
-        # Для каждого покемона пользователя добавляем кнопки просмотра и установки в качестве основного
-        for i, pokemon in enumerate(page_pokemon, start=1):
-            idx = i + start_idx - 1
-            keyboard.append([
-                InlineKeyboardButton(f"ℹ️ #{i}: {pokemon.name}", callback_data=f"pokedex_view_{idx}"),
-                InlineKeyboardButton("⭐ Основной", callback_data=f"pokedex_main_{idx}")
-            ])
-    
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    all_pokemon = await get_all_pokemon(500) if mode == "all" else []
+    message, reply_markup = render_pokedex_page(user, mode, page, all_pokemon)
     
     # Send or edit the message
     if update.callback_query:
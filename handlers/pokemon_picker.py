@@ -0,0 +1,149 @@
+"""
+Paginated Pokemon picker shared by battles and trades.
+
+Only the visible page is rendered. The sorted orders of a user's collection
+are cached per user and dropped when the user is saved, so paging through a
+large collection does not re-sort or recompute CP on every tap.
+
+Callback data is built from a caller prefix:
+    {prefix}_p_{sort}_{page}        show a page
+    {prefix}_s_{index}_{version}    select user.pokemons[index]
+    {prefix}_x                      no-op (page counter)
+The version is a short hash of the collection, so a selection made from an
+outdated keyboard is rejected instead of picking the wrong Pokemon.
+"""
+
+import logging
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+import storage_hooks
+from battle_power import get_cp
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 8
+# Maximum number of users whose sorted indexes are kept in memory
+MAX_CACHED_INDEXES = 1000
+
+# Sort code -> button title
+SORT_OPTIONS = {
+    "c": "CP",
+    "n": "Name",
+    "t": "Type"
+}
+DEFAULT_SORT = "c"
+
+class _PickerIndex:
+    """Sorted positions of one user's collection."""
+
+    def __init__(self, pokemons):
+        self.count = len(pokemons)
+        ids = ",".join(pokemon.pokemon_id for pokemon in pokemons)
+        self.version = _to_base36(zlib.crc32(ids.encode("utf-8")) & 0xFFFFF)
+        self.labels = [f"{pokemon.name} (CP: {get_cp(pokemon)})" for pokemon in pokemons]
+        self._pokemons = pokemons
+        self._orders: Dict[str, List[int]] = {}
+
+    def get_order(self, sort: str) -> List[int]:
+        order = self._orders.get(sort)
+        if order is None:
+            pokemons = self._pokemons
+            if sort == "n":
+                key = lambda i: (pokemons[i].name.lower(), i)
+            elif sort == "t":
+                key = lambda i: ((pokemons[i].types or [""])[0].lower(), pokemons[i].name.lower(), i)
+            else:
+                key = lambda i: (-get_cp(pokemons[i]), i)
+            order = sorted(range(self.count), key=key)
+            self._orders[sort] = order
+        return order
+
+_indexes: "OrderedDict[int, _PickerIndex]" = OrderedDict()
+
+def _to_base36(number: int) -> str:
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    result = ""
+    while True:
+        number, remainder = divmod(number, 36)
+        result = digits[remainder] + result
+        if not number:
+            return result
+
+def _get_index(user) -> _PickerIndex:
+    index = _indexes.get(user.user_id)
+    if index is None or index.count != len(user.pokemons):
+        index = _PickerIndex(user.pokemons)
+        _indexes[user.user_id] = index
+        if len(_indexes) > MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+    _indexes.move_to_end(user.user_id)
+    return index
+
+def invalidate(user_id: int) -> None:
+    """Drop the cached index of a user."""
+    _indexes.pop(user_id, None)
+
+def install() -> None:
+    """Drop cached indexes whenever a user is saved or deleted."""
+    storage_hooks.add_save_listener(lambda user: invalidate(user.user_id))
+    storage_hooks.add_delete_listener(invalidate)
+
+def create_picker_keyboard(
+    user,
+    prefix: str,
+    sort: str = DEFAULT_SORT,
+    page: int = 0,
+    extra_rows: Optional[List[List[InlineKeyboardButton]]] = None
+) -> InlineKeyboardMarkup:
+    """Create the keyboard for one page of a user's collection."""
+    index = _get_index(user)
+    if sort not in SORT_OPTIONS:
+        sort = DEFAULT_SORT
+
+    pages = max(1, (index.count + PAGE_SIZE - 1) // PAGE_SIZE)
+    page = min(max(page, 0), pages - 1)
+    order = index.get_order(sort)
+
+    keyboard = [
+        [InlineKeyboardButton(index.labels[i], callback_data=f"{prefix}_s_{i}_{index.version}")]
+        for i in order[page * PAGE_SIZE:(page + 1) * PAGE_SIZE]
+    ]
+
+    if pages > 1:
+        keyboard.append([
+            InlineKeyboardButton("◀️", callback_data=f"{prefix}_p_{sort}_{(page - 1) % pages}"),
+            InlineKeyboardButton(f"{page + 1}/{pages}", callback_data=f"{prefix}_x"),
+            InlineKeyboardButton("▶️", callback_data=f"{prefix}_p_{sort}_{(page + 1) % pages}")
+        ])
+
+    keyboard.append([
+        InlineKeyboardButton(("• " if code == sort else "") + title, callback_data=f"{prefix}_p_{code}_0")
+        for code, title in SORT_OPTIONS.items()
+    ])
+
+    if extra_rows:
+        keyboard.extend(extra_rows)
+
+    return InlineKeyboardMarkup(keyboard)
+
+def parse_picker_action(args: List[str]) -> Tuple[str, Optional[str], Optional[int]]:
+    """Parse the callback parts that follow the picker prefix.
+
+    Returns ("page", sort, page), ("select", version, index) or ("noop", None, None).
+    """
+    if len(args) >= 3 and args[0] == "p":
+        return "page", args[1], int(args[2])
+    if len(args) >= 3 and args[0] == "s":
+        return "select", args[2], int(args[1])
+    return "noop", None, None
+
+def resolve_selection(user, index: int, version: str):
+    """Get the selected Pokemon, or None if the keyboard is outdated."""
+    picker_index = _get_index(user)
+    if picker_index.version != version or not 0 <= index < len(user.pokemons):
+        return None
+    return user.pokemons[index]
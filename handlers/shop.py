@@ -1,7 +1,8 @@
 import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
-from storage import get_user, save_user, use_promocode
+from storage import get_user, save_user
+from promocode_engine import redeem
 import config
 
 logger = logging.getLogger(__name__)
@@ -401,9 +402,12 @@ async def promocode_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     code = context.args[0]
     
     # Try to use the promocode
-    success, reward_type, reward_description = use_promocode(user_id, code)
+    success, reward_type, reward_description = await redeem(user_id, code)
     
     if success:
+        # Профиль изменился при активации
+        user = get_user(user_id)
+        
         # Формируем сообщение в зависимости от типа награды
         message = f"✅ Промокод *{code}* успешно активирован!\n\n"
         
@@ -24,8 +24,15 @@ from storage import (
     mark_wild_pokemon_caught, save_user
 )
 from pokemon_api import get_pokemon_data, get_pokemon_image_url, get_all_pokemon
+from artwork_cache import send_pokemon_photo
 from models.pokemon import Pokemon
 import config
+import economy
+from battle_power import get_cp
+from logging_setup import chat_debug, is_chat_debug
+from handlers.chat_triggers import (
+    CATCH_WORDS, SPECIAL_CATCH_WORDS, SPECIAL_GROUP_ID, SPECIAL_SUMMON_WORDS, is_summon_phrase
+)
 
 logger = logging.getLogger(__name__)
 
@@ -186,9 +193,11 @@ async def choose_starter_callback(update: Update, context: ContextTypes.DEFAULT_
         
         # Отправляем сообщение с изображением
         if image_url:
-            await context.bot.send_photo(
-                chat_id=update.effective_chat.id,
-                photo=image_url,
+            await send_pokemon_photo(
+                context.bot,
+                update.effective_chat.id,
+                starter_pokemon.name,
+                image_url,
                 caption=success_message
             )
             # Обновляем оригинальное сообщение
@@ -361,9 +370,11 @@ async def spawn_wild_pokemon(update: Update, context: ContextTypes.DEFAULT_TYPE)
             # Сначала пробуем отправить сообщение с изображением
             if image_url:
                 try:
-                    await context.bot.send_photo(
-                        chat_id=chat_id,
-                        photo=image_url,
+                    await send_pokemon_photo(
+                        context.bot,
+                        chat_id,
+                        pokemon_name,
+                        image_url,
                         caption=message,
                         parse_mode="Markdown"
                     )
@@ -543,16 +554,17 @@ async def handle_group_message(update: Update, context: ContextTypes.DEFAULT_TYP
         logger.warning(f"handle_group_message вызван не для группового чата: {chat_type}")
         return
     
-    # Дополнительное логирование для конкретной группы с ID -1002435502062
-    if chat_id == -1002435502062:
-        logger.info(f"[ВАЖНО] Сообщение в специальной группе -1002435502062 от пользователя {user_id}")
-    
-    # Получаем информацию о чате для диагностики проблем
-    try:
-        chat_info = await context.bot.get_chat(chat_id)
-        logger.info(f"Информация о групповом чате {chat_id}: название={chat_info.title}, тип={chat_info.type}")
-    except Exception as e:
-        logger.error(f"Не удалось получить информацию о чате {chat_id}: {e}")
+    # Подробное логирование включается для отдельных чатов командой /logdebug
+    if is_chat_debug(chat_id):
+        chat_debug(logger, chat_id, "Сообщение в групповом чате %s от пользователя %s", chat_id, user_id)
+        
+        # Информация о чате для диагностики проблем (отдельный запрос к Telegram)
+        try:
+            chat_info = await context.bot.get_chat(chat_id)
+            chat_debug(logger, chat_id, "Информация о групповом чате %s: название=%s, тип=%s",
+                       chat_id, chat_info.title, chat_info.type)
+        except Exception as e:
+            logger.error(f"Не удалось получить информацию о чате {chat_id}: {e}")
     
     # Если сообщения нет, просто выходим
     if not update.message or not update.message.text:
@@ -560,62 +572,46 @@ async def handle_group_message(update: Update, context: ContextTypes.DEFAULT_TYP
         
     message_text = update.message.text.lower().strip()
     
-    # Добавим логирование для отладки
-    logger.info(f"Получено сообщение в групповом чате ID={chat_id} (тип: {chat_type}): {message_text}")
+    chat_debug(logger, chat_id, "Получено сообщение в групповом чате ID=%s (тип: %s): %s", chat_id, chat_type, message_text)
     
     # Для группы с ID -1002435502062 расширяем список команд и снижаем требования
-    if chat_id == -1002435502062:
+    if chat_id == SPECIAL_GROUP_ID:
         # Для специальной группы принимаем любые сообщения с упоминанием покемонов
-        if ("покемон" in message_text or 
-            "поке" in message_text or 
-            "призвать" in message_text or 
-            "призыв" in message_text or
-            "вызвать" in message_text or
-            "pokemon" in message_text):
+        if any(word in message_text for word in SPECIAL_SUMMON_WORDS):
             
-            logger.info(f"[ГРУППА -1002435502062] Пользователь {user_id} вызывает покемона специальной командой '{message_text}'")
+            chat_debug(logger, chat_id, "Пользователь %s вызывает покемона специальной командой '%s'", user_id, message_text)
             await _call_pokemon_logic(update, context)
             return
     
     # Проверяем команду призыва покемона, более широким набором шаблонов
-    if (message_text.startswith("призвать покемон") or 
-        message_text == "призвать" or 
-        message_text == "покемон призыв" or
-        message_text == "вызвать покемона" or
-        message_text == "зови покемона" or
-        message_text == "призови покемона" or
-        message_text == "покемон" or
-        message_text == "👾 покемон"):
-        
-        logger.info(f"Пользователь {user_id} вызывает покемона в групповом чате {chat_id}")
+    if is_summon_phrase(message_text):
+        
+        logger.info("Пользователь %s вызывает покемона в групповом чате %s", user_id, chat_id)
         await _call_pokemon_logic(update, context)
         return
     
     # Проверяем наличие активного покемона в чате
     wild_pokemon = get_wild_pokemon(chat_id)
     if wild_pokemon:
-        logger.info(f"В чате {chat_id} есть дикий покемон: {wild_pokemon.get('data', {}).get('name', 'неизвестный')}")
+        chat_debug(logger, chat_id, "В чате %s есть дикий покемон: %s",
+                   chat_id, wild_pokemon.get('data', {}).get('name', 'неизвестный'))
     
     # Расширенный список команд для ловли покемона
-    catch_commands = ["ловлю", "поймать", "catch", "ловить", "схватить", "ловля", 
-                     "поймал", "лови его", "хватай", "лови", "бросить покебол"]
+    catch_commands = list(CATCH_WORDS)
     
     # Для специальной группы -1002435502062 добавляем дополнительные команды ловли
-    if chat_id == -1002435502062:
+    if chat_id == SPECIAL_GROUP_ID:
         # Расширенный список для специальной группы
-        special_catch_commands = ["поймаю", "ловите", "захват", "беру", "моё", "мой", 
-                                 "хочу", "нужен", "забираю", "словить", "словлю", 
-                                 "ловушка", "выбираю", "я выбираю тебя", "покебол"]
-        catch_commands.extend(special_catch_commands)
+        catch_commands.extend(SPECIAL_CATCH_WORDS)
         
         # Более либеральная проверка для этой группы
         if any(catch_word in message_text for catch_word in catch_commands):
             if is_wild_pokemon_available(chat_id):
-                logger.info(f"[ГРУППА -1002435502062] Пользователь {user_id} ловит покемона командой '{message_text}'")
+                chat_debug(logger, chat_id, "Пользователь %s ловит покемона командой '%s'", user_id, message_text)
                 await handle_catch_attempt(update, context)
                 return
             else:
-                logger.info(f"[ГРУППА -1002435502062] Пользователь {user_id} пытался поймать покемона, но нет доступного")
+                chat_debug(logger, chat_id, "Пользователь %s пытался поймать покемона, но нет доступного", user_id)
                 await context.bot.send_message(
                     chat_id=chat_id,
                     text="В этом чате нет дикого покемона для ловли. Сначала призовите его!"
@@ -626,12 +622,14 @@ async def handle_group_message(update: Update, context: ContextTypes.DEFAULT_TYP
         for catch_word in catch_commands:
             if catch_word in message_text:
                 if is_wild_pokemon_available(chat_id):
-                    logger.info(f"Пользователь {user_id} пытается поймать покемона командой '{message_text}' в групповом чате {chat_id}")
+                    logger.info("Пользователь %s пытается поймать покемона командой '%s' в групповом чате %s",
+                                user_id, message_text, chat_id)
                     # Если пользователь отправил команду ловли, обрабатываем попытку поймать покемона
                     await handle_catch_attempt(update, context)
                     return
                 else:
-                    logger.info(f"Пользователь {user_id} пытался поймать покемона, но в чате {chat_id} нет доступного покемона")
+                    chat_debug(logger, chat_id, "Пользователь %s пытался поймать покемона, но в чате %s нет доступного покемона",
+                               user_id, chat_id)
                     await context.bot.send_message(
                         chat_id=chat_id,
                         text="В этом чате нет дикого покемона для ловли. Сначала призовите его!"
@@ -642,13 +640,13 @@ async def handle_group_message(update: Update, context: ContextTypes.DEFAULT_TYP
     spawn_chance = 0.05  # Базовая вероятность для обычных групп (5%)
     
     # Для специальной группы увеличиваем вероятность до 10%
-    if chat_id == -1002435502062:
+    if chat_id == SPECIAL_GROUP_ID:
         spawn_chance = 0.10
-        logger.info(f"[ГРУППА -1002435502062] Повышенная вероятность спавна покемона: {spawn_chance * 100}%")
+        chat_debug(logger, chat_id, "Повышенная вероятность спавна покемона: %s%%", spawn_chance * 100)
     
     # С увеличенной вероятностью запускаем спавн покемона
     if random.random() < spawn_chance:
-        logger.info(f"Запуск случайного спавна покемона в групповом чате {chat_id}")
+        logger.info("Запуск случайного спавна покемона в групповом чате %s", chat_id)
         await spawn_wild_pokemon(update, context)
         return
 
@@ -678,13 +676,11 @@ async def handle_catch_attempt(update: Update, context: ContextTypes.DEFAULT_TYP
     user_id = update.effective_user.id
     chat_type = update.effective_chat.type
     
-    # Добавим лог для отладки
-    logger.info(f"Обработка сообщения для ловли покемона в чате {chat_id} (тип: {chat_type})")
+    chat_debug(logger, chat_id, "Обработка сообщения для ловли покемона в чате %s (тип: %s)", chat_id, chat_type)
     
     # Проверяем, доступен ли покемон для поимки в любом типе чата
     if is_wild_pokemon_available(chat_id):
-        # Логируем инфо если покемон доступен
-        logger.info(f"Дикий покемон доступен в чате {chat_id}")
+        chat_debug(logger, chat_id, "Дикий покемон доступен в чате %s", chat_id)
         
         # Если это личный чат - позволяем ловить любым сообщением
         if chat_type == 'private':
@@ -696,7 +692,7 @@ async def handle_catch_attempt(update: Update, context: ContextTypes.DEFAULT_TYP
             message_text = update.message.text.lower().strip()
             
             # Специальная обработка для группы -1002435502062
-            if chat_id == -1002435502062:
+            if chat_id == SPECIAL_GROUP_ID:
                 # Расширенный список для специальной группы
                 special_catch_commands = ["поймаю", "ловите", "захват", "беру", "моё", "мой", 
                                          "хочу", "нужен", "забираю", "словить", "словлю", 
@@ -707,11 +703,11 @@ async def handle_catch_attempt(update: Update, context: ContextTypes.DEFAULT_TYP
                 # Более либеральная проверка для этой группы
                 if any(catch_word in message_text for catch_word in special_catch_commands):
                     # Продолжаем ловлю в специальной группе
-                    logger.info(f"[ГРУППА -1002435502062] Пользователь {user_id} пытается поймать покемона командой '{message_text}'")
+                    chat_debug(logger, chat_id, "Пользователь %s пытается поймать покемона командой '%s'", user_id, message_text)
                     pass
                 else:
                     # Сообщение не подходит для ловли даже в специальной группе
-                    logger.info(f"[ГРУППА -1002435502062] Сообщение '{message_text}' не подходит для ловли")
+                    chat_debug(logger, chat_id, "Сообщение '%s' не подходит для ловли", message_text)
                     return
             # Обычные группы
             elif (message_text == "ловлю" or 
@@ -720,15 +716,15 @@ async def handle_catch_attempt(update: Update, context: ContextTypes.DEFAULT_TYP
                 message_text == "ловить" or
                 message_text == "схватить"):
                 # Продолжаем ловлю в обычном групповом чате
-                logger.info(f"Пользователь {user_id} пытается поймать покемона в групповом чате командой '{message_text}'")
+                logger.info("Пользователь %s пытается поймать покемона в групповом чате командой '%s'", user_id, message_text)
                 pass
             else:
                 # Для обычного группового чата, но сообщение не подходит для ловли
-                logger.info(f"Сообщение '{message_text}' в чате {chat_id} не подходит для ловли")
+                chat_debug(logger, chat_id, "Сообщение '%s' в чате %s не подходит для ловли", message_text, chat_id)
                 return
         else:
             # Другие типы чатов или сообщение отсутствует
-            logger.info(f"Неподходящий тип чата или сообщение для ловли покемона")
+            chat_debug(logger, chat_id, "Неподходящий тип чата или сообщение для ловли покемона")
             return
     # Для личных сообщений возможен случайный спавн покемона
     elif chat_type == 'private':
@@ -757,8 +753,8 @@ async def handle_catch_attempt(update: Update, context: ContextTypes.DEFAULT_TYP
     
     # Check if the catch is successful (based on Pokemon rarity, user's level, etc.)
     # Для специальной группы -1002435502062 повышаем шанс поимки
-    if chat_id == -1002435502062:
-        logger.info(f"[ГРУППА -1002435502062] Повышенный шанс поимки покемона для пользователя {user_id}")
+    if chat_id == SPECIAL_GROUP_ID:
+        chat_debug(logger, chat_id, "Повышенный шанс поимки покемона для пользователя %s", user_id)
         catch_success = calculate_catch_success(user, pokemon, special_group=True)
     else:
         catch_success = calculate_catch_success(user, pokemon)
@@ -791,44 +787,13 @@ async def handle_catch_attempt(update: Update, context: ContextTypes.DEFAULT_TYP
 
 def calculate_catch_success(user, pokemon, special_group=False):
     """Calculate whether a catch attempt succeeds."""
-    # Base catch rate (50%)
-    base_catch_rate = 0.5
-    
-    # Для специальной группы увеличиваем базовый шанс до 65%
-    if special_group:
-        base_catch_rate = 0.65
-        logger.info(f"[ГРУППА -1002435502062] Увеличен базовый шанс поимки до {base_catch_rate * 100}%")
-    
-    # Adjust based on Pokemon rarity/CP
-    cp = pokemon.calculate_cp()
-    cp_factor = max(0.1, 1 - (cp / 1000))  # Higher CP means lower chance
-    
-    # Для специальной группы уменьшаем штраф за высокий CP
-    if special_group and cp_factor < 0.2:
-        cp_factor = 0.2
-        logger.info(f"[ГРУППА -1002435502062] Уменьшен штраф за высокий CP до {cp_factor}")
-    
-    # Adjust based on user's league
-    league_bonus = (user.league - 1) * 0.05  # 5% bonus per league
-    
-    # Для специальной группы увеличиваем бонус за лигу вдвое
-    if special_group:
-        league_bonus *= 2
-        logger.info(f"[ГРУППА -1002435502062] Удвоен бонус за лигу: {league_bonus}")
-    
-    # Adjust based on Pokeballs
+    # Use the best available Pokeball
     pokeball_bonus = 0
     for ball_id, count in user.pokeballs.items():
         if count > 0:
-            # Use the best available Pokeball
             ball_data = config.POKEBALLS.get(ball_id, {})
             pokeball_bonus = ball_data.get("catch_rate_bonus", 0)
             
-            # Для специальной группы увеличиваем бонус от покеболов
-            if special_group:
-                pokeball_bonus *= 1.5
-                logger.info(f"[ГРУППА -1002435502062] Увеличен бонус от покебола в 1.5 раза: {pokeball_bonus}")
-            
             # Remove one Pokeball from inventory
             user.pokeballs[ball_id] -= 1
             if user.pokeballs[ball_id] <= 0:
@@ -837,17 +802,12 @@ def calculate_catch_success(user, pokemon, special_group=False):
             save_user(user)
             break
     
-    # Calculate final catch rate
-    catch_rate = min(0.95, base_catch_rate + cp_factor + league_bonus + pokeball_bonus)
-    
-    # Для специальной группы добавляем минимальный порог шанса поимки
-    if special_group and catch_rate < 0.4:
-        catch_rate = 0.4
-        logger.info(f"[ГРУППА -1002435502062] Установлен минимальный порог шанса поимки: {catch_rate}")
+    # Higher CP lowers the chance, league and Pokeball raise it (see economy.catch_rate)
+    catch_rate = float(economy.catch_rate(get_cp(pokemon), user.league, pokeball_bonus, special_group))
     
     # Если это специальная группа, логируем финальный шанс
     if special_group:
-        logger.info(f"[ГРУППА -1002435502062] Финальный шанс поимки: {catch_rate * 100}%")
+        logger.debug("Финальный шанс поимки в специальной группе: %s%%", catch_rate * 100)
     
     # Return whether the catch succeeds
     return random.random() <= catch_rate
@@ -0,0 +1,101 @@
+"""
+Обработчик таблиц лидеров (/top)
+"""
+
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import ContextTypes
+import logging
+import leaderboard
+
+logger = logging.getLogger(__name__)
+
+# Number of players shown on the leaderboard
+TOP_SIZE = 10
+
+def _is_group(chat) -> bool:
+    return chat is not None and chat.type in ("group", "supergroup")
+
+def create_top_keyboard(metric: str, scope: str, in_group: bool) -> InlineKeyboardMarkup:
+    """Create the metric and scope switch keyboard."""
+    metric_buttons = [
+        InlineKeyboardButton(
+            ("• " if key == metric else "") + title,
+            callback_data=f"top_{key}_{scope}"
+        )
+        for key, (title, _, _) in leaderboard.METRICS.items()
+    ]
+    keyboard = [metric_buttons[:2], metric_buttons[2:]]
+
+    if in_group:
+        if scope == "chat":
+            keyboard.append([InlineKeyboardButton("🌍 Общий рейтинг", callback_data=f"top_{metric}_all")])
+        else:
+            keyboard.append([InlineKeyboardButton("👥 Рейтинг чата", callback_data=f"top_{metric}_chat")])
+
+    return InlineKeyboardMarkup(keyboard)
+
+def format_top(metric: str, scope: str, chat_id: int, user_id: int) -> str:
+    """Build the leaderboard text."""
+    title = leaderboard.METRICS[metric][0]
+    board = leaderboard.get_board(metric, chat_id if scope == "chat" else None)
+
+    scope_name = "в этом чате" if scope == "chat" else "среди всех игроков"
+    text = f"*{title}* {scope_name}\n\n"
+
+    entries = board.top(TOP_SIZE)
+    if not entries:
+        return text + "Пока здесь никого нет."
+
+    medals = {1: "🥇", 2: "🥈", 3: "🥉"}
+    for place, (entry_user_id, score) in enumerate(entries, start=1):
+        name = leaderboard.get_display_name(entry_user_id).replace("_", "\\_")
+        text += f"{medals.get(place, f'{place}.')} {name} — {score}\n"
+
+    rank = board.rank(user_id)
+    if rank is not None:
+        text += f"\nВаше место: *{rank}* из {len(board)} ({board.score(user_id)})"
+    return text
+
+async def top_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Обработчик команды /top - таблица лидеров."""
+    metric = context.args[0].lower() if context.args else "balance"
+    if metric not in leaderboard.METRICS:
+        await update.message.reply_text(
+            "❌ Неизвестный рейтинг. Доступны: " + ", ".join(leaderboard.METRICS)
+        )
+        return
+
+    chat = update.effective_chat
+    in_group = _is_group(chat)
+    scope = "chat" if in_group else "all"
+
+    await update.message.reply_text(
+        format_top(metric, scope, chat.id, update.effective_user.id),
+        reply_markup=create_top_keyboard(metric, scope, in_group),
+        parse_mode="Markdown"
+    )
+
+async def top_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Обработчик переключения таблиц лидеров."""
+    query = update.callback_query
+    await query.answer()
+
+    _, metric, scope = query.data.split("_", 2)
+    if metric not in leaderboard.METRICS:
+        return
+
+    chat = query.message.chat
+    in_group = _is_group(chat)
+    if not in_group:
+        scope = "all"
+
+    await query.edit_message_text(
+        format_top(metric, scope, chat.id, update.effective_user.id),
+        reply_markup=create_top_keyboard(metric, scope, in_group),
+        parse_mode="Markdown"
+    )
+
+async def track_group_member(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Запоминает участников групповых чатов для рейтинга чата."""
+    if update.effective_user and _is_group(update.effective_chat):
+        leaderboard.register_group_member(update.effective_chat.id, update.effective_user.id)
@@ -1,10 +1,15 @@
 import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
-from storage import (
-    get_user, start_trade, get_trade, add_pokemon_to_trade,
-    remove_pokemon_from_trade, confirm_trade, save_user
+from storage import get_user
+from trade_engine import TradeError, escrow_pokemon, release_pokemon, execute_trade
+from trade_sessions import (
+    EXECUTING, create_trade, get_trade, accept_trade, decline_trade, add_offer, remove_offer,
+    confirm_trade, set_message_id, finish_trade, cancel_trade, trade_lock,
+    get_side, get_other_side, get_offer_name, get_offer_label, render_offer
 )
+from battle_power import get_cp
+from handlers.pokemon_picker import create_picker_keyboard, parse_picker_action, resolve_selection
 
 logger = logging.getLogger(__name__)
 
@@ -44,7 +49,9 @@ async def trade_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         return
     
     # Start a trade
-    trade_id = start_trade(trader1_id, trader2_id)
+    trade_id = create_trade(
+        trader1_id, trader1.get_display_name(), trader2_id, trader2.get_display_name()
+    )["id"]
     
     # Store the trade ID in the context
     context.user_data["current_trade"] = trade_id
@@ -69,426 +76,350 @@ async def trade_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
 async def trade_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle trade-related callback queries."""
     query = update.callback_query
-    user_id = update.effective_user.id
     data = query.data
+    toast = None
     
     try:
         # Extract the action and trade ID
         parts = data.split("_")
         action = parts[1]
         trade_id = parts[2] if len(parts) > 2 else None
-        
-        await query.answer()
-        
-        if action == "accept" and trade_id:
-            # Get the trade
-            trade = get_trade(trade_id)
-            if not trade:
-                await query.edit_message_text("This trade is no longer available.")
-                return
-            
-            # Make sure this user is the trade partner
-            if user_id != trade["user2_id"]:
-                await query.edit_message_text("This trade request is not for you.")
-                return
-            
-            # Update the trade status
-            trade["status"] = "negotiating"
-            
-            # Get the users
-            trader1 = get_user(trade["user1_id"])
-            trader2 = get_user(trade["user2_id"])
-            
-            # Let the initiator know the trade was accepted
-            await context.bot.send_message(
-                chat_id=trade["user1_id"],
-                text=f"🔄 {trader2.get_display_name()} has accepted your trade request!"
-            )
-            
-            # Show trade interface to both users
-            await show_trade_interface(context, trade_id, trade["user1_id"])
-            await show_trade_interface(context, trade_id, trade["user2_id"])
-            
-            # Edit the original message
-            await query.edit_message_text("You accepted the trade request. Check your private messages to continue the trade.")
-            
-        elif action == "decline" and trade_id:
-            # Get the trade
-            trade = get_trade(trade_id)
-            if not trade:
-                await query.edit_message_text("This trade is no longer available.")
-                return
-            
-            # Make sure this user is the trade partner
-            if user_id != trade["user2_id"]:
-                await query.edit_message_text("This trade request is not for you.")
-                return
-            
-            # Let the initiator know the trade was declined
-            await context.bot.send_message(
-                chat_id=trade["user1_id"],
-                text=f"😔 {update.effective_user.first_name} has declined your trade request."
-            )
-            
-            await query.edit_message_text("You declined the trade request.")
-            
-        elif action == "add" and trade_id:
-            # Get the trade
-            trade = get_trade(trade_id)
-            if not trade:
-                await query.edit_message_text("This trade is no longer available.")
-                return
-            
-            # Make sure this user is in the trade
-            if user_id != trade["user1_id"] and user_id != trade["user2_id"]:
-                await query.edit_message_text("This trade is not for you.")
-                return
-            
-            # Set up state to select a Pokemon to add
-            context.user_data["trade_state"] = "add_pokemon"
-            context.user_data["trade_id"] = trade_id
-            
-            # Show the user's Pokemon
-            await show_pokemon_selection(query, user_id)
-            
-        elif action == "remove" and trade_id:
-            # Get the trade
-            trade = get_trade(trade_id)
-            if not trade:
-                await query.edit_message_text("This trade is no longer available.")
-                return
-            
-            # Make sure this user is in the trade
-            if user_id != trade["user1_id"] and user_id != trade["user2_id"]:
-                await query.edit_message_text("This trade is not for you.")
-                return
-            
-            # Determine which offer list to use
-            offer_list = trade["user1_offer"] if user_id == trade["user1_id"] else trade["user2_offer"]
-            
-            # Check if there are any Pokemon to remove
-            if not offer_list:
-                await query.answer("You haven't added any Pokemon to the trade yet.")
-                return
-            
-            # Set up state to select a Pokemon to remove
-            context.user_data["trade_state"] = "remove_pokemon"
-            context.user_data["trade_id"] = trade_id
-            
-            # Show the user's offered Pokemon
-            await show_offered_pokemon_selection(query, trade, user_id)
-            
-        elif action == "confirm" and trade_id:
-            # Get the trade
-            trade = get_trade(trade_id)
-            if not trade:
-                await query.edit_message_text("This trade is no longer available.")
-                return
-            
-            # Make sure this user is in the trade
-            if user_id != trade["user1_id"] and user_id != trade["user2_id"]:
-                await query.edit_message_text("This trade is not for you.")
-                return
-            
-            # Confirm the trade for this user
-            confirmed = confirm_trade(trade_id, user_id)
-            
-            if not confirmed:
-                await query.answer("Failed to confirm trade.")
-                return
-            
-            # Check if both users have confirmed
-            trade = get_trade(trade_id)
-            if trade["status"] == "completed":
-                # Trade was completed
-                await notify_trade_completed(context, trade)
-            else:
-                # Just this user confirmed
-                await query.edit_message_text(
-                    "You have confirmed the trade. Waiting for the other trainer to confirm...",
-                    reply_markup=create_trade_interface_keyboard(trade, user_id, confirmed=True)
-                )
-                
-                # Notify the other user
-                other_user_id = trade["user2_id"] if user_id == trade["user1_id"] else trade["user1_id"]
-                await context.bot.send_message(
-                    chat_id=other_user_id,
-                    text=f"{update.effective_user.first_name} has confirmed the trade. Please confirm to complete the trade."
-                )
-            
-        elif action == "cancel" and trade_id:
-            # Get the trade
-            trade = get_trade(trade_id)
-            if not trade:
-                await query.edit_message_text("This trade is no longer available.")
-                return
-            
-            # Make sure this user is in the trade
-            if user_id != trade["user1_id"] and user_id != trade["user2_id"]:
-                await query.edit_message_text("This trade is not for you.")
-                return
-            
-            # Cancel the trade
-            trade["status"] = "cancelled"
-            
-            # Notify both users
-            await query.edit_message_text("You have cancelled the trade.")
-            
-            other_user_id = trade["user2_id"] if user_id == trade["user1_id"] else trade["user1_id"]
-            await context.bot.send_message(
-                chat_id=other_user_id,
-                text=f"{update.effective_user.first_name} has cancelled the trade."
-            )
-            
-        elif action == "select" and trade_id:
-            # This is a Pokemon selection callback
-            pokemon_idx = int(parts[3])
-            
-            # Get the trade
-            trade = get_trade(trade_id)
-            if not trade:
-                await query.edit_message_text("This trade is no longer available.")
-                return
-            
-            # Check the trade state
-            trade_state = context.user_data.get("trade_state")
-            
-            if trade_state == "add_pokemon":
-                # Add the selected Pokemon to the trade
-                user = get_user(user_id)
-                
-                if pokemon_idx >= len(user.pokemons):
-                    await query.answer("Invalid Pokemon selection.")
-                    return
-                
-                selected_pokemon = user.pokemons[pokemon_idx]
-                
-                # Add the Pokemon to the trade
-                added = add_pokemon_to_trade(trade_id, user_id, selected_pokemon.pokemon_id)
-                
-                if added:
-                    await query.answer(f"Added {selected_pokemon.name} to the trade.")
-                else:
-                    await query.answer(f"Failed to add {selected_pokemon.name} to the trade.")
-                
-                # Clear the trade state
-                del context.user_data["trade_state"]
-                
-                # Show the updated trade interface
-                await show_trade_interface(context, trade_id, user_id)
-                
-                # Notify the other user
-                other_user_id = trade["user2_id"] if user_id == trade["user1_id"] else trade["user1_id"]
-                await context.bot.send_message(
-                    chat_id=other_user_id,
-                    text=f"{update.effective_user.first_name} added {selected_pokemon.name} to the trade."
-                )
-                
-                # Update the other user's trade interface
-                await show_trade_interface(context, trade_id, other_user_id)
-                
-            elif trade_state == "remove_pokemon":
-                # Remove the selected Pokemon from the trade
-                # Determine which offer list to use
-                offer_list = trade["user1_offer"] if user_id == trade["user1_id"] else trade["user2_offer"]
-                
-                if pokemon_idx >= len(offer_list):
-                    await query.answer("Invalid Pokemon selection.")
-                    return
-                
-                # Get the Pokemon ID
-                pokemon_id = offer_list[pokemon_idx]
-                
-                # Find the Pokemon name for notification
-                user = get_user(user_id)
-                pokemon_name = "Pokemon"
-                for pokemon in user.pokemons:
-                    if pokemon.pokemon_id == pokemon_id:
-                        pokemon_name = pokemon.name
-                        break
-                
-                # Remove the Pokemon from the trade
-                removed = remove_pokemon_from_trade(trade_id, user_id, pokemon_id)
-                
-                if removed:
-                    await query.answer(f"Removed {pokemon_name} from the trade.")
-                else:
-                    await query.answer(f"Failed to remove {pokemon_name} from the trade.")
-                
-                # Clear the trade state
-                del context.user_data["trade_state"]
-                
-                # Show the updated trade interface
-                await show_trade_interface(context, trade_id, user_id)
-                
-                # Notify the other user
-                other_user_id = trade["user2_id"] if user_id == trade["user1_id"] else trade["user1_id"]
-                await context.bot.send_message(
-                    chat_id=other_user_id,
-                    text=f"{update.effective_user.first_name} removed {pokemon_name} from the trade."
-                )
-                
-                # Update the other user's trade interface
-                await show_trade_interface(context, trade_id, other_user_id)
-                
+    
+        # Actions on one trade are handled one at a time
+        if trade_id:
+            async with trade_lock(trade_id):
+                toast = await handle_trade_action(update, context, action, trade_id, parts)
+    
     except Exception as e:
         logger.error(f"Error in trade callback: {e}")
         await query.edit_message_text(f"An error occurred: {str(e)}")
+    
+    # A callback query can be answered only once, so actions return their notification text
+    await query.answer(toast)
 
-async def show_trade_interface(context, trade_id, user_id):
-    """Show the trade interface to a user."""
+async def handle_trade_action(update, context, action, trade_id, parts):
+    """Handle one trade action while holding the trade's lock.
+
+    Returns the text to answer the callback query with, or None.
+    """
+    query = update.callback_query
+    user_id = update.effective_user.id
+    
     trade = get_trade(trade_id)
     if not trade:
+        await query.edit_message_text("This trade is no longer available.")
         return
     
-    # Get the users
-    trader1 = get_user(trade["user1_id"])
-    trader2 = get_user(trade["user2_id"])
-    
-    # Determine which user is which in the trade
-    if user_id == trade["user1_id"]:
-        my_username = trader1.get_display_name()
-        other_username = trader2.get_display_name()
-        my_offer = trade["user1_offer"]
-        other_offer = trade["user2_offer"]
-        my_confirmed = trade["user1_confirmed"]
-        other_confirmed = trade["user2_confirmed"]
-    else:
-        my_username = trader2.get_display_name()
-        other_username = trader1.get_display_name()
-        my_offer = trade["user2_offer"]
-        other_offer = trade["user1_offer"]
-        my_confirmed = trade["user2_confirmed"]
-        other_confirmed = trade["user1_confirmed"]
-    
-    # Get the Pokemon objects
-    my_pokemon = []
-    for pokemon_id in my_offer:
-        for pokemon in get_user(user_id).pokemons:
-            if pokemon.pokemon_id == pokemon_id:
-                my_pokemon.append(pokemon)
-                break
-    
-    other_pokemon = []
-    other_user_id = trade["user2_id"] if user_id == trade["user1_id"] else trade["user1_id"]
-    for pokemon_id in other_offer:
-        for pokemon in get_user(other_user_id).pokemons:
-            if pokemon.pokemon_id == pokemon_id:
-                other_pokemon.append(pokemon)
-                break
+    if action == "accept":
+        # Only the trade partner can accept, and only once
+        trade = accept_trade(trade_id, user_id)
+        if not trade:
+            await query.edit_message_text("This trade request is not for you.")
+            return
+    
+        # Let the initiator know the trade was accepted
+        await context.bot.send_message(
+            chat_id=trade["user1_id"],
+            text=f"🔄 {trade['user2_name']} has accepted your trade request!"
+        )
+    
+        # Show trade interface to both users
+        await refresh_trade_interfaces(context, trade)
+    
+        # Edit the original message
+        await query.edit_message_text("You accepted the trade request. Check your private messages to continue the trade.")
+        return
+    
+    if action == "decline":
+        if not decline_trade(trade_id, user_id):
+            await query.edit_message_text("This trade request is not for you.")
+            return
+    
+        # Let the initiator know the trade was declined
+        await context.bot.send_message(
+            chat_id=trade["user1_id"],
+            text=f"😔 {update.effective_user.first_name} has declined your trade request."
+        )
+    
+        await query.edit_message_text("You declined the trade request.")
+        return
+    
+    # Make sure this user is in the trade
+    side = get_side(trade, user_id)
+    if side is None:
+        await query.edit_message_text("This trade is not for you.")
+        return
+    other_user_id = trade[f"{get_other_side(side)}_id"]
+    
+    if action == "add":
+        # Set up state to select a Pokemon to add
+        context.user_data["trade_state"] = "add_pokemon"
+        context.user_data["trade_id"] = trade_id
+    
+        # Show the user's Pokemon
+        await show_pokemon_selection(query, user_id, trade_id)
+    
+    elif action == "remove":
+        # Check if there are any Pokemon to remove
+        if not trade[f"{side}_offer"]:
+            return "You haven't added any Pokemon to the trade yet."
+    
+        # Set up state to select a Pokemon to remove
+        context.user_data["trade_state"] = "remove_pokemon"
+        context.user_data["trade_id"] = trade_id
+    
+        # Show the user's offered Pokemon
+        await show_offered_pokemon_selection(query, trade, user_id)
+    
+    elif action == "back":
+        # Return from a Pokemon selection to the trade interface
+        context.user_data.pop("trade_state", None)
+        await show_trade_interface(context, trade, user_id)
+    
+    elif action == "confirm":
+        trade = confirm_trade(trade_id, user_id)
+        if not trade:
+            return "You can't confirm this trade now."
+    
+        # Check if both users have confirmed
+        if trade["state"] == EXECUTING:
+            try:
+                given1, given2 = execute_trade(
+                    trade_id, trade["user1_id"], trade["user1_offer"], trade["user2_id"], trade["user2_offer"]
+                )
+            except TradeError as e:
+                logger.error(f"Trade {trade_id} failed: {e}")
+                cancel_trade(trade_id)
+                for chat_id in (trade["user1_id"], trade["user2_id"]):
+                    await context.bot.send_message(
+                        chat_id=chat_id,
+                        text="❌ The trade was cancelled: an offered Pokemon is no longer available."
+                    )
+                return
+    
+            # Trade was completed
+            finish_trade(trade_id)
+            await notify_trade_completed(context, trade, given1, given2)
+        else:
+            # Just this user confirmed
+            await query.edit_message_text(
+                "You have confirmed the trade. Waiting for the other trainer to confirm...",
+                reply_markup=create_trade_interface_keyboard(trade, user_id)
+            )
+    
+            # Notify the other user
+            await context.bot.send_message(
+                chat_id=other_user_id,
+                text=f"{update.effective_user.first_name} has confirmed the trade. Please confirm to complete the trade."
+            )
+    
+    elif action == "cancel":
+        # Cancel the trade and unlock the offered Pokemon
+        cancel_trade(trade_id)
+    
+        # Notify both users
+        await query.edit_message_text("You have cancelled the trade.")
+    
+        await context.bot.send_message(
+            chat_id=other_user_id,
+            text=f"{update.effective_user.first_name} has cancelled the trade."
+        )
+    
+    elif action == "pick":
+        # Paginated picker of the user's Pokemon to add to the trade
+        picker_action, value, number = parse_picker_action(parts[3:])
+    
+        if picker_action == "page":
+            await show_pokemon_selection(query, user_id, trade_id, sort=value, page=number)
+        elif picker_action == "select":
+            user = get_user(user_id)
+            selected_pokemon = resolve_selection(user, number, value)
+            if not selected_pokemon:
+                await show_pokemon_selection(query, user_id, trade_id)
+                return "Your collection has changed, please select again."
+    
+            context.user_data.pop("trade_state", None)
+            return await add_selected_pokemon(update, context, trade, user_id, selected_pokemon)
+    
+    elif action == "select":
+        # This is a Pokemon selection callback
+        pokemon_idx = int(parts[3])
+    
+        # Check the trade state
+        trade_state = context.user_data.get("trade_state")
+    
+        if trade_state == "add_pokemon":
+            # Add the selected Pokemon to the trade
+            user = get_user(user_id)
+    
+            if pokemon_idx >= len(user.pokemons):
+                return "Invalid Pokemon selection."
+    
+            selected_pokemon = user.pokemons[pokemon_idx]
+    
+            # Clear the trade state
+            del context.user_data["trade_state"]
+    
+            return await add_selected_pokemon(update, context, trade, user_id, selected_pokemon)
+    
+        elif trade_state == "remove_pokemon":
+            # Remove the selected Pokemon from the trade
+            offer_list = trade[f"{side}_offer"]
+    
+            if pokemon_idx >= len(offer_list):
+                return "Invalid Pokemon selection."
+    
+            # Get the Pokemon ID and its name for notification
+            pokemon_id = offer_list[pokemon_idx]
+            pokemon_name = get_offer_name(trade, pokemon_id)
+    
+            # Remove the Pokemon from the trade
+            updated_trade = remove_offer(trade_id, user_id, pokemon_id)
+    
+            # Clear the trade state
+            del context.user_data["trade_state"]
+    
+            if not updated_trade:
+                return f"Failed to remove {pokemon_name} from the trade."
+            release_pokemon(trade_id, pokemon_id)
+    
+            # Notify the other user
+            await context.bot.send_message(
+                chat_id=other_user_id,
+                text=f"{update.effective_user.first_name} removed {pokemon_name} from the trade."
+            )
+    
+            # Show the updated trade interface to both users
+            await refresh_trade_interfaces(context, updated_trade)
+            return f"Removed {pokemon_name} from the trade."
+
+async def refresh_trade_interfaces(context, trade):
+    """Show the current trade interface to both users."""
+    await show_trade_interface(context, trade, trade["user1_id"])
+    await show_trade_interface(context, trade, trade["user2_id"])
+
+def format_trade_interface(trade, user_id):
+    """Build the trade interface text for one user from the trade session alone."""
+    side = get_side(trade, user_id)
+    other_side = get_other_side(side)
+    other_username = trade[f"{other_side}_name"]
     
     # Create the message
     message = f"🔄 *Trade with {other_username}*\n\n"
     
     # My offer
-    message += f"*Your offer:*\n"
-    if my_pokemon:
-        for i, pokemon in enumerate(my_pokemon, start=1):
-            message += f"{i}. {pokemon.name} (CP: {pokemon.calculate_cp()})\n"
-    else:
-        message += "No Pokemon offered yet.\n"
+    message += "*Your offer:*\n"
+    message += render_offer(trade, side)
     
     # Their offer
     message += f"\n*{other_username}'s offer:*\n"
-    if other_pokemon:
-        for i, pokemon in enumerate(other_pokemon, start=1):
-            message += f"{i}. {pokemon.name} (CP: {pokemon.calculate_cp()})\n"
-    else:
-        message += "No Pokemon offered yet.\n"
+    message += render_offer(trade, other_side)
     
     # Confirmation status
     message += "\n*Status:*\n"
-    message += f"You: {'✅ Confirmed' if my_confirmed else '❌ Not confirmed'}\n"
-    message += f"{other_username}: {'✅ Confirmed' if other_confirmed else '❌ Not confirmed'}\n"
+    message += f"You: {'✅ Confirmed' if trade[f'{side}_confirmed'] else '❌ Not confirmed'}\n"
+    message += f"{other_username}: {'✅ Confirmed' if trade[f'{other_side}_confirmed'] else '❌ Not confirmed'}\n"
+    return message
+
+async def show_trade_interface(context, trade, user_id):
+    """Show the trade interface to a user, editing their trade message if there is one."""
+    message = format_trade_interface(trade, user_id)
     
     # Create the keyboard
     keyboard = create_trade_interface_keyboard(trade, user_id)
     
     # Send or edit the message
+    message_id = trade[f"{get_side(trade, user_id)}_message_id"]
     try:
         # Try to edit existing message if any
-        if "trade_message_id" in context.user_data:
+        if message_id:
             await context.bot.edit_message_text(
                 chat_id=user_id,
-                message_id=context.user_data["trade_message_id"],
-                text=message,
-                reply_markup=keyboard,
-                parse_mode="Markdown"
-            )
-        else:
-            # Send a new message
-            message_obj = await context.bot.send_message(
-                chat_id=user_id,
+                message_id=message_id,
                 text=message,
                 reply_markup=keyboard,
                 parse_mode="Markdown"
             )
-            context.user_data["trade_message_id"] = message_obj.message_id
+            return
     except Exception as e:
         logger.error(f"Error showing trade interface: {e}")
-        # Just send a new message if editing fails
-        message_obj = await context.bot.send_message(
-            chat_id=user_id,
-            text=message,
-            reply_markup=keyboard,
-            parse_mode="Markdown"
-        )
-        context.user_data["trade_message_id"] = message_obj.message_id
+    
+    # Send a new message if there is none or editing fails
+    message_obj = await context.bot.send_message(
+        chat_id=user_id,
+        text=message,
+        reply_markup=keyboard,
+        parse_mode="Markdown"
+    )
+    set_message_id(trade["id"], user_id, message_obj.message_id)
 
-def create_trade_interface_keyboard(trade, user_id, confirmed=None):
+def create_trade_interface_keyboard(trade, user_id):
     """Create the keyboard for the trade interface."""
     # Check if the user has confirmed the trade
-    if confirmed is None:
-        if user_id == trade["user1_id"]:
-            confirmed = trade["user1_confirmed"]
-        else:
-            confirmed = trade["user2_confirmed"]
+    confirmed = trade[f"{get_side(trade, user_id)}_confirmed"]
     
     keyboard = []
     
     if not confirmed:
         # Add buttons to add/remove Pokemon
         keyboard.append([
-            InlineKeyboardButton("➕ Add Pokemon", callback_data=f"trade_add_{trade['trade_id']}"),
-            InlineKeyboardButton("➖ Remove Pokemon", callback_data=f"trade_remove_{trade['trade_id']}")
+            InlineKeyboardButton("➕ Add Pokemon", callback_data=f"trade_add_{trade['id']}"),
+            InlineKeyboardButton("➖ Remove Pokemon", callback_data=f"trade_remove_{trade['id']}")
         ])
-        
+    
         # Add confirm button
         keyboard.append([
-            InlineKeyboardButton("✅ Confirm Trade", callback_data=f"trade_confirm_{trade['trade_id']}")
+            InlineKeyboardButton("✅ Confirm Trade", callback_data=f"trade_confirm_{trade['id']}")
         ])
     
     # Always add cancel button
     keyboard.append([
-        InlineKeyboardButton("❌ Cancel Trade", callback_data=f"trade_cancel_{trade['trade_id']}")
+        InlineKeyboardButton("❌ Cancel Trade", callback_data=f"trade_cancel_{trade['id']}")
     ])
     
     return InlineKeyboardMarkup(keyboard)
 
-async def show_pokemon_selection(query, user_id):
-    """Show a Pokemon selection interface for trading."""
-    user = get_user(user_id)
+async def add_selected_pokemon(update, context, trade, user_id, selected_pokemon):
+    """Add a Pokemon to the user's offer and refresh both trade interfaces.
+
+    Returns the text to answer the callback query with.
+    """
+    trade_id = trade["id"]
     
-    # Create the message
-    message = "Select a Pokemon to add to the trade:\n\n"
+    # Lock the Pokemon for this trade, then add it to the offer
+    if not escrow_pokemon(trade_id, user_id, selected_pokemon.pokemon_id):
+        return f"{selected_pokemon.name} is already offered in another trade."
     
-    # Create the keyboard
-    keyboard = []
-    trade_id = query.data.split("_")[2]
+    updated_trade = add_offer(
+        trade_id, user_id, selected_pokemon.pokemon_id, selected_pokemon.name, get_cp(selected_pokemon)
+    )
+    if not updated_trade:
+        release_pokemon(trade_id, selected_pokemon.pokemon_id)
+        return f"Failed to add {selected_pokemon.name} to the trade."
     
-    for i, pokemon in enumerate(user.pokemons):
-        button = InlineKeyboardButton(
-            f"{pokemon.name} (CP: {pokemon.calculate_cp()})",
-            callback_data=f"trade_select_{trade_id}_{i}"
-        )
-        keyboard.append([button])
+    # Notify the other user
+    other_user_id = updated_trade[f"{get_other_side(get_side(updated_trade, user_id))}_id"]
+    await context.bot.send_message(
+        chat_id=other_user_id,
+        text=f"{update.effective_user.first_name} added {selected_pokemon.name} to the trade."
+    )
     
-    # Add cancel button
-    keyboard.append([
-        InlineKeyboardButton("❌ Cancel", callback_data=f"trade_add_cancel")
-    ])
+    # Show the updated trade interface to both users
+    await refresh_trade_interfaces(context, updated_trade)
+    return f"Added {selected_pokemon.name} to the trade."
+
+async def show_pokemon_selection(query, user_id, trade_id, sort="c", page=0):
+    """Show a paginated Pokemon selection interface for trading."""
+    user = get_user(user_id)
     
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    # Create the message
+    message = "Select a Pokemon to add to the trade:\n\n"
+    
+    # Create the keyboard with a cancel button
+    reply_markup = create_picker_keyboard(
+        user, f"trade_pick_{trade_id}", sort=sort, page=page,
+        extra_rows=[[InlineKeyboardButton("❌ Cancel", callback_data=f"trade_back_{trade_id}")]]
+    )
     
     # Edit the message
     await query.edit_message_text(
@@ -499,32 +430,23 @@ async def show_pokemon_selection(query, user_id):
 async def show_offered_pokemon_selection(query, trade, user_id):
     """Show a selection interface for Pokemon already offered in the trade."""
     # Determine which offer list to use
-    offer_list = trade["user1_offer"] if user_id == trade["user1_id"] else trade["user2_offer"]
-    
-    # Get the user and their Pokemon
-    user = get_user(user_id)
+    offer_list = trade[f"{get_side(trade, user_id)}_offer"]
     
     # Create the message
     message = "Select a Pokemon to remove from the trade:\n\n"
     
-    # Create the keyboard
+    # Create the keyboard from the labels stored in the trade
     keyboard = []
-    trade_id = query.data.split("_")[2]
-    
     for i, pokemon_id in enumerate(offer_list):
-        # Find the Pokemon in the user's collection
-        for pokemon in user.pokemons:
-            if pokemon.pokemon_id == pokemon_id:
-                button = InlineKeyboardButton(
-                    f"{pokemon.name} (CP: {pokemon.calculate_cp()})",
-                    callback_data=f"trade_select_{trade_id}_{i}"
-                )
-                keyboard.append([button])
-                break
+        button = InlineKeyboardButton(
+            get_offer_label(trade, pokemon_id),
+            callback_data=f"trade_select_{trade['id']}_{i}"
+        )
+        keyboard.append([button])
     
     # Add cancel button
     keyboard.append([
-        InlineKeyboardButton("❌ Cancel", callback_data=f"trade_remove_cancel")
+        InlineKeyboardButton("❌ Cancel", callback_data=f"trade_back_{trade['id']}")
     ])
     
     reply_markup = InlineKeyboardMarkup(keyboard)
@@ -535,31 +457,15 @@ async def show_offered_pokemon_selection(query, trade, user_id):
         reply_markup=reply_markup
     )
 
-async def notify_trade_completed(context, trade):
-    """Notify both users that the trade has been completed."""
-    # Get the users
-    trader1 = get_user(trade["user1_id"])
-    trader2 = get_user(trade["user2_id"])
-    
-    # Get the Pokemon objects for each side of the trade
-    trader1_pokemon = []
-    for pokemon_id in trade["user1_offer"]:
-        for pokemon in trader1.pokemons:
-            if pokemon.pokemon_id == pokemon_id:
-                trader1_pokemon.append(pokemon)
-                break
-    
-    trader2_pokemon = []
-    for pokemon_id in trade["user2_offer"]:
-        for pokemon in trader2.pokemons:
-            if pokemon.pokemon_id == pokemon_id:
-                trader2_pokemon.append(pokemon)
-                break
+async def notify_trade_completed(context, trade, trader1_pokemon, trader2_pokemon):
+    """Notify both users that the trade has been completed.
     
+    trader1_pokemon and trader2_pokemon are the Pokemon given by each side.
+    """
     # Create the messages
     message1 = (
         "🎉 *Trade Completed!* 🎉\n\n"
-        f"You traded with {trader2.get_display_name()}\n\n"
+        f"You traded with {trade['user2_name']}\n\n"
         f"*You gave:*\n"
     )
     for pokemon in trader1_pokemon:
@@ -571,7 +477,7 @@ async def notify_trade_completed(context, trade):
     
     message2 = (
         "🎉 *Trade Completed!* 🎉\n\n"
-        f"You traded with {trader1.get_display_name()}\n\n"
+        f"You traded with {trade['user1_name']}\n\n"
         f"*You gave:*\n"
     )
     for pokemon in trader2_pokemon:
@@ -583,13 +489,13 @@ async def notify_trade_completed(context, trade):
     
     # Send the messages
     await context.bot.send_message(
-        chat_id=trader1.user_id,
+        chat_id=trade["user1_id"],
         text=message1,
         parse_mode="Markdown"
     )
     
     await context.bot.send_message(
-        chat_id=trader2.user_id,
+        chat_id=trade["user2_id"],
         text=message2,
         parse_mode="Markdown"
     )
@@ -0,0 +1,87 @@
+import json
+import logging
+import os
+from typing import Any, List
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Directory with the bot's persistent JSON files
+DATA_DIR = "data"
+
+def data_path(filename: str) -> str:
+    """Get the path of a file inside the data directory."""
+    return os.path.join(DATA_DIR, filename)
+
+def load_json(path: str, default: Any = None) -> Any:
+    """Load a JSON file, returning the default if it is missing or unreadable."""
+    if not os.path.exists(path):
+        return default
+
+    try:
+        with metrics.JSON_FILE_SECONDS.labels("load", os.path.basename(path)).time():
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error(f"Не удалось прочитать файл {path}: {e}")
+        return default
+
+def save_json(path: str, data: Any, indent: int = 2, durable: bool = False) -> None:
+    """Atomically write data to a JSON file.
+
+    The data is written to a temporary file first and then moved over the
+    target, so readers never see a half-written file. With durable=True the
+    file is also fsync'd before it replaces the target.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = f"{path}.tmp"
+    with metrics.JSON_FILE_SECONDS.labels("save", os.path.basename(path)).time():
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=indent)
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+def append_json_line(path: str, record: Any) -> None:
+    """Append a record to a JSON lines log and fsync it.
+
+    Once this returns the record survives a crash of the process or the
+    machine. Used for changes that must not be lost between two rewrites of
+    a JSON file.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with metrics.JSON_FILE_SECONDS.labels("append", os.path.basename(path)).time():
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+def load_json_lines(path: str) -> List[Any]:
+    """Load the records of a JSON lines log. A line cut off by a crash is skipped."""
+    if not os.path.exists(path):
+        return []
+
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                logger.warning(f"Пропущена поврежденная запись в {path}")
+    return records
+
+def truncate_json_lines(path: str) -> None:
+    """Empty a JSON lines log once its records are saved elsewhere."""
+    if os.path.exists(path):
+        with open(path, "w", encoding="utf-8") as f:
+            os.fsync(f.fileno())
@@ -0,0 +1,282 @@
+"""
+Leaderboards for /top.
+
+Every metric has a global board and one board per group chat. A board is an
+indexable skip list ordered by (score descending, user_id), so top-N pages and
+a player's rank are answered in O(log n) without scanning the users. The boards
+are built once from the users file at startup and then updated from the
+storage save/delete hooks.
+"""
+
+import logging
+import random
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import storage_hooks
+from json_store import data_path, load_json, save_json
+from user_scan import iter_user_projections
+
+logger = logging.getLogger(__name__)
+
+GROUP_MEMBERS_FILE = data_path("group_members.json")
+
+# Metric key -> (title, projection field, function computing it from a User)
+METRICS: Dict[str, Tuple[str, str, Callable[[Any], int]]] = {
+    "balance": ("💰 Богачи", "balance", lambda user: user.balance),
+    "caught": ("🎯 Ловцы", "caught_pokemon_count", lambda user: user.caught_pokemon_count),
+    "cp": ("⚔️ Сила коллекции", "collection_cp", lambda user: sum(p.calculate_cp() for p in user.pokemons)),
+    "league": ("🏆 Лиги", "league", lambda user: user.league)
+}
+
+_MAX_LEVEL = 32
+_P = 0.25
+
+class _Node:
+    __slots__ = ("key", "forward", "width")
+
+    def __init__(self, key: Optional[Tuple[int, int]], level: int):
+        self.key = key
+        self.forward: List[Optional["_Node"]] = [None] * level
+        self.width: List[int] = [1] * level
+
+class IndexableSkipList:
+    """Sorted set with O(log n) insert, remove, rank and positional access."""
+
+    def __init__(self):
+        self._head = _Node(None, _MAX_LEVEL)
+        self._level = 1
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _random_level(self) -> int:
+        level = 1
+        while level < _MAX_LEVEL and random.random() < _P:
+            level += 1
+        return level
+
+    def insert(self, key: Tuple[int, int]) -> None:
+        update = [self._head] * _MAX_LEVEL
+        steps = [0] * _MAX_LEVEL
+        node = self._head
+        for i in range(self._level - 1, -1, -1):
+            while node.forward[i] is not None and node.forward[i].key < key:
+                steps[i] += node.width[i]
+                node = node.forward[i]
+            update[i] = node
+
+        level = self._random_level()
+        if level > self._level:
+            for i in range(self._level, level):
+                update[i] = self._head
+                self._head.width[i] = self._size + 1
+            self._level = level
+
+        new_node = _Node(key, level)
+        passed = 0
+        for i in range(level):
+            prev = update[i]
+            new_node.forward[i] = prev.forward[i]
+            prev.forward[i] = new_node
+            new_node.width[i] = prev.width[i] - passed
+            prev.width[i] = passed + 1
+            passed += steps[i]
+        for i in range(level, self._level):
+            update[i].width[i] += 1
+        self._size += 1
+
+    def remove(self, key: Tuple[int, int]) -> bool:
+        update = [self._head] * _MAX_LEVEL
+        node = self._head
+        for i in range(self._level - 1, -1, -1):
+            while node.forward[i] is not None and node.forward[i].key < key:
+                node = node.forward[i]
+            update[i] = node
+
+        target = node.forward[0]
+        if target is None or target.key != key:
+            return False
+
+        for i in range(self._level):
+            if update[i].forward[i] is target:
+                update[i].width[i] += target.width[i] - 1
+                update[i].forward[i] = target.forward[i]
+            else:
+                update[i].width[i] -= 1
+        while self._level > 1 and self._head.forward[self._level - 1] is None:
+            self._level -= 1
+        self._size -= 1
+        return True
+
+    def rank(self, key: Tuple[int, int]) -> Optional[int]:
+        """Get the 0-based position of a key, or None if it is missing."""
+        position = 0
+        node = self._head
+        for i in range(self._level - 1, -1, -1):
+            while node.forward[i] is not None and node.forward[i].key <= key:
+                position += node.width[i]
+                node = node.forward[i]
+        if node is not self._head and node.key == key:
+            return position - 1
+        return None
+
+    def slice(self, start: int, count: int) -> List[Tuple[int, int]]:
+        """Get up to `count` keys starting at a 0-based position."""
+        if start < 0 or start >= self._size or count <= 0:
+            return []
+        target = start + 1
+        position = 0
+        node = self._head
+        for i in range(self._level - 1, -1, -1):
+            while node.forward[i] is not None and position + node.width[i] <= target:
+                position += node.width[i]
+                node = node.forward[i]
+
+        keys = []
+        while node is not None and len(keys) < count:
+            keys.append(node.key)
+            node = node.forward[0]
+        return keys
+
+class Leaderboard:
+    """Players ranked by one metric."""
+
+    def __init__(self):
+        self._entries = IndexableSkipList()
+        self._scores: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def update(self, user_id: int, score: int) -> None:
+        old_score = self._scores.get(user_id)
+        if old_score == score:
+            return
+        if old_score is not None:
+            self._entries.remove((-old_score, user_id))
+        self._entries.insert((-score, user_id))
+        self._scores[user_id] = score
+
+    def remove(self, user_id: int) -> None:
+        old_score = self._scores.pop(user_id, None)
+        if old_score is not None:
+            self._entries.remove((-old_score, user_id))
+
+    def top(self, count: int, offset: int = 0) -> List[Tuple[int, int]]:
+        """Get (user_id, score) pairs of the best players."""
+        return [(user_id, -neg_score) for neg_score, user_id in self._entries.slice(offset, count)]
+
+    def rank(self, user_id: int) -> Optional[int]:
+        """Get the 1-based place of a player."""
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        return self._entries.rank((-score, user_id)) + 1
+
+    def score(self, user_id: int) -> Optional[int]:
+        return self._scores.get(user_id)
+
+# Глобальные таблицы: metric -> Leaderboard
+_global_boards: Dict[str, Leaderboard] = {}
+# Таблицы групп: chat_id -> metric -> Leaderboard
+_group_boards: Dict[int, Dict[str, Leaderboard]] = {}
+# Участники групп: chat_id -> user_ids, и обратный индекс user_id -> chat_ids
+_group_members: Dict[int, Set[int]] = {}
+_user_groups: Dict[int, Set[int]] = {}
+_usernames: Dict[int, Optional[str]] = {}
+_built = False
+
+def _new_boards() -> Dict[str, Leaderboard]:
+    return {metric: Leaderboard() for metric in METRICS}
+
+def _apply_scores(user_id: int, scores: Dict[str, int]) -> None:
+    for metric, score in scores.items():
+        _global_boards[metric].update(user_id, score)
+        for chat_id in _user_groups.get(user_id, ()):
+            _group_boards[chat_id][metric].update(user_id, score)
+
+def build() -> None:
+    """Build all boards from the users file. Called once at startup."""
+    global _built, _global_boards
+
+    _global_boards = _new_boards()
+    _group_boards.clear()
+    _group_members.clear()
+    _user_groups.clear()
+    _usernames.clear()
+
+    for chat_id, members in load_json(GROUP_MEMBERS_FILE, {}).items():
+        chat_id = int(chat_id)
+        _group_members[chat_id] = set(members)
+        _group_boards[chat_id] = _new_boards()
+        for user_id in members:
+            _user_groups.setdefault(user_id, set()).add(chat_id)
+
+    fields = ("username",) + tuple(field for _, field, _ in METRICS.values())
+    users = 0
+    for chunk in iter_user_projections(fields):
+        for user in chunk:
+            _usernames[user.user_id] = user.username
+            _apply_scores(user.user_id, {
+                metric: getattr(user, field) or 0 for metric, (_, field, _) in METRICS.items()
+            })
+            users += 1
+
+    _built = True
+    logger.info(f"Таблицы лидеров построены: {users} игроков, {len(_group_members)} групп")
+
+def _ensure_built() -> None:
+    if not _built:
+        build()
+
+def on_user_saved(user: Any) -> None:
+    """Apply the changes of a saved user to the boards."""
+    if not _built:
+        return
+    _usernames[user.user_id] = user.username
+    _apply_scores(user.user_id, {metric: compute(user) for metric, (_, _, compute) in METRICS.items()})
+
+def on_user_deleted(user_id: int) -> None:
+    """Remove a deleted user from every board."""
+    if not _built:
+        return
+    _usernames.pop(user_id, None)
+    for board in _global_boards.values():
+        board.remove(user_id)
+    for chat_id in _user_groups.get(user_id, ()):
+        for board in _group_boards[chat_id].values():
+            board.remove(user_id)
+
+def register_group_member(chat_id: int, user_id: int) -> None:
+    """Remember that a player is active in a group chat."""
+    _ensure_built()
+    members = _group_members.setdefault(chat_id, set())
+    if user_id in members:
+        return
+
+    members.add(user_id)
+    _user_groups.setdefault(user_id, set()).add(chat_id)
+    boards = _group_boards.setdefault(chat_id, _new_boards())
+    for metric, board in boards.items():
+        score = _global_boards[metric].score(user_id)
+        if score is not None:
+            board.update(user_id, score)
+
+    save_json(GROUP_MEMBERS_FILE, {str(cid): sorted(ids) for cid, ids in _group_members.items()})
+
+def get_board(metric: str, chat_id: Optional[int] = None) -> Leaderboard:
+    """Get the global board of a metric, or the board of a group chat."""
+    _ensure_built()
+    if chat_id is None:
+        return _global_boards[metric]
+    return _group_boards.get(chat_id, {}).get(metric) or Leaderboard()
+
+def get_display_name(user_id: int) -> str:
+    username = _usernames.get(user_id)
+    return f"@{username}" if username else f"Игрок {user_id}"
+
+def install() -> None:
+    """Subscribe the boards to storage changes."""
+    storage_hooks.add_save_listener(on_user_saved)
+    storage_hooks.add_delete_listener(on_user_deleted)
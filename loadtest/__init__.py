@@ -0,0 +1,16 @@
+"""
+End-to-end load tests of the bot without live Telegram or PokeAPI.
+
+The bot's Application processes generated updates while its outbound calls
+go to local stand-ins:
+- fake_telegram.FakeTelegram answers the Bot API methods the handlers use
+  and records the latency it adds per method;
+- fake_pokeapi.FakePokeAPI serves recorded or synthesised PokeAPI fixtures
+  with a configurable delay.
+
+scenarios.py generates the traffic (group spam, spawn storms, catch races,
+trade flows, shop bursts) and driver.py feeds it to
+Application.process_update at a controlled rate and reports updates/sec,
+p50/p99 latency and memory. Run it with:
+    python -m loadtest --scenario catch_race --count 2000 --rate 200
+"""
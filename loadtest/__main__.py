@@ -0,0 +1,75 @@
+"""
+Run a load test scenario against the local stand-ins:
+    python -m loadtest --scenario catch_race --count 2000 --rate 200
+    python -m loadtest --scenario all --json > results.json
+
+Every scenario of "all" runs in its own process, so state, caches and peak
+memory of one scenario do not leak into the next.
+"""
+
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+from loadtest import driver, scenarios
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m loadtest", description="Load test the bot with local stand-ins.")
+    parser.add_argument("--scenario", default="all", choices=["all", *scenarios.SCENARIOS], help="traffic to generate")
+    parser.add_argument("--count", type=int, default=1000, help="measured updates")
+    parser.add_argument("--rate", type=float, default=100.0, help="updates per second (0 - as fast as possible)")
+    parser.add_argument("--concurrency", type=int, default=1, help="updates processed at the same time")
+    parser.add_argument("--users", type=int, default=50, help="simulated users")
+    parser.add_argument("--chats", type=int, default=5, help="simulated group chats")
+    parser.add_argument("--telegram-delay-ms", type=float, default=30.0, help="Bot API stand-in response delay")
+    parser.add_argument("--pokeapi-delay-ms", type=float, default=80.0, help="PokeAPI stand-in response delay")
+    parser.add_argument("--workdir", help="data directory of the bot (default: a new temporary directory)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the scenario")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    return parser.parse_args(argv)
+
+async def run_scenario(args: argparse.Namespace) -> Dict[str, Any]:
+    scenario = scenarios.build(args.scenario, args.count, args.users, args.chats, args.seed)
+    report = await driver.run(
+        scenario.setup,
+        driver.paced(scenario.updates, args.rate),
+        concurrency=args.concurrency,
+        telegram_delay_ms=args.telegram_delay_ms,
+        pokeapi_delay_ms=args.pokeapi_delay_ms,
+        workdir=args.workdir
+    )
+    report["scenario"] = args.scenario
+    return report
+
+def run_all(argv: List[str], as_json: bool) -> None:
+    reports = []
+    for name in scenarios.SCENARIOS:
+        command = [sys.executable, "-m", "loadtest", *argv, "--scenario", name, "--json"]
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            sys.stderr.write(result.stderr)
+            raise SystemExit(f"Scenario {name} failed")
+        report = json.loads(result.stdout)
+        reports.append(report)
+        if not as_json:
+            print(driver.format_report(name, report))
+    if as_json:
+        print(json.dumps(reports, indent=2))
+
+def main(argv: List[str]) -> None:
+    args = parse_args(argv)
+    if args.scenario == "all":
+        run_all([arg for arg in argv if arg != "--json"], args.json)
+        return
+
+    report = asyncio.run(run_scenario(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(driver.format_report(args.scenario, report))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
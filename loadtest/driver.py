@@ -0,0 +1,230 @@
+"""
+Feed updates to Application.process_update on a schedule and measure it.
+
+A producer puts every update on a queue at its due time; workers take them
+off and process them. Latency is counted from the due time, not from when a
+worker got to the update, so a bot that falls behind shows it in p99
+instead of quietly slowing the producer down. With the default single
+worker updates are processed one by one, as the bot does in production
+(concurrent_updates is off).
+
+run() is the whole test: stand-ins, the bot in a fresh data directory,
+setup updates, then the measured schedule. Unless a working directory is
+given, the data directory is temporary and removed after the run. With
+bot_dir the bot's modules are imported from another checkout, so two
+versions of the bot can be compared with the same harness (see replay.py).
+"""
+
+import asyncio
+import contextlib
+import importlib
+import logging
+import os
+import resource
+import shutil
+import sys
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from telegram import Update
+from telegram.ext import Application
+
+from loadtest.fake_pokeapi import FakePokeAPI
+from loadtest.fake_telegram import BOT_TOKEN, FakeTelegram
+from loadtest.scenarios import Item
+
+logger = logging.getLogger(__name__)
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Настройки бота под нагрузочным тестом: без порта метрик и без сторожа цикла
+BOT_ENVIRONMENT = {
+    "BOT_TOKEN": BOT_TOKEN,
+    "LOG_LEVEL": "WARNING",
+    "METRICS_PORT": "0",
+    "LOOP_WATCHDOG_THRESHOLD_MS": "0"
+}
+
+def prepare_workdir(workdir: str, bot_dir: Optional[str] = None) -> str:
+    """Switch to workdir with a data directory holding a copy of the species dataset.
+
+    Must run before the bot's modules are imported: they resolve data/ and
+    read the environment at import time.
+    """
+    bot_dir = os.path.abspath(bot_dir or REPO_DIR)
+    workdir = os.path.abspath(workdir)
+    os.makedirs(os.path.join(workdir, "data"), exist_ok=True)
+    # Датасет берется из этой копии, чтобы у сравниваемых версий он был одинаковым
+    dataset = os.path.join(REPO_DIR, "data", "pokemon_dataset.json")
+    if os.path.exists(dataset):
+        shutil.copy(dataset, os.path.join(workdir, "data"))
+    if os.path.realpath(bot_dir) != os.path.realpath(REPO_DIR):
+        # Модули, которых нет в другой версии, не должны тихо браться из этой копии
+        excluded = {os.path.realpath(REPO_DIR), os.path.realpath(os.getcwd())}
+        sys.path[:] = [path for path in sys.path if os.path.realpath(path or os.curdir) not in excluded]
+    os.chdir(workdir)
+    sys.path.insert(0, bot_dir)
+    for key, value in BOT_ENVIRONMENT.items():
+        os.environ.setdefault(key, value)
+    return workdir
+
+def load_application(telegram: FakeTelegram, pokeapi: FakePokeAPI) -> Application:
+    """Import bot.py against the running stand-ins and return its Application."""
+    import config
+    config.TELEGRAM_API_BASE_URL = f"{telegram.url}/bot"
+    config.POKEAPI_BASE_URL = f"{pokeapi.url}/api/v2"
+    return importlib.import_module("bot").application
+
+async def close_sessions() -> None:
+    """Close the bot's PokeAPI session and write the stores with batched writes."""
+    import pokemon_api
+    import session_store
+    if pokemon_api.session is not None and not pokemon_api.session.closed:
+        await pokemon_api.session.close()
+    # Пока рабочий каталог на месте: иначе запись при выходе попадет в data/ текущего каталога
+    if hasattr(session_store, "flush_all"):
+        session_store.flush_all()
+
+def paced(items: Iterable[Item], rate: float) -> List[Tuple[float, Item]]:
+    """Schedule items evenly at rate per second (0 - all at once)."""
+    return [(i / rate if rate > 0 else 0.0, item) for i, item in enumerate(items)]
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдает килобайты, macOS - байты
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+async def process_all(application: Application, telegram: FakeTelegram, items: Iterable[Item]) -> None:
+    """Process updates one by one without measuring them, e.g. scenario setup."""
+    for item in items:
+        data = item(telegram) if callable(item) else item
+        if data is not None:
+            await application.process_update(Update.de_json(data, application.bot))
+
+async def drive(
+    application: Application,
+    telegram: FakeTelegram,
+    schedule: List[Tuple[float, Item]],
+    concurrency: int = 1
+) -> Dict[str, Any]:
+    """Process scheduled (offset in seconds, update) pairs and report throughput and latency."""
+    queue: asyncio.Queue = asyncio.Queue()
+    latencies: List[float] = []
+    errors = 0
+    skipped = 0
+    loop = asyncio.get_running_loop()
+    # Счетчики запросов заглушки только за измеряемую часть
+    telegram.latencies.clear()
+    start = loop.time()
+
+    async def produce() -> None:
+        for offset, item in schedule:
+            delay = start + offset - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            queue.put_nowait((start + offset, item))
+        for _ in range(concurrency):
+            queue.put_nowait(None)
+
+    async def work() -> None:
+        nonlocal errors, skipped
+        while True:
+            entry = await queue.get()
+            if entry is None:
+                return
+            due, item = entry
+            data = item(telegram) if callable(item) else item
+            if data is None:
+                skipped += 1
+                continue
+            try:
+                await application.process_update(Update.de_json(data, application.bot))
+            except Exception as e:
+                errors += 1
+                logger.error(f"Ошибка при обработке обновления {data.get('update_id')}: {e}")
+            latencies.append(loop.time() - due)
+
+    await asyncio.gather(produce(), *(work() for _ in range(concurrency)))
+    elapsed = loop.time() - start
+
+    # Импорт после загрузки бота: при bot_dir метрики должны быть из той же версии
+    import metrics
+
+    # Задержки на стороне бота, включая ожидание соединения (в гистограммах есть и подготовка)
+    bot_api = {
+        method: {
+            "count": count,
+            "p50_ms": metrics.TELEGRAM_SECONDS.labels(method).quantile(0.5) * 1000,
+            "p99_ms": metrics.TELEGRAM_SECONDS.labels(method).quantile(0.99) * 1000
+        }
+        for method, count in telegram.counts().items()
+    }
+    return {
+        "updates": len(latencies),
+        "skipped": skipped,
+        "errors": errors,
+        "seconds": elapsed,
+        "updates_per_second": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": max(latencies, default=0.0) * 1000,
+        "peak_rss_mb": peak_rss_mb(),
+        "bot_api": bot_api
+    }
+
+async def run(
+    setup: Iterable[Item],
+    schedule: List[Tuple[float, Item]],
+    concurrency: int = 1,
+    telegram_delay_ms: float = 0.0,
+    pokeapi_delay_ms: float = 0.0,
+    workdir: Optional[str] = None,
+    bot_dir: Optional[str] = None
+) -> Dict[str, Any]:
+    """Start the stand-ins and the bot, process setup, then measure the schedule."""
+    with contextlib.ExitStack() as cleanup:
+        if workdir is None:
+            workdir = cleanup.enter_context(tempfile.TemporaryDirectory(prefix="loadtest-"))
+        # Выходим из временного каталога до его удаления
+        cleanup.callback(os.chdir, os.getcwd())
+        prepare_workdir(workdir, bot_dir)
+
+        telegram = FakeTelegram(telegram_delay_ms).start()
+        pokeapi = FakePokeAPI(pokeapi_delay_ms).start()
+        try:
+            application = load_application(telegram, pokeapi)
+            await application.initialize()
+            try:
+                await process_all(application, telegram, setup)
+                report = await drive(application, telegram, schedule, concurrency)
+            finally:
+                await application.shutdown()
+                await close_sessions()
+            report["pokeapi"] = pokeapi.counts()
+            return report
+        finally:
+            telegram.stop()
+            pokeapi.stop()
+
+def format_report(name: str, report: Dict[str, Any]) -> str:
+    """Render a drive() report as text."""
+    lines = [
+        f"{name}: {report['updates']} updates in {report['seconds']:.2f} s, "
+        f"{report['updates_per_second']:.1f} updates/s",
+        f"  latency p50 {report['p50_ms']:.1f} ms, p99 {report['p99_ms']:.1f} ms, max {report['max_ms']:.1f} ms",
+        f"  errors {report['errors']}, skipped {report['skipped']}, peak RSS {report['peak_rss_mb']:.1f} MB"
+    ]
+    for method, stats in report["bot_api"].items():
+        lines.append(
+            f"  Bot API {method}: {stats['count']} calls, p50 {stats['p50_ms']:.1f} ms, p99 {stats['p99_ms']:.1f} ms"
+        )
+    for resource_name, count in report.get("pokeapi", {}).items():
+        lines.append(f"  PokeAPI {resource_name}: {count} requests")
+    return "\n".join(lines)
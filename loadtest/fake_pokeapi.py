@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+PokeAPI stand-in for the load tests.
+
+Serves /api/v2/pokemon/{name or id}, /pokemon-species/{id},
+/evolution-chain/{id} and /pokemon?limit=N with a configurable delay.
+Responses come from fixtures recorded from the real PokeAPI:
+    python -m loadtest.fake_pokeapi --limit 151
+saves them to loadtest/fixtures/. Resources without a recorded fixture are
+synthesised from the local species dataset (pokemon_dataset.load_species()),
+which is enough for every handler. Absolute pokeapi.co URLs inside the
+fixtures are rewritten to the stand-in's own address.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+from aiohttp import web
+
+from loadtest.stand_in import StandIn
+
+POKEAPI_URL = "https://pokeapi.co/api/v2"
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+RESOURCES = ("pokemon", "pokemon-species", "evolution-chain")
+
+ROMAN = ["", "i", "ii", "iii", "iv", "v", "vi", "vii", "viii", "ix"]
+
+def _fixture_path(resource: str, key: str) -> str:
+    return os.path.join(FIXTURES_DIR, resource, f"{key}.json")
+
+def synthesise(species: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Build PokeAPI-shaped records from pokemon_dataset species records.
+
+    Returns {resource: {key: record}}; Pokemon are keyed by name and ID.
+    """
+    by_name = {record["name"]: record for record in species}
+    parents = {child: record["name"] for record in species for child in record["evolves_to"]}
+
+    def root_of(name: str) -> str:
+        while name in parents:
+            name = parents[name]
+        return name
+
+    def link(name: str) -> Dict[str, Any]:
+        children = by_name[name]["evolves_to"] if name in by_name else []
+        return {"species": {"name": name}, "evolves_to": [link(child) for child in children]}
+
+    records: Dict[str, Dict[str, Any]] = {resource: {} for resource in RESOURCES}
+    for record in species:
+        pokedex_id = record["id"]
+        root = by_name.get(root_of(record["name"]), record)
+        pokemon = {
+            "id": pokedex_id,
+            "name": record["name"],
+            "base_experience": 64,
+            "height": 7,
+            "weight": 69,
+            "stats": [{"base_stat": value, "effort": 0, "stat": {"name": name}} for name, value in record["stats"].items()],
+            "types": [{"slot": i, "type": {"name": name}} for i, name in enumerate(record["types"], 1)],
+            "abilities": [
+                {"ability": {"name": name}, "is_hidden": False, "slot": i} for i, name in enumerate(record["abilities"], 1)
+            ],
+            "sprites": {
+                "front_default": f"https://example.invalid/sprites/{pokedex_id}.png",
+                "other": {"official-artwork": {"front_default": f"https://example.invalid/artwork/{pokedex_id}.png"}}
+            },
+            "species": {"name": record["name"], "url": f"{POKEAPI_URL}/pokemon-species/{pokedex_id}/"}
+        }
+        records["pokemon"][record["name"]] = pokemon
+        records["pokemon"][str(pokedex_id)] = pokemon
+        records["pokemon-species"][str(pokedex_id)] = {
+            "id": pokedex_id,
+            "name": record["name"],
+            "capture_rate": 45,
+            "is_legendary": False,
+            "generation": {"name": f"generation-{ROMAN[record['generation']] if record['generation'] < len(ROMAN) else 'i'}"},
+            "evolution_chain": {"url": f"{POKEAPI_URL}/evolution-chain/{root['id']}/"}
+        }
+        if root is record:
+            records["evolution-chain"][str(pokedex_id)] = {"id": pokedex_id, "chain": link(record["name"])}
+    return records
+
+class FakePokeAPI(StandIn):
+    """Local PokeAPI server backed by fixtures."""
+
+    def __init__(self, delay_ms: float = 0.0, species: Optional[List[Dict[str, Any]]] = None):
+        super().__init__(delay_ms)
+        if species is None:
+            import pokemon_dataset
+            species = pokemon_dataset.load_species()
+        self.synthesised = synthesise(species)
+        self.species = species
+        # Тексты ответов с уже переписанными адресами
+        self._bodies: Dict[str, Optional[str]] = {}
+
+    def routes(self) -> List[web.RouteDef]:
+        return [
+            web.get("/api/v2/pokemon", self.handle_list),
+            web.get("/api/v2/{resource}/{key}", self.handle),
+            web.get("/api/v2/{resource}/{key}/", self.handle)
+        ]
+
+    def _body(self, resource: str, key: str) -> Optional[str]:
+        cache_key = f"{resource}/{key}"
+        if cache_key not in self._bodies:
+            body = None
+            path = _fixture_path(resource, key)
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    body = f.read()
+            elif key in self.synthesised.get(resource, {}):
+                body = json.dumps(self.synthesised[resource][key])
+            if body is not None:
+                body = body.replace(POKEAPI_URL, f"{self.url}/api/v2")
+            self._bodies[cache_key] = body
+        return self._bodies[cache_key]
+
+    async def handle(self, request: web.Request) -> web.Response:
+        start = time.perf_counter()
+        resource = request.match_info["resource"]
+        body = self._body(resource, request.match_info["key"].lower())
+        await self.pause()
+        self.record(resource, start)
+        if body is None:
+            return web.Response(status=404, text="Not Found")
+        return web.Response(text=body, content_type="application/json")
+
+    async def handle_list(self, request: web.Request) -> web.Response:
+        start = time.perf_counter()
+        limit = int(request.query.get("limit", 20))
+        results = [
+            {"name": record["name"], "url": f"{self.url}/api/v2/pokemon/{record['id']}/"}
+            for record in self.species[:limit]
+        ]
+        await self.pause()
+        self.record("pokemon_list", start)
+        return web.json_response({"count": len(self.species), "results": results})
+
+async def record_fixtures(limit: int) -> int:
+    """Download the Pokemon, species and evolution chains up to a Pokedex number."""
+    saved = 0
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30)) as session:
+
+        async def fetch(resource: str, key: str) -> Optional[Dict[str, Any]]:
+            nonlocal saved
+            path = _fixture_path(resource, key)
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    return json.load(f)
+            async with session.get(f"{POKEAPI_URL}/{resource}/{key}/") as response:
+                if response.status != 200:
+                    return None
+                data = await response.json()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            saved += 1
+            return data
+
+        for pokedex_id in range(1, limit + 1):
+            species = await fetch("pokemon-species", str(pokedex_id))
+            pokemon = await fetch("pokemon", str(pokedex_id))
+            if species and pokemon:
+                # Обработчики запрашивают покемонов по имени
+                os.makedirs(os.path.dirname(_fixture_path("pokemon", pokemon["name"])), exist_ok=True)
+                with open(_fixture_path("pokemon", pokemon["name"]), "w", encoding="utf-8") as f:
+                    json.dump(pokemon, f)
+                chain_id = species["evolution_chain"]["url"].rstrip("/").rsplit("/", 1)[-1]
+                await fetch("evolution-chain", chain_id)
+    return saved
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Record PokeAPI fixtures for the load tests.")
+    parser.add_argument("--limit", type=int, default=151, help="highest Pokedex number to record")
+    args = parser.parse_args()
+
+    saved = asyncio.run(record_fixtures(args.limit))
+    print(f"Saved {saved} fixtures to {FIXTURES_DIR}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Bot API stand-in for the load tests.
+
+Answers POST {url}/bot{token}/{method} the way Telegram does for the methods
+the handlers call (sendMessage, sendPhoto, editMessageText, getChat,
+getChatMember, answerCallbackQuery, ...). Messages get increasing IDs per
+chat, and the callback data of the last inline keyboard sent to each chat
+is kept so that scenarios can press its buttons (see scenarios.py).
+"""
+
+import itertools
+import json
+import time
+from collections import defaultdict
+from typing import Any, Dict, List
+
+from aiohttp import web
+
+from loadtest.stand_in import StandIn
+
+BOT_ID = 123456
+BOT_TOKEN = f"{BOT_ID}:LOADTEST"
+BOT_USER = {
+    "id": BOT_ID,
+    "is_bot": True,
+    "first_name": "Load Test Bot",
+    "username": "loadtest_bot",
+    "can_join_groups": True,
+    "can_read_all_group_messages": False,
+    "supports_inline_queries": False
+}
+
+def _chat(chat_id: int) -> Dict[str, Any]:
+    if chat_id < 0:
+        return {"id": chat_id, "type": "supergroup", "title": f"Load test group {-chat_id}"}
+    return {"id": chat_id, "type": "private", "first_name": f"User {chat_id}"}
+
+def _parse_params(form) -> Dict[str, Any]:
+    # PTB отправляет сложные параметры (reply_markup и т.п.) строками JSON
+    params = {}
+    for key, value in form.items():
+        if not isinstance(value, str):
+            continue
+        try:
+            params[key] = json.loads(value)
+        except ValueError:
+            params[key] = value
+    return params
+
+def _callback_data(reply_markup: Any) -> List[str]:
+    if not isinstance(reply_markup, dict):
+        return []
+    return [
+        button["callback_data"]
+        for row in reply_markup.get("inline_keyboard", [])
+        for button in row
+        if "callback_data" in button
+    ]
+
+class FakeTelegram(StandIn):
+    """Local Bot API server that records per-method latency."""
+
+    def __init__(self, delay_ms: float = 0.0):
+        super().__init__(delay_ms)
+        self._message_ids: Dict[int, itertools.count] = defaultdict(lambda: itertools.count(1))
+        # chat_id -> callback_data кнопок последней клавиатуры
+        self.buttons: Dict[int, List[str]] = {}
+
+    def routes(self) -> List[web.RouteDef]:
+        return [web.post("/bot{token}/{method}", self.handle)]
+
+    def find_button(self, chat_id: int, prefix: str) -> str:
+        """Get the callback data of a button of the last keyboard sent to a chat."""
+        for data in self.buttons.get(chat_id, []):
+            if data.startswith(prefix):
+                return data
+        return ""
+
+    def _message(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        chat_id = int(params.get("chat_id", 0))
+        message_id = params.get("message_id") or next(self._message_ids[chat_id])
+        message = {"message_id": message_id, "date": int(time.time()), "chat": _chat(chat_id), "from": BOT_USER}
+        if method == "sendPhoto":
+            message["photo"] = [
+                {"file_id": f"photo-{chat_id}-{message_id}", "file_unique_id": f"p{message_id}", "width": 475, "height": 475}
+            ]
+            message["caption"] = params.get("caption", "")
+        else:
+            message["text"] = params.get("text", "")
+        if "reply_markup" in params:
+            message["reply_markup"] = params["reply_markup"]
+            self.buttons[chat_id] = _callback_data(params["reply_markup"])
+        return message
+
+    def _result(self, method: str, params: Dict[str, Any]) -> Any:
+        if method == "getMe":
+            return BOT_USER
+        if method == "getChat":
+            return _chat(int(params.get("chat_id", 0)))
+        if method == "getChatMember":
+            return {"status": "member", "user": BOT_USER}
+        if (method.startswith("send") or method.startswith("edit")) and "chat_id" in params:
+            return self._message(method, params)
+        # answerCallbackQuery, deleteMessage, setMyCommands, правки inline-сообщений и т.п.
+        return True
+
+    async def handle(self, request: web.Request) -> web.Response:
+        start = time.perf_counter()
+        method = request.match_info["method"]
+        params = _parse_params(await request.post())
+        await self.pause()
+        response = web.json_response({"ok": True, "result": self._result(method, params)})
+        self.record(method, start)
+        return response
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Replay a recording of real traffic (update_recorder.py) against the stand-ins.
+
+Updates are fed to the bot at their recorded pace, sped up SPEED times:
+    python -m loadtest.replay updates.jsonl.gz --speed 20
+
+--against compares two versions of the bot on the same traffic in one
+command. The given git revision is checked out into a temporary worktree
+and both versions replay the recording in their own process with this
+harness; the report shows throughput and latency side by side:
+    python -m loadtest.replay updates.jsonl.gz --speed 20 --against main
+
+The other revision must have the configurable Bot API and PokeAPI base URLs
+(config.TELEGRAM_API_BASE_URL, config.POKEAPI_BASE_URL). Callback queries
+for sessions that only existed in production (trades, battles) reach the
+handlers as expired sessions, as they would after a restart.
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict, List, Tuple
+
+from loadtest import driver
+
+logger = logging.getLogger(__name__)
+
+# Metrics shown by --against: (report key, title, higher is better)
+COMPARED = [
+    ("updates_per_second", "updates/s", True),
+    ("p50_ms", "p50, ms", False),
+    ("p99_ms", "p99, ms", False),
+    ("max_ms", "max, ms", False),
+    ("errors", "errors", False),
+    ("peak_rss_mb", "peak RSS, MB", False)
+]
+
+def read_recording(path: str, limit: int = 0) -> List[Tuple[float, Dict[str, Any]]]:
+    """Read (arrival time, update) pairs. A member cut off by a crash ends the recording."""
+    records = []
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    records.append((record["t"], record["update"]))
+                    if limit and len(records) >= limit:
+                        break
+        except (EOFError, gzip.BadGzipFile, json.JSONDecodeError) as e:
+            logger.warning(f"Запись {path} оборвана после {len(records)} обновлений: {e}")
+    records.sort(key=lambda record: record[0])
+    return records
+
+def time_scaled(records: List[Tuple[float, Dict[str, Any]]], speed: float) -> List[Tuple[float, Dict[str, Any]]]:
+    """Schedule updates at their recorded offsets divided by speed (0 - all at once)."""
+    if not records:
+        return []
+    first = records[0][0]
+    return [((t - first) / speed if speed > 0 else 0.0, update) for t, update in records]
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m loadtest.replay", description="Replay recorded updates.")
+    parser.add_argument("recording", help="file written by update_recorder.py (UPDATE_RECORD_FILE)")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed, 1 to 100 (0 - as fast as possible)")
+    parser.add_argument("--limit", type=int, default=0, help="replay only the first N updates")
+    parser.add_argument("--concurrency", type=int, default=1, help="updates processed at the same time")
+    parser.add_argument("--telegram-delay-ms", type=float, default=30.0, help="Bot API stand-in response delay")
+    parser.add_argument("--pokeapi-delay-ms", type=float, default=80.0, help="PokeAPI stand-in response delay")
+    parser.add_argument("--workdir", help="data directory of the bot (default: a new temporary directory)")
+    parser.add_argument("--bot-dir", help="checkout of the bot to replay against (default: this one)")
+    parser.add_argument("--against", metavar="REV", help="also replay against this git revision and compare")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+    if args.speed and not 1 <= args.speed <= 100:
+        parser.error("--speed must be between 1 and 100, or 0")
+    return args
+
+async def replay(args: argparse.Namespace) -> Dict[str, Any]:
+    records = read_recording(args.recording, args.limit)
+    report = await driver.run(
+        [],
+        time_scaled(records, args.speed),
+        concurrency=args.concurrency,
+        telegram_delay_ms=args.telegram_delay_ms,
+        pokeapi_delay_ms=args.pokeapi_delay_ms,
+        workdir=args.workdir,
+        bot_dir=args.bot_dir
+    )
+    report["recording"] = args.recording
+    report["speed"] = args.speed
+    return report
+
+def _replay_in_process(argv: List[str], bot_dir: str) -> Dict[str, Any]:
+    command = [sys.executable, "-m", "loadtest.replay", *argv, "--bot-dir", bot_dir, "--json"]
+    result = subprocess.run(command, cwd=driver.REPO_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr)
+        raise SystemExit(f"Replay against {bot_dir} failed")
+    return json.loads(result.stdout)
+
+def format_comparison(revision: str, baseline: Dict[str, Any], current: Dict[str, Any]) -> str:
+    lines = [f"{'':14}{revision:>14}{'current':>14}{'change':>10}"]
+    for key, title, higher_is_better in COMPARED:
+        before, after = baseline[key], current[key]
+        change = f"{(after - before) / before * 100:+.1f}%" if before else ""
+        worse = (after < before) if higher_is_better else (after > before)
+        marker = " !" if worse and before and abs(after - before) / before > 0.05 else ""
+        lines.append(f"{title:14}{before:>14.1f}{after:>14.1f}{change:>10}{marker}")
+    return "\n".join(lines)
+
+def compare(args: argparse.Namespace, argv: List[str]) -> None:
+    # Остальные аргументы передаются обоим запускам как есть
+    passed = [arg for arg in argv if arg != "--json"]
+    if "--against" in passed:
+        index = passed.index("--against")
+        del passed[index:index + 2]
+    else:
+        passed = [arg for arg in passed if not arg.startswith("--against=")]
+    passed[passed.index(args.recording)] = os.path.abspath(args.recording)
+
+    with tempfile.TemporaryDirectory(prefix="loadtest-rev-") as parent:
+        worktree = os.path.join(parent, "bot")
+        subprocess.run(
+            ["git", "-C", driver.REPO_DIR, "worktree", "add", "--detach", worktree, args.against],
+            check=True, capture_output=True
+        )
+        try:
+            baseline = _replay_in_process(passed, worktree)
+        finally:
+            subprocess.run(["git", "-C", driver.REPO_DIR, "worktree", "remove", "--force", worktree], capture_output=True)
+    current = _replay_in_process(passed, driver.REPO_DIR)
+
+    if args.json:
+        print(json.dumps({"baseline": baseline, "current": current, "revision": args.against}, indent=2))
+    else:
+        print(format_comparison(args.against, baseline, current))
+
+def main(argv: List[str]) -> None:
+    args = parse_args(argv)
+    if args.against:
+        compare(args, argv)
+        return
+
+    report = asyncio.run(replay(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(driver.format_report(f"replay x{args.speed:g}", report))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,176 @@
+"""
+Traffic generators for the load tests.
+
+A scenario returns a Scenario: setup updates that bring the users to the
+state the traffic needs (a started account with a starter Pokemon), and the
+measured updates. Updates are Bot API update dicts. Callback queries that
+press a button the bot has just sent (trade offers, shop items) are not
+known in advance; they are callables that take the FakeTelegram stand-in
+and build the update when it is due, or return None if the button is not
+there.
+"""
+
+import itertools
+import random
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Union
+
+from loadtest.fake_telegram import BOT_USER, FakeTelegram
+
+Update = Dict[str, Any]
+Item = Union[Update, Callable[[FakeTelegram], Optional[Update]]]
+
+FIRST_USER_ID = 10_000_000
+FIRST_GROUP_ID = -1_001_000_000_000
+
+SUMMON_TEXTS = ["Призвать покемона", "призвать", "Вызвать покемона", "зови покемона"]
+CATCH_TEXTS = ["Ловлю", "ловлю", "Поймать", "catch"]
+CHATTER = ["привет", "кто тут?", "го в бой", "у меня пикачу", "лол", "как поймать мьюту?", "😂", "+"]
+STARTERS = ["starter_charmander", "starter_squirtle", "starter_bulbasaur"]
+
+class Scenario(NamedTuple):
+    setup: List[Item]
+    updates: List[Item]
+
+class UpdateFactory:
+    """Build Bot API update dicts with unique update and message IDs."""
+
+    def __init__(self, users: int, chats: int, seed: int = 0):
+        self.user_ids = [FIRST_USER_ID + i for i in range(users)]
+        self.chat_ids = [FIRST_GROUP_ID - i for i in range(chats)]
+        self.random = random.Random(seed)
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1_000_000)
+
+    @staticmethod
+    def user(user_id: int) -> Dict[str, Any]:
+        return {
+            "id": user_id,
+            "is_bot": False,
+            "first_name": f"Trainer{user_id % 100000}",
+            "username": f"trainer{user_id}",
+            "language_code": "ru"
+        }
+
+    @staticmethod
+    def chat(chat_id: int) -> Dict[str, Any]:
+        if chat_id < 0:
+            return {"id": chat_id, "type": "supergroup", "title": f"Load test group {-chat_id}"}
+        return {"id": chat_id, "type": "private", "first_name": f"Trainer{chat_id % 100000}"}
+
+    def message(self, user_id: int, chat_id: int, text: str, reply_to: Optional[Dict[str, Any]] = None) -> Update:
+        message = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": self.chat(chat_id),
+            "from": self.user(user_id),
+            "text": text
+        }
+        if text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        if reply_to is not None:
+            message["reply_to_message"] = reply_to
+        return {"update_id": next(self._update_ids), "message": message}
+
+    def callback(self, user_id: int, chat_id: int, data: str) -> Update:
+        message = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": self.chat(chat_id),
+            "from": BOT_USER,
+            "text": "..."
+        }
+        return {
+            "update_id": next(self._update_ids),
+            "callback_query": {
+                "id": str(next(self._message_ids)),
+                "from": self.user(user_id),
+                "chat_instance": str(chat_id),
+                "message": message,
+                "data": data
+            }
+        }
+
+    def press(self, user_id: int, chat_id: int, prefix: str) -> Callable[[FakeTelegram], Optional[Update]]:
+        """Press the first button starting with prefix of the last keyboard sent to a chat."""
+        def build(telegram: FakeTelegram) -> Optional[Update]:
+            data = telegram.find_button(chat_id, prefix)
+            return self.callback(user_id, chat_id, data) if data else None
+        return build
+
+    def onboarding(self, user_ids: List[int]) -> List[Item]:
+        """/start and a starter choice for every user."""
+        items: List[Item] = []
+        for user_id in user_ids:
+            items.append(self.message(user_id, user_id, "/start"))
+            items.append(self.callback(user_id, user_id, self.random.choice(STARTERS)))
+        return items
+
+def group_spam(factory: UpdateFactory, count: int) -> Scenario:
+    """Ordinary chatter in the groups, handled by the group message handlers."""
+    rng = factory.random
+    updates = [
+        factory.message(rng.choice(factory.user_ids), rng.choice(factory.chat_ids), rng.choice(CHATTER))
+        for _ in range(count)
+    ]
+    return Scenario(factory.onboarding(factory.user_ids), updates)
+
+def spawn_storm(factory: UpdateFactory, count: int) -> Scenario:
+    """Many users summoning Pokemon in many groups at once."""
+    rng = factory.random
+    updates = [
+        factory.message(rng.choice(factory.user_ids), rng.choice(factory.chat_ids), rng.choice(SUMMON_TEXTS))
+        for _ in range(count)
+    ]
+    return Scenario(factory.onboarding(factory.user_ids), updates)
+
+def catch_race(factory: UpdateFactory, count: int, racers: int = 10) -> Scenario:
+    """A summon followed by a crowd of users trying to catch the same Pokemon."""
+    rng = factory.random
+    updates: List[Item] = []
+    while len(updates) < count:
+        chat_id = rng.choice(factory.chat_ids)
+        updates.append(factory.message(rng.choice(factory.user_ids), chat_id, SUMMON_TEXTS[0]))
+        for user_id in rng.sample(factory.user_ids, min(racers, len(factory.user_ids))):
+            updates.append(factory.message(user_id, chat_id, rng.choice(CATCH_TEXTS)))
+    return Scenario(factory.onboarding(factory.user_ids), updates[:count])
+
+def trade_flows(factory: UpdateFactory, count: int) -> Scenario:
+    """Trade offers made by replying /trade in a group, accepted and then cancelled."""
+    rng = factory.random
+    updates: List[Item] = []
+    while len(updates) < count:
+        chat_id = rng.choice(factory.chat_ids)
+        initiator, partner = rng.sample(factory.user_ids, 2)
+        partner_message = factory.message(partner, chat_id, rng.choice(CHATTER))
+        updates.append(partner_message)
+        updates.append(factory.message(initiator, chat_id, "/trade", reply_to=partner_message["message"]))
+        updates.append(factory.press(partner, chat_id, "trade_accept_"))
+        # Интерфейс обмена приходит каждому участнику в личные сообщения
+        updates.append(factory.press(initiator, initiator, "trade_cancel_"))
+    return Scenario(factory.onboarding(factory.user_ids), updates[:count])
+
+def shop_bursts(factory: UpdateFactory, count: int) -> Scenario:
+    """Users opening the shop, browsing categories and buying Poke Balls."""
+    rng = factory.random
+    updates: List[Item] = []
+    while len(updates) < count:
+        user_id = rng.choice(factory.user_ids)
+        updates.append(factory.message(user_id, user_id, "/shop"))
+        updates.append(factory.callback(user_id, user_id, "shop_category_pokeballs"))
+        updates.append(factory.press(user_id, user_id, "shop_buy_pokeballs_"))
+        updates.append(factory.callback(user_id, user_id, "shop_category_trainers"))
+        updates.append(factory.callback(user_id, user_id, "shop_back"))
+    return Scenario(factory.onboarding(factory.user_ids), updates[:count])
+
+SCENARIOS: Dict[str, Callable[[UpdateFactory, int], Scenario]] = {
+    "group_spam": group_spam,
+    "spawn_storm": spawn_storm,
+    "catch_race": catch_race,
+    "trade_flows": trade_flows,
+    "shop_bursts": shop_bursts
+}
+
+def build(name: str, count: int, users: int, chats: int, seed: int = 0) -> Scenario:
+    """Generate a scenario by name."""
+    return SCENARIOS[name](UpdateFactory(users, chats, seed), count)
@@ -0,0 +1,71 @@
+"""Base class of the local HTTP stand-ins used by the load tests."""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+class StandIn:
+    """An aiohttp app served on 127.0.0.1 from its own thread and event loop.
+
+    Every request waits delay_ms before it is answered, so the bot sees a
+    realistic round trip. The time spent per route is kept in self.latencies.
+    """
+
+    def __init__(self, delay_ms: float = 0.0):
+        self.delay = delay_ms / 1000
+        self.url = ""
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._started = threading.Event()
+
+    def routes(self) -> List[web.RouteDef]:
+        raise NotImplementedError
+
+    async def pause(self) -> None:
+        """Wait for the configured delay."""
+        if self.delay > 0:
+            await asyncio.sleep(self.delay)
+
+    def record(self, name: str, start: float) -> None:
+        self.latencies[name].append(time.perf_counter() - start)
+
+    def counts(self) -> Dict[str, int]:
+        """Get the number of requests per route name."""
+        return {name: len(values) for name, values in sorted(self.latencies.items())}
+
+    async def _serve(self) -> None:
+        app = web.Application(client_max_size=20 * 1024 * 1024)
+        app.add_routes(self.routes())
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+
+    def _run(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        self._loop.run_until_complete(self._serve())
+        self._started.set()
+        self._loop.run_forever()
+        self._loop.run_until_complete(self._runner.cleanup())
+        self._loop.close()
+
+    def start(self) -> "StandIn":
+        """Start serving on a free port. self.url is set when this returns."""
+        threading.Thread(target=self._run, name=type(self).__name__, daemon=True).start()
+        self._started.wait()
+        logger.info(f"{type(self).__name__} запущен на {self.url}")
+        return self
+
+    def stop(self) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
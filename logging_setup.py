@@ -0,0 +1,179 @@
+"""
+Logging pipeline of the bot.
+
+setup_logging() replaces the old logging.basicConfig(level=DEBUG) calls:
+- the root logger only puts records on a queue; a QueueListener thread
+  formats and writes them, so handlers never block on file or console I/O;
+- records are formatted lazily on that thread, as JSON lines by default
+  (LOG_FORMAT=text keeps the old one-line format);
+- high-volume loggers are rate limited (token bucket) or sampled per
+  config.LOG_RATE_LIMITS and config.LOG_SAMPLING. Warnings and errors are
+  never dropped, and the next record that passes carries the number of
+  records dropped before it;
+- detailed per-chat logging is switched on for single chats with /logdebug
+  instead of being hardcoded for one group. chat_debug() logs only for those
+  chats, and its records bypass rate limits and sampling.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional, Set, Tuple
+
+import config
+from json_store import data_path, load_json, save_json
+
+CHAT_DEBUG_FILE = data_path("log_debug_chats.json")
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Стандартные атрибуты LogRecord, остальные попадают в JSON как дополнительные поля
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+_listener: Optional[QueueListener] = None
+_chat_debug: Optional[Set[int]] = None
+_chat_debug_lock = threading.Lock()
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class _LazyQueueHandler(QueueHandler):
+    """Queue handler that leaves formatting to the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # QueueHandler.prepare() форматирует сообщение в вызывающем потоке, нам это не нужно
+        return copy.copy(record)
+
+class _Bucket:
+    def __init__(self, per_second: float, burst: float):
+        self.per_second = per_second
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.dropped = 0
+
+class VolumeFilter(logging.Filter):
+    """Rate limit and sample records of high-volume loggers.
+
+    Rules apply to a logger and its children. Races between threads can let
+    a few extra records through, which is fine for logging.
+    """
+
+    def __init__(self, rate_limits: Dict[str, Tuple[float, float]], sampling: Dict[str, float]):
+        super().__init__()
+        self.buckets = {name: _Bucket(*limit) for name, limit in rate_limits.items()}
+        self.sampling = dict(sampling)
+        # logger name -> (bucket, sample rate), ищем правило один раз на логгер
+        self._rules: Dict[str, Tuple[Optional[_Bucket], Optional[float]]] = {}
+
+    def _rule(self, name: str) -> Tuple[Optional[_Bucket], Optional[float]]:
+        rule = self._rules.get(name)
+        if rule is None:
+            bucket, rate = None, None
+            parts = name.split(".")
+            for i in range(len(parts), 0, -1):
+                prefix = ".".join(parts[:i])
+                bucket = bucket or self.buckets.get(prefix)
+                rate = rate if rate is not None else self.sampling.get(prefix)
+            rule = (bucket, rate)
+            self._rules[name] = rule
+        return rule
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or getattr(record, "chat_debug", False):
+            return True
+
+        bucket, rate = self._rule(record.name)
+        if rate is not None:
+            if random.random() >= rate:
+                return False
+            record.sample_rate = rate
+
+        if bucket is not None:
+            now = time.monotonic()
+            bucket.tokens = min(bucket.burst, bucket.tokens + (now - bucket.updated) * bucket.per_second)
+            bucket.updated = now
+            if bucket.tokens < 1:
+                bucket.dropped += 1
+                return False
+            bucket.tokens -= 1
+            if bucket.dropped:
+                record.dropped = bucket.dropped
+                bucket.dropped = 0
+        return True
+
+def setup_logging() -> None:
+    """Configure the root logger once. Later calls do nothing."""
+    global _listener
+    if _listener is not None:
+        return
+
+    formatter = logging.Formatter(TEXT_FORMAT) if config.LOG_FORMAT == "text" else JsonFormatter()
+    handlers = [logging.StreamHandler(sys.stderr)]
+    if config.LOG_FILE:
+        handlers.append(logging.FileHandler(config.LOG_FILE, encoding="utf-8"))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    queue_handler = _LazyQueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(VolumeFilter(config.LOG_RATE_LIMITS, config.LOG_SAMPLING))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(config.LOG_LEVEL)
+    for name, level in config.LOG_LEVELS.items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    # Дописываем очередь при выходе
+    atexit.register(_listener.stop)
+
+def _get_chat_debug() -> Set[int]:
+    global _chat_debug
+    if _chat_debug is None:
+        _chat_debug = set(load_json(CHAT_DEBUG_FILE, []))
+    return _chat_debug
+
+def is_chat_debug(chat_id: int) -> bool:
+    """Check if detailed logging is on for a chat."""
+    return chat_id in _get_chat_debug()
+
+def set_chat_debug(chat_id: int, enabled: bool) -> None:
+    """Turn detailed logging on or off for a chat."""
+    with _chat_debug_lock:
+        chats = _get_chat_debug()
+        if enabled:
+            chats.add(chat_id)
+        else:
+            chats.discard(chat_id)
+        save_json(CHAT_DEBUG_FILE, sorted(chats))
+
+def chat_debug(logger: logging.Logger, chat_id: int, msg: str, *args: Any) -> None:
+    """Log a detailed message about a chat, only if /logdebug is on for it."""
+    if chat_id in _get_chat_debug():
+        logger.info(msg, *args, extra={"chat_id": chat_id, "chat_debug": True})
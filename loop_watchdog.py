@@ -0,0 +1,176 @@
+"""
+Event loop watchdog: finds the code that blocks the event loop.
+
+The loop sets a heartbeat every HEARTBEAT_INTERVAL; a separate thread checks
+it every CHECK_INTERVAL. When the heartbeat is late by more than
+config.LOOP_WATCHDOG_THRESHOLD_MS, the loop is stuck in synchronous code, and
+the thread takes the stack of the loop thread from sys._current_frames().
+When the loop comes back, the stall is added to a report grouped by call
+site: the innermost frame of the bot's own code plus the innermost frame
+overall (e.g. handlers/start.py:300 in spawn_wild_pokemon -> json/encoder.py).
+
+The report is shown to admins by /lagreport. Every stall is also logged as a
+warning and counted in loop_stalls_total.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, List, Optional, Tuple
+
+import config
+import metrics
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_INTERVAL = 0.05
+CHECK_INTERVAL = 0.02
+# Call sites kept in the report
+MAX_SITES = 200
+
+LOOP_STALLS = metrics.Counter("loop_stalls_total", "Event loop stalls longer than the watchdog threshold.")
+
+_PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def _is_project_frame(frame: traceback.FrameSummary) -> bool:
+    filename = os.path.abspath(frame.filename)
+    return filename.startswith(_PROJECT_DIR) and "site-packages" not in filename
+
+def _site(frame: traceback.FrameSummary) -> str:
+    filename = os.path.abspath(frame.filename)
+    if filename.startswith(_PROJECT_DIR):
+        filename = os.path.relpath(filename, _PROJECT_DIR)
+    else:
+        # Для библиотек достаточно пакета и файла
+        filename = os.path.join(*filename.split(os.sep)[-2:])
+    return f"{filename}:{frame.lineno} in {frame.name}"
+
+class _SiteStats:
+    __slots__ = ("count", "total_ms", "max_ms", "stack")
+
+    def __init__(self, stack: str):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.stack = stack
+
+class LoopWatchdog:
+    """Watch one event loop from a background thread."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, threshold_ms: float):
+        self.loop = loop
+        self.threshold = threshold_ms / 1000
+        self.loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._sites: Dict[Tuple[str, str], _SiteStats] = {}
+        # Текущая блокировка: (ключ места вызова, стек) и наибольшая задержка
+        self._stall: Optional[Tuple[Tuple[str, str], str]] = None
+        self._stall_lag = 0.0
+        self.started_at = time.time()
+
+    def start(self) -> None:
+        """Start the heartbeat and the watchdog thread. Call from the loop's thread."""
+        self.loop.call_soon(self._beat)
+        threading.Thread(target=self._run, name="loop-watchdog", daemon=True).start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _beat(self) -> None:
+        self._last_beat = time.monotonic()
+        if not self._stop.is_set():
+            self.loop.call_later(HEARTBEAT_INTERVAL, self._beat)
+
+    def _capture(self) -> Tuple[Tuple[str, str], str]:
+        frame = sys._current_frames().get(self.loop_thread_id)
+        if frame is None:
+            return ("?", "?"), ""
+        stack = traceback.extract_stack(frame)
+        project_frames = [f for f in stack if _is_project_frame(f)]
+        innermost = _site(stack[-1])
+        site = _site(project_frames[-1]) if project_frames else innermost
+        return (site, innermost), "".join(traceback.format_list(stack[-12:]))
+
+    def _record(self, lag: float) -> None:
+        (key, stack) = self._stall
+        lag_ms = lag * 1000
+        with self._lock:
+            stats = self._sites.get(key)
+            if stats is None:
+                if len(self._sites) >= MAX_SITES:
+                    # Вытесняем место с наименьшим суммарным временем
+                    del self._sites[min(self._sites, key=lambda k: self._sites[k].total_ms)]
+                stats = self._sites[key] = _SiteStats(stack)
+            stats.count += 1
+            stats.total_ms += lag_ms
+            stats.max_ms = max(stats.max_ms, lag_ms)
+        LOOP_STALLS.inc()
+        logger.warning("Цикл событий заблокирован на %.0f мс: %s -> %s", lag_ms, key[0], key[1])
+
+    def _run(self) -> None:
+        while not self._stop.wait(CHECK_INTERVAL):
+            lag = time.monotonic() - self._last_beat - HEARTBEAT_INTERVAL
+            if lag >= self.threshold:
+                if self._stall is None:
+                    self._stall = self._capture()
+                self._stall_lag = lag
+            elif self._stall is not None:
+                self._record(self._stall_lag)
+                self._stall = None
+
+    def report(self, limit: int = 10) -> List[Tuple[Tuple[str, str], _SiteStats]]:
+        """Get the call sites with the most blocked time, worst first."""
+        with self._lock:
+            items = list(self._sites.items())
+        items.sort(key=lambda item: item[1].total_ms, reverse=True)
+        return items[:limit]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._sites.clear()
+        self.started_at = time.time()
+
+_watchdog: Optional[LoopWatchdog] = None
+
+def start() -> Optional[LoopWatchdog]:
+    """Watch the running event loop. Does nothing if the threshold is 0."""
+    global _watchdog
+    if config.LOOP_WATCHDOG_THRESHOLD_MS <= 0 or _watchdog is not None:
+        return _watchdog
+    _watchdog = LoopWatchdog(asyncio.get_running_loop(), config.LOOP_WATCHDOG_THRESHOLD_MS)
+    _watchdog.start()
+    logger.info(f"Сторож цикла событий запущен, порог {config.LOOP_WATCHDOG_THRESHOLD_MS} мс")
+    return _watchdog
+
+def format_report(limit: int = 10, with_stack: int = 3) -> str:
+    """Render the stall report as text. The first with_stack sites include a stack sample."""
+    if _watchdog is None:
+        return "Сторож цикла событий не запущен (только в режиме поллинга, LOOP_WATCHDOG_THRESHOLD_MS > 0)."
+
+    sites = _watchdog.report(limit)
+    minutes = (time.time() - _watchdog.started_at) / 60
+    if not sites:
+        return f"За {minutes:.0f} мин блокировок цикла событий дольше {config.LOOP_WATCHDOG_THRESHOLD_MS} мс не было."
+
+    lines = [f"Блокировки цикла событий за {minutes:.0f} мин (порог {config.LOOP_WATCHDOG_THRESHOLD_MS} мс):", ""]
+    for i, ((site, innermost), stats) in enumerate(sites, 1):
+        lines.append(
+            f"{i}. {site}\n"
+            f"   -> {innermost}\n"
+            f"   {stats.count} раз, всего {stats.total_ms:.0f} мс, максимум {stats.max_ms:.0f} мс"
+        )
+        if i <= with_stack and stats.stack:
+            lines.append(stats.stack.rstrip())
+        lines.append("")
+    return "\n".join(lines).rstrip()
+
+def reset() -> None:
+    """Clear the report."""
+    if _watchdog is not None:
+        _watchdog.reset()
@@ -1,14 +1,18 @@
 import os
 import logging
 import asyncio
-from flask import Flask, request, render_template, jsonify
+import threading
+from flask import Flask, Response, request, render_template, jsonify
 from bot import bot, setup_webhook, application
 import config
+import logging_setup
+import metrics
+import update_recorder
+from session_store import run_sweeper
 from telegram import Update
 
-# Настройка логирования
-logging.basicConfig(level=logging.DEBUG,
-                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# Логирование уже настроено при импорте bot, повторный вызов ничего не делает
+logging_setup.setup_logging()
 logger = logging.getLogger(__name__)
 
 # Инициализация Flask приложения
@@ -22,20 +26,35 @@ try:
 except Exception as e:
     logger.error(f"Ошибка при настройке вебхука: {e}")
 
+# Каждое обновление обрабатывается в своем цикле событий, поэтому очистка и
+# отложенная запись хранилищ (сессии, промокоды, кулдауны) идут в отдельном потоке
+threading.Thread(target=asyncio.run, args=(run_sweeper(),), name="session-sweeper", daemon=True).start()
+
 @app.route('/', methods=['GET'])
 def index():
     """Индексная страница с информацией о боте."""
     return render_template('webhook.html', webhook_url=config.WEBHOOK_URL)
 
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Метрики бота в формате Prometheus."""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
 @app.route(f'/{config.BOT_TOKEN}', methods=['POST'])
 def webhook():
     """Обработка входящих обновлений Telegram."""
     try:
         update_dict = request.get_json(force=True)
-        logger.debug(f"Получено обновление: {update_dict}")
+        
+        # Запись входящих обновлений для нагрузочных тестов (UPDATE_RECORD_FILE)
+        update_recorder.record(update_dict)
         
         # Преобразование в объект Telegram Update и обработка
         update = Update.de_json(update_dict, bot)
+        logger.debug("Получено обновление %s", update.update_id)
+        if update.effective_chat:
+            # Полное содержимое обновления - только для чатов с /logdebug
+            logging_setup.chat_debug(logger, update.effective_chat.id, "Содержимое обновления: %s", update_dict)
         
         # Использование asyncio для обработки обновления с помощью приложения
         async def process_update_async():
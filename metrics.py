@@ -0,0 +1,291 @@
+"""
+In-process metrics in the Prometheus text format.
+
+Counters, gauges and latency histograms live in one registry. render()
+returns all of them as Prometheus text, served at /metrics by the webhook
+app (main.py) and, in polling mode, by start_http_server().
+
+Histograms use HDR-style log-linear buckets: every power of two from
+2^MIN_EXPONENT to 2^MAX_EXPONENT seconds (61 µs to 128 s) is split into
+SUB_BUCKETS linear buckets. An observation finds its bucket in O(1) with
+math.frexp, the bucket set is the same for every histogram, and the relative
+error of a quantile is at most 1 / SUB_BUCKETS.
+
+This module only depends on the standard library so that low-level modules
+(json_store, pokemon_api) can record metrics. The Telegram-specific parts are
+in telegram_metrics.py.
+"""
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+MIN_EXPONENT = -14
+MAX_EXPONENT = 7
+SUB_BUCKETS = 2
+
+# Interval of the event loop lag probe (seconds)
+LOOP_LAG_INTERVAL = 0.5
+
+# Верхние границы корзин гистограммы, последняя корзина - +Inf
+BUCKET_BOUNDS: List[float] = [2.0 ** MIN_EXPONENT] + [
+    2.0 ** exponent * (1 + (sub + 1) / SUB_BUCKETS)
+    for exponent in range(MIN_EXPONENT, MAX_EXPONENT)
+    for sub in range(SUB_BUCKETS)
+]
+
+_registry: List["_Metric"] = []
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """Get the child metric for a set of label values."""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        return self.labels()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(self._render_child(key, child))
+        return lines
+
+    def _render_child(self, key, child) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.get())}"]
+
+class _CounterChild:
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    def get(self) -> float:
+        return self._value
+
+class Counter(_Metric):
+    """A value that only goes up."""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1) -> None:
+        self._default().inc(amount)
+
+class _GaugeChild:
+    def __init__(self):
+        self._value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.inc(-amount)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Read the value from a function on every scrape."""
+        self._function = function
+
+    def get(self) -> float:
+        return self._function() if self._function else self._value
+
+class Gauge(_Metric):
+    """A value that goes up and down."""
+
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self._default().set(value)
+
+    def inc(self, amount: float = 1) -> None:
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1) -> None:
+        self._default().dec(amount)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._default().set_function(function)
+
+def bucket_index(value: float) -> int:
+    """Get the histogram bucket of a value in seconds."""
+    if value < BUCKET_BOUNDS[0]:
+        return 0
+    mantissa, exponent = math.frexp(value)
+    index = 1 + (exponent - 1 - MIN_EXPONENT) * SUB_BUCKETS + int((2 * mantissa - 1) * SUB_BUCKETS)
+    index = min(index, len(BUCKET_BOUNDS))
+    # Границы корзин включительные (le), значение на границе относится к нижней корзине
+    if value <= BUCKET_BOUNDS[index - 1]:
+        index -= 1
+    return index
+
+class _HistogramChild:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bucket_index(value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Observe the duration of a with block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile (0..1) as the upper bound of its bucket."""
+        with self._lock:
+            counts, count = list(self.counts), self.count
+        if not count:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else math.inf
+        return math.inf
+
+class Histogram(_Metric):
+    """A distribution of durations in seconds."""
+
+    kind = "histogram"
+
+    def _new_child(self):
+        return _HistogramChild()
+
+    def observe(self, value: float) -> None:
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+    def _render_child(self, key, child) -> List[str]:
+        with child._lock:
+            counts, count, total = list(child.counts), child.count, child.sum
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(BUCKET_BOUNDS, counts):
+            cumulative += bucket_count
+            labels = _format_labels(self.labelnames, key, f'le="{bound:.6g}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+        lines.append(f"{self.name}_bucket{labels} {count}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+HANDLER_SECONDS = Histogram("bot_handler_seconds", "Time spent in an update handler.", ["handler"])
+HANDLER_ERRORS = Counter("bot_handler_errors_total", "Update handlers that raised an exception.", ["handler"])
+POKEAPI_SECONDS = Histogram("pokeapi_request_seconds", "PokeAPI HTTP request latency.", ["endpoint"])
+POKEAPI_CACHE_LOOKUPS = Counter(
+    "pokeapi_cache_lookups_total", "PokeAPI cache lookups by result (hit or miss).", ["cache", "result"]
+)
+STORAGE_SECONDS = Histogram("storage_operation_seconds", "User storage call latency.", ["operation"])
+JSON_FILE_SECONDS = Histogram("json_file_seconds", "JSON data file read and write latency.", ["operation", "file"])
+TELEGRAM_SECONDS = Histogram("telegram_request_seconds", "Bot API request latency.", ["method"])
+TELEGRAM_IN_FLIGHT = Gauge(
+    "telegram_requests_in_flight", "Outbound Bot API requests sent or waiting for a connection."
+)
+LOOP_LAG_SECONDS = Histogram("event_loop_lag_seconds", "Delay of the event loop lag probe past its due time.")
+
+def render() -> str:
+    """Render every metric in the Prometheus text format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+async def run_loop_lag_monitor(interval: float = LOOP_LAG_INTERVAL) -> None:
+    """Measure how late the event loop wakes up a sleeping task."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        LOOP_LAG_SECONDS.observe(max(0.0, loop.time() - start - interval))
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Запросы Prometheus не засоряют лог
+        pass
+
+def start_http_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serve /metrics from a background thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsRequestHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info(f"Метрики доступны на порту {port}: /metrics")
+    return server
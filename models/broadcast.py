@@ -0,0 +1,98 @@
+from typing import Dict, Any, Optional
+import time
+
+class BroadcastJob:
+    """Represents an admin broadcast to all users."""
+
+    def __init__(
+        self,
+        job_id: str,
+        text: str,
+        created_by: int,
+        chat_id: int,
+        progress_message_id: Optional[int] = None,
+        status: str = "pending",     # "pending", "running", "completed", "cancelled"
+        offset: int = 0,             # Количество уже обработанных пользователей
+        last_user_id: Optional[int] = None,  # Последний обработанный пользователь (курсор для продолжения)
+        total: Optional[int] = None,
+        sent: int = 0,
+        failed: int = 0,
+        blocked: int = 0,
+        created_at: Optional[float] = None,
+        updated_at: Optional[float] = None
+    ):
+        self.job_id = job_id
+        self.text = text
+        self.created_by = created_by
+        self.chat_id = chat_id
+        self.progress_message_id = progress_message_id
+        self.status = status
+        self.offset = offset
+        self.last_user_id = last_user_id
+        self.total = total
+        self.sent = sent
+        self.failed = failed
+        self.blocked = blocked
+        self.created_at = created_at or time.time()
+        self.updated_at = updated_at or self.created_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the BroadcastJob to a dictionary for storage."""
+        return {
+            "job_id": self.job_id,
+            "text": self.text,
+            "created_by": self.created_by,
+            "chat_id": self.chat_id,
+            "progress_message_id": self.progress_message_id,
+            "status": self.status,
+            "offset": self.offset,
+            "last_user_id": self.last_user_id,
+            "total": self.total,
+            "sent": self.sent,
+            "failed": self.failed,
+            "blocked": self.blocked,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'BroadcastJob':
+        """Create a BroadcastJob from a dictionary."""
+        return cls(
+            job_id=data.get("job_id", ""),
+            text=data.get("text", ""),
+            created_by=data.get("created_by", 0),
+            chat_id=data.get("chat_id", 0),
+            progress_message_id=data.get("progress_message_id"),
+            status=data.get("status", "pending"),
+            offset=data.get("offset", 0),
+            last_user_id=data.get("last_user_id"),
+            total=data.get("total"),
+            sent=data.get("sent", 0),
+            failed=data.get("failed", 0),
+            blocked=data.get("blocked", 0),
+            created_at=data.get("created_at"),
+            updated_at=data.get("updated_at")
+        )
+
+    def is_active(self) -> bool:
+        """Check if the broadcast still has to be delivered."""
+        return self.status in ("pending", "running")
+
+    def get_progress_text(self) -> str:
+        """Возвращает описание прогресса рассылки для админ-чата."""
+        status_names = {
+            "pending": "⏳ В очереди",
+            "running": "📤 Отправляется",
+            "completed": "✅ Завершена",
+            "cancelled": "🛑 Отменена"
+        }
+        total = self.total if self.total is not None else "?"
+        return (
+            f"📢 *Рассылка {self.job_id}*\n\n"
+            f"Статус: {status_names.get(self.status, self.status)}\n"
+            f"Обработано: {self.offset}/{total}\n"
+            f"Доставлено: {self.sent}\n"
+            f"Заблокировали бота: {self.blocked}\n"
+            f"Ошибок: {self.failed}"
+        )
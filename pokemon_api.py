@@ -6,6 +6,8 @@ from typing import Dict, List, Optional
 import config
 import functools
 import time
+import metrics
+import tracing
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +25,15 @@ session = None
 REQUEST_TIMEOUT = 5.0
 CACHE_EXPIRY = 3600  # 1 hour
 
+# Base URL of the official artwork served by the PokeAPI sprites repository
+OFFICIAL_ARTWORK_BASE_URL = "https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/other/official-artwork"
+
+def _cached(cache: Dict, name: str, key: str) -> bool:
+    """Check if a key is in one of the caches, counting hits and misses."""
+    hit = key in cache
+    metrics.POKEAPI_CACHE_LOOKUPS.labels(name, "hit" if hit else "miss").inc()
+    return hit
+
 async def get_session():
     """Get or create a shared aiohttp session."""
     global session
@@ -33,21 +44,22 @@ async def get_session():
 async def get_pokemon_data(pokemon_id_or_name: str) -> Optional[Dict]:
     """Get Pokemon data from PokeAPI."""
     # Check cache first
-    if pokemon_id_or_name in pokemon_cache:
+    if _cached(pokemon_cache, "pokemon", pokemon_id_or_name):
         return pokemon_cache[pokemon_id_or_name]
     
     try:
         url = f"{config.POKEAPI_BASE_URL}/pokemon/{pokemon_id_or_name.lower()}"
         session = await get_session()
-        async with session.get(url, timeout=REQUEST_TIMEOUT) as response:
-            if response.status == 200:
-                data = await response.json()
-                # Cache the result
-                pokemon_cache[pokemon_id_or_name] = data
-                return data
-            else:
-                logger.error(f"Failed to fetch Pokemon {pokemon_id_or_name}: {response.status}")
-                return None
+        with metrics.POKEAPI_SECONDS.labels("pokemon").time(), tracing.span("pokeapi.pokemon"):
+            async with session.get(url, timeout=REQUEST_TIMEOUT) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    # Cache the result
+                    pokemon_cache[pokemon_id_or_name] = data
+                    return data
+                else:
+                    logger.error(f"Failed to fetch Pokemon {pokemon_id_or_name}: {response.status}")
+                    return None
     except asyncio.TimeoutError:
         logger.error(f"Timeout fetching Pokemon {pokemon_id_or_name}")
         return None
@@ -58,7 +70,7 @@ async def get_pokemon_data(pokemon_id_or_name: str) -> Optional[Dict]:
 async def get_pokemon_species(pokemon_id_or_name: str) -> Optional[Dict]:
     """Get Pokemon species data from PokeAPI."""
     # Check cache first
-    if pokemon_id_or_name in pokemon_species_cache:
+    if _cached(pokemon_species_cache, "species", pokemon_id_or_name):
         return pokemon_species_cache[pokemon_id_or_name]
     
     try:
@@ -70,15 +82,16 @@ async def get_pokemon_species(pokemon_id_or_name: str) -> Optional[Dict]:
         species_url = pokemon_data["species"]["url"]
         
         session = await get_session()
-        async with session.get(species_url, timeout=REQUEST_TIMEOUT) as response:
-            if response.status == 200:
-                data = await response.json()
-                # Cache the result
-                pokemon_species_cache[pokemon_id_or_name] = data
-                return data
-            else:
-                logger.error(f"Failed to fetch Pokemon species {pokemon_id_or_name}: {response.status}")
-                return None
+        with metrics.POKEAPI_SECONDS.labels("species").time(), tracing.span("pokeapi.species"):
+            async with session.get(species_url, timeout=REQUEST_TIMEOUT) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    # Cache the result
+                    pokemon_species_cache[pokemon_id_or_name] = data
+                    return data
+                else:
+                    logger.error(f"Failed to fetch Pokemon species {pokemon_id_or_name}: {response.status}")
+                    return None
     except asyncio.TimeoutError:
         logger.error(f"Timeout fetching Pokemon species {pokemon_id_or_name}")
         return None
@@ -97,19 +110,20 @@ async def get_evolution_chain(pokemon_id_or_name: str) -> Optional[Dict]:
         evolution_url = species_data["evolution_chain"]["url"]
         
         # Check cache first
-        if evolution_url in evolution_chain_cache:
+        if _cached(evolution_chain_cache, "evolution_chain", evolution_url):
             return evolution_chain_cache[evolution_url]
         
         session = await get_session()
-        async with session.get(evolution_url, timeout=REQUEST_TIMEOUT) as response:
-            if response.status == 200:
-                data = await response.json()
-                # Cache the result
-                evolution_chain_cache[evolution_url] = data
-                return data
-            else:
-                logger.error(f"Failed to fetch evolution chain for {pokemon_id_or_name}: {response.status}")
-                return None
+        with metrics.POKEAPI_SECONDS.labels("evolution_chain").time(), tracing.span("pokeapi.evolution_chain"):
+            async with session.get(evolution_url, timeout=REQUEST_TIMEOUT) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    # Cache the result
+                    evolution_chain_cache[evolution_url] = data
+                    return data
+                else:
+                    logger.error(f"Failed to fetch evolution chain for {pokemon_id_or_name}: {response.status}")
+                    return None
     except asyncio.TimeoutError:
         logger.error(f"Timeout fetching evolution chain for {pokemon_id_or_name}")
         return None
@@ -120,7 +134,7 @@ async def get_evolution_chain(pokemon_id_or_name: str) -> Optional[Dict]:
 async def get_pokemon_image_url(pokemon_id_or_name: str) -> Optional[str]:
     """Get Pokemon official artwork URL."""
     # Check cache first
-    if pokemon_id_or_name in image_url_cache:
+    if _cached(image_url_cache, "image_url", pokemon_id_or_name):
         return image_url_cache[pokemon_id_or_name]
         
     try:
@@ -137,25 +151,37 @@ async def get_pokemon_image_url(pokemon_id_or_name: str) -> Optional[str]:
         logger.error(f"Error getting Pokemon image URL: {e}")
         return None
 
+def get_pokedex_id_from_url(url: str) -> Optional[int]:
+    """Extract the Pokedex number from a PokeAPI resource URL."""
+    try:
+        return int(url.rstrip("/").split("/")[-1])
+    except (ValueError, AttributeError):
+        return None
+
+def get_official_artwork_url(pokedex_id: int) -> str:
+    """Build the official artwork URL for a Pokedex number without an API call."""
+    return f"{OFFICIAL_ARTWORK_BASE_URL}/{pokedex_id}.png"
+
 async def get_all_pokemon(limit: int = 500) -> List[Dict]:
     """Get a list of all Pokemon up to the limit."""
     # Check cache first
     cache_key = f"all_pokemon_{limit}"
-    if cache_key in all_pokemon_cache:
+    if _cached(all_pokemon_cache, "pokemon_list", cache_key):
         return all_pokemon_cache[cache_key]
         
     try:
         url = f"{config.POKEAPI_BASE_URL}/pokemon?limit={limit}"
         session = await get_session()
-        async with session.get(url, timeout=REQUEST_TIMEOUT) as response:
-            if response.status == 200:
-                data = await response.json()
-                # Cache the result
-                all_pokemon_cache[cache_key] = data["results"]
-                return data["results"]
-            else:
-                logger.error(f"Failed to fetch Pokemon list: {response.status}")
-                return []
+        with metrics.POKEAPI_SECONDS.labels("pokemon_list").time(), tracing.span("pokeapi.pokemon_list"):
+            async with session.get(url, timeout=REQUEST_TIMEOUT) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    # Cache the result
+                    all_pokemon_cache[cache_key] = data["results"]
+                    return data["results"]
+                else:
+                    logger.error(f"Failed to fetch Pokemon list: {response.status}")
+                    return []
     except asyncio.TimeoutError:
         logger.error(f"Timeout fetching Pokemon list with limit {limit}")
         return []
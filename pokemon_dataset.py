@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Local Pokemon species dataset.
+
+data/pokemon_dataset.json holds one compact record per species: Pokedex
+number, name, base stats, types, generation, abilities and the species it
+evolves into. Features that need facts about many species (the quiz, bulk
+grants) read it instead of calling PokeAPI at request time.
+
+The file is built once from PokeAPI with this script:
+    python pokemon_dataset.py --limit 1025
+Until it exists, load_species() falls back to a small built-in set of
+well-known species.
+"""
+
+import argparse
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+import pokemon_api
+from json_store import data_path, load_json, save_json
+
+logger = logging.getLogger(__name__)
+
+DATASET_FILE = data_path("pokemon_dataset.json")
+DATASET_VERSION = 2
+
+# Concurrent PokeAPI requests while building the dataset
+BUILD_CONCURRENCY = 8
+
+STAT_NAMES = ("hp", "attack", "defense")
+
+def _species(pokedex_id, name, stats, types, generation, abilities, evolves_to=()):
+    return {
+        "id": pokedex_id,
+        "name": name,
+        "stats": dict(zip(STAT_NAMES, stats)),
+        "types": list(types),
+        "generation": generation,
+        "abilities": list(abilities),
+        "evolves_to": list(evolves_to)
+    }
+
+# Встроенный набор на случай, если датасет еще не собран; характеристики: (hp, attack, defense)
+SEED_SPECIES = [
+    _species(1, "bulbasaur", (45, 49, 49), ["grass", "poison"], 1, ["overgrow", "chlorophyll"], ["ivysaur"]),
+    _species(2, "ivysaur", (60, 62, 63), ["grass", "poison"], 1, ["overgrow", "chlorophyll"], ["venusaur"]),
+    _species(3, "venusaur", (80, 82, 83), ["grass", "poison"], 1, ["overgrow", "chlorophyll"]),
+    _species(4, "charmander", (39, 52, 43), ["fire"], 1, ["blaze", "solar-power"], ["charmeleon"]),
+    _species(5, "charmeleon", (58, 64, 58), ["fire"], 1, ["blaze", "solar-power"], ["charizard"]),
+    _species(6, "charizard", (78, 84, 78), ["fire", "flying"], 1, ["blaze", "solar-power"]),
+    _species(7, "squirtle", (44, 48, 65), ["water"], 1, ["torrent", "rain-dish"], ["wartortle"]),
+    _species(8, "wartortle", (59, 63, 80), ["water"], 1, ["torrent", "rain-dish"], ["blastoise"]),
+    _species(9, "blastoise", (79, 83, 100), ["water"], 1, ["torrent", "rain-dish"]),
+    _species(25, "pikachu", (35, 55, 40), ["electric"], 1, ["static", "lightning-rod"], ["raichu"]),
+    _species(26, "raichu", (60, 90, 55), ["electric"], 1, ["static", "lightning-rod"]),
+    _species(39, "jigglypuff", (115, 45, 20), ["normal", "fairy"], 1, ["cute-charm", "competitive", "friend-guard"],
+             ["wigglytuff"]),
+    _species(40, "wigglytuff", (140, 70, 45), ["normal", "fairy"], 1, ["cute-charm", "competitive", "frisk"]),
+    _species(63, "abra", (25, 20, 15), ["psychic"], 1, ["synchronize", "inner-focus", "magic-guard"], ["kadabra"]),
+    _species(64, "kadabra", (40, 35, 30), ["psychic"], 1, ["synchronize", "inner-focus", "magic-guard"], ["alakazam"]),
+    _species(65, "alakazam", (55, 50, 45), ["psychic"], 1, ["synchronize", "inner-focus", "magic-guard"]),
+    _species(92, "gastly", (30, 35, 30), ["ghost", "poison"], 1, ["levitate"], ["haunter"]),
+    _species(93, "haunter", (45, 50, 45), ["ghost", "poison"], 1, ["levitate"], ["gengar"]),
+    _species(94, "gengar", (60, 65, 60), ["ghost", "poison"], 1, ["cursed-body"]),
+    _species(129, "magikarp", (20, 10, 55), ["water"], 1, ["swift-swim", "rattled"], ["gyarados"]),
+    _species(130, "gyarados", (95, 125, 79), ["water", "flying"], 1, ["intimidate", "moxie"]),
+    _species(133, "eevee", (55, 55, 50), ["normal"], 1, ["run-away", "adaptability", "anticipation"],
+             ["vaporeon", "jolteon", "flareon"]),
+    _species(134, "vaporeon", (130, 65, 60), ["water"], 1, ["water-absorb", "hydration"]),
+    _species(135, "jolteon", (65, 65, 60), ["electric"], 1, ["volt-absorb", "quick-feet"]),
+    _species(136, "flareon", (65, 130, 60), ["fire"], 1, ["flash-fire", "guts"]),
+    _species(143, "snorlax", (160, 110, 65), ["normal"], 1, ["immunity", "thick-fat", "gluttony"]),
+    _species(147, "dratini", (41, 64, 45), ["dragon"], 1, ["shed-skin", "marvel-scale"], ["dragonair"]),
+    _species(148, "dragonair", (61, 84, 65), ["dragon"], 1, ["shed-skin", "marvel-scale"], ["dragonite"]),
+    _species(149, "dragonite", (91, 134, 95), ["dragon", "flying"], 1, ["inner-focus", "multiscale"]),
+    _species(150, "mewtwo", (106, 110, 90), ["psychic"], 1, ["pressure", "unnerve"]),
+    _species(152, "chikorita", (45, 49, 65), ["grass"], 2, ["overgrow", "leaf-guard"], ["bayleef"]),
+    _species(155, "cyndaquil", (39, 52, 43), ["fire"], 2, ["blaze", "flash-fire"], ["quilava"]),
+    _species(158, "totodile", (50, 65, 64), ["water"], 2, ["torrent", "sheer-force"], ["croconaw"]),
+    _species(258, "mudkip", (50, 70, 50), ["water"], 3, ["torrent", "damp"], ["marshtomp"]),
+    _species(390, "chimchar", (44, 58, 44), ["fire"], 4, ["blaze", "iron-fist"], ["monferno"]),
+    _species(501, "oshawott", (55, 55, 45), ["water"], 5, ["torrent", "shell-armor"], ["dewott"]),
+    _species(656, "froakie", (41, 56, 40), ["water"], 6, ["torrent", "protean"], ["frogadier"]),
+    _species(722, "rowlet", (68, 55, 55), ["grass", "flying"], 7, ["overgrow", "long-reach"], ["dartrix"]),
+    _species(813, "scorbunny", (50, 71, 40), ["fire"], 8, ["blaze", "libero"], ["raboot"]),
+    _species(906, "sprigatito", (40, 61, 54), ["grass"], 9, ["overgrow", "protean"], ["floragato"])
+]
+
+_species_cache: Optional[List[Dict[str, Any]]] = None
+_species_by_name: Optional[Dict[str, Dict[str, Any]]] = None
+
+def load_species() -> List[Dict[str, Any]]:
+    """Get every species record, loading the dataset file once."""
+    global _species_cache
+    if _species_cache is None:
+        dataset = load_json(DATASET_FILE)
+        if dataset and dataset.get("version") == DATASET_VERSION and dataset.get("species"):
+            _species_cache = dataset["species"]
+            logger.info(f"Загружен датасет покемонов: {len(_species_cache)} видов")
+        else:
+            logger.warning(f"Датасет {DATASET_FILE} не найден, используется встроенный набор покемонов")
+            _species_cache = SEED_SPECIES
+    return _species_cache
+
+def get_species(name: str) -> Optional[Dict[str, Any]]:
+    """Get a species record by name (case-insensitive)."""
+    global _species_by_name
+    if _species_by_name is None:
+        _species_by_name = {record["name"]: record for record in load_species()}
+    return _species_by_name.get(name.strip().lower())
+
+def _parse_generation(name: str) -> int:
+    """Convert a PokeAPI generation name like "generation-iv" to 4."""
+    numerals = {"i": 1, "v": 5, "x": 10}
+    roman = name.rsplit("-", 1)[-1]
+    total = 0
+    for i, char in enumerate(roman):
+        value = numerals.get(char, 0)
+        next_value = numerals.get(roman[i + 1], 0) if i + 1 < len(roman) else 0
+        total += -value if value < next_value else value
+    return total
+
+def _find_evolutions(chain_link: Dict[str, Any], species_name: str) -> List[str]:
+    if chain_link["species"]["name"] == species_name:
+        return [link["species"]["name"] for link in chain_link.get("evolves_to", [])]
+    for link in chain_link.get("evolves_to", []):
+        found = _find_evolutions(link, species_name)
+        if found:
+            return found
+    return []
+
+async def _fetch_species(name: str, semaphore: asyncio.Semaphore) -> Optional[Dict[str, Any]]:
+    async with semaphore:
+        pokemon = await pokemon_api.get_pokemon_data(name)
+        species = await pokemon_api.get_pokemon_species(name)
+        if not pokemon or not species:
+            return None
+        chain = await pokemon_api.get_evolution_chain(name)
+
+    base_stats = {entry["stat"]["name"]: entry["base_stat"] for entry in pokemon["stats"]}
+    return _species(
+        pokemon["id"],
+        species["name"],
+        [base_stats.get(stat, 0) for stat in STAT_NAMES],
+        [entry["type"]["name"] for entry in sorted(pokemon["types"], key=lambda e: e["slot"])],
+        _parse_generation(species["generation"]["name"]),
+        [entry["ability"]["name"] for entry in pokemon["abilities"]],
+        _find_evolutions(chain["chain"], species["name"]) if chain else []
+    )
+
+async def build_dataset(limit: int) -> List[Dict[str, Any]]:
+    """Download every species up to a Pokedex number from PokeAPI."""
+    entries = await pokemon_api.get_all_pokemon(limit)
+    # Только основные формы: у альтернативных форм номер больше 10000
+    names = [
+        entry["name"] for entry in entries
+        if (pokemon_api.get_pokedex_id_from_url(entry["url"]) or 0) <= limit
+    ]
+    semaphore = asyncio.Semaphore(BUILD_CONCURRENCY)
+    records = await asyncio.gather(*(_fetch_species(name, semaphore) for name in names))
+
+    session = await pokemon_api.get_session()
+    await session.close()
+    return sorted((record for record in records if record), key=lambda record: record["id"])
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build data/pokemon_dataset.json from PokeAPI.")
+    parser.add_argument("--limit", type=int, default=1025, help="highest Pokedex number to include")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    species = asyncio.run(build_dataset(args.limit))
+    save_json(DATASET_FILE, {"version": DATASET_VERSION, "species": species}, indent=None)
+    print(f"Saved {len(species)} species to {DATASET_FILE}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Global index of Pokemon ownership.
+
+Maps every pokemon_id to (owner user_id, position in the owner's collection),
+so "who owns this Pokemon" and "where is it in the collection" are O(1). The
+index is built from the users file at startup and kept current by the storage
+save/delete hooks, which cover adding, removing and transferring Pokemon.
+"""
+
+import logging
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import storage_hooks
+from user_scan import iter_user_projections
+
+logger = logging.getLogger(__name__)
+
+class OwnershipError(Exception):
+    """A Pokemon is not owned by the expected user."""
+
+# pokemon_id -> (user_id, позиция в коллекции)
+_owners: Dict[str, Tuple[int, int]] = {}
+# user_id -> pokemon_ids, для быстрого удаления старых записей пользователя
+_user_pokemon_ids: Dict[int, Set[str]] = {}
+_built = False
+
+def _index_user(user_id: int, pokemon_ids: Sequence[str]) -> None:
+    for pokemon_id in _user_pokemon_ids.pop(user_id, ()):
+        if _owners.get(pokemon_id, (None,))[0] == user_id:
+            del _owners[pokemon_id]
+
+    for slot, pokemon_id in enumerate(pokemon_ids):
+        _owners[pokemon_id] = (user_id, slot)
+    if pokemon_ids:
+        _user_pokemon_ids[user_id] = set(pokemon_ids)
+
+def build() -> None:
+    """Build the index from the users file. Called once at startup."""
+    global _built
+    _owners.clear()
+    _user_pokemon_ids.clear()
+    for chunk in iter_user_projections(("pokemon_ids",)):
+        for user in chunk:
+            _index_user(user.user_id, user.pokemon_ids)
+    _built = True
+    logger.info(f"Индекс покемонов построен: {len(_owners)} покемонов")
+
+def _ensure_built() -> None:
+    if not _built:
+        build()
+
+def on_user_saved(user) -> None:
+    if _built:
+        _index_user(user.user_id, [pokemon.pokemon_id for pokemon in user.pokemons])
+
+def on_user_deleted(user_id: int) -> None:
+    if _built:
+        _index_user(user_id, [])
+
+def install() -> None:
+    """Subscribe the index to storage changes."""
+    storage_hooks.add_save_listener(on_user_saved)
+    storage_hooks.add_delete_listener(on_user_deleted)
+
+def get_owner(pokemon_id: str) -> Optional[int]:
+    """Get the ID of the user who owns a Pokemon."""
+    _ensure_built()
+    entry = _owners.get(pokemon_id)
+    return entry[0] if entry else None
+
+def find_slot(user, pokemon_id: str) -> Optional[int]:
+    """Get the position of a Pokemon in a user's collection, or None.
+
+    The indexed position is checked against the collection, so a user object
+    changed without being saved falls back to a scan instead of a wrong answer.
+    """
+    _ensure_built()
+    entry = _owners.get(pokemon_id)
+    if entry and entry[0] == user.user_id:
+        slot = entry[1]
+        if slot < len(user.pokemons) and user.pokemons[slot].pokemon_id == pokemon_id:
+            return slot
+
+    for slot, pokemon in enumerate(user.pokemons):
+        if pokemon.pokemon_id == pokemon_id:
+            logger.debug(f"Индекс покемонов устарел для {pokemon_id}, найден перебором")
+            return slot
+    return None
+
+def find_pokemon(user, pokemon_id: str):
+    """Get a user's Pokemon by ID, or None."""
+    slot = find_slot(user, pokemon_id)
+    return user.pokemons[slot] if slot is not None else None
+
+def assert_owner(user, pokemon_ids: Sequence[str]) -> List[int]:
+    """Get the collection positions of Pokemon that must belong to the user.
+
+    Raises OwnershipError if any of them isn't in the user's collection.
+    """
+    slots = []
+    for pokemon_id in pokemon_ids:
+        slot = find_slot(user, pokemon_id)
+        if slot is None:
+            raise OwnershipError(f"Pokemon {pokemon_id} is not owned by user {user.user_id}")
+        slots.append(slot)
+    return slots
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Promocode campaigns: many unique single-use codes under one record.
+
+A campaign stores its reward, a code count and a random secret. Code number
+`serial` is PREFIX-XXXX-XXXX-XXXX-XXXX, the base32 form of the serial and the
+first MAC_BYTES of HMAC-SHA256(secret, prefix + serial). Codes are never
+stored: a code is verified by recomputing its MAC, so creating a campaign of
+millions of codes is instant and verification is O(1). Without the secret a
+valid code can't be guessed (2^48 tries per code).
+
+Used codes are one bit each in a bitmap per campaign, persisted compressed
+in data/promocode_campaign_{PREFIX}.json at most once per FLUSH_INTERVAL and
+on shutdown. Every claim is first appended to an fsync'd log,
+data/promocode_campaign_{PREFIX}.log, which is folded into the bitmap on
+load, so a code stays used across a restart from the moment it is claimed.
+Campaign codes are redeemed through promocode_engine.redeem like any other
+promocode.
+
+Campaigns are created and exported from the command line:
+    python promocode_campaigns.py create SUMMER --count 100000 --reward-type coins --reward-value 500
+    python promocode_campaigns.py export SUMMER --output summer.csv
+    python promocode_campaigns.py stats SUMMER
+"""
+
+import argparse
+import base64
+import csv
+import hashlib
+import hmac
+import logging
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterator, Optional, TextIO, Tuple
+
+import session_store
+from json_store import append_json_line, data_path, load_json, load_json_lines, save_json, truncate_json_lines
+from models.shop import Promocode
+
+logger = logging.getLogger(__name__)
+
+CAMPAIGNS_FILE = data_path("promocode_campaigns.json")
+
+# Truncated HMAC length in a code
+MAC_BYTES = 6
+SERIAL_BYTES = 4
+# Codes per campaign: the bitmap of used codes (at most 12.5 MB) is kept in the bot's memory
+MAX_CODES = 10 ** 8
+# Minimum seconds between two writes of a campaign's bitmap
+FLUSH_INTERVAL = 2.0
+# Codes written per batch by the CSV export
+EXPORT_BATCH = 10000
+
+PREFIX_PATTERN = re.compile(r"^[A-Z0-9]{1,12}$")
+
+class CampaignError(Exception):
+    """Invalid campaign parameters."""
+
+_lock = threading.RLock()
+# PREFIX -> кампания
+_campaigns: Optional[Dict[str, Dict[str, Any]]] = None
+_campaigns_mtime = 0.0
+# PREFIX -> битовая карта использованных кодов
+_bitmaps: Dict[str, bytearray] = {}
+_redeemed_counts: Dict[str, int] = {}
+_dirty: set = set()
+_last_flush = 0.0
+
+def _bitmap_path(prefix: str) -> str:
+    return data_path(f"promocode_campaign_{prefix}.json")
+
+def _log_path(prefix: str) -> str:
+    return data_path(f"promocode_campaign_{prefix}.log")
+
+def _load() -> Dict[str, Dict[str, Any]]:
+    global _campaigns, _campaigns_mtime
+    # Кампании создаются из командной строки, пока бот работает
+    mtime = os.path.getmtime(CAMPAIGNS_FILE) if os.path.exists(CAMPAIGNS_FILE) else 0.0
+    if _campaigns is None or mtime != _campaigns_mtime:
+        _campaigns = load_json(CAMPAIGNS_FILE, {})
+        _campaigns_mtime = mtime
+    return _campaigns
+
+def _get_bitmap(prefix: str) -> bytearray:
+    bitmap = _bitmaps.get(prefix)
+    if bitmap is None:
+        size = (_load()[prefix]["count"] + 7) // 8
+        stored = load_json(_bitmap_path(prefix))
+        if stored:
+            bitmap = bytearray(zlib.decompress(base64.b64decode(stored["redeemed"])))
+        else:
+            bitmap = bytearray(size)
+        # Коды, использованные после последней записи битовой карты
+        log = load_json_lines(_log_path(prefix))
+        for record in log:
+            byte, bit = divmod(record["serial"], 8)
+            if record.get("released"):
+                bitmap[byte] &= ~(1 << bit)
+            else:
+                bitmap[byte] |= 1 << bit
+        if log:
+            _dirty.add(prefix)
+        _bitmaps[prefix] = bitmap
+        _redeemed_counts[prefix] = sum(bin(byte).count("1") for byte in bitmap)
+    return bitmap
+
+def _flush() -> None:
+    global _last_flush
+    for prefix in _dirty:
+        encoded = base64.b64encode(zlib.compress(bytes(_bitmaps[prefix]))).decode("ascii")
+        save_json(_bitmap_path(prefix), {"redeemed": encoded}, indent=None, durable=True)
+        truncate_json_lines(_log_path(prefix))
+    _dirty.clear()
+    _last_flush = time.monotonic()
+
+def _mac(campaign: Dict[str, Any], serial: int) -> bytes:
+    message = campaign["prefix"].encode("ascii") + serial.to_bytes(SERIAL_BYTES, "big")
+    return hmac.new(bytes.fromhex(campaign["secret"]), message, hashlib.sha256).digest()[:MAC_BYTES]
+
+def _format_code(prefix: str, serial: int, mac: bytes) -> str:
+    body = base64.b32encode(serial.to_bytes(SERIAL_BYTES, "big") + mac).decode("ascii")
+    return f"{prefix}-{body[:4]}-{body[4:8]}-{body[8:12]}-{body[12:]}"
+
+def create_campaign(
+    prefix: str,
+    count: int,
+    reward_type: str,
+    reward_value: Any,
+    reward_amount: int = 1,
+    created_by: int = 0,
+    description: str = "",
+    expires_at: Optional[float] = None
+) -> Dict[str, Any]:
+    """Create a campaign of count single-use codes starting with prefix."""
+    prefix = prefix.strip().upper()
+    if not PREFIX_PATTERN.match(prefix):
+        raise CampaignError("Префикс должен состоять из 1-12 латинских букв и цифр")
+    if not 0 < count <= MAX_CODES:
+        raise CampaignError(f"Количество кодов должно быть от 1 до {MAX_CODES}")
+
+    with _lock:
+        campaigns = _load()
+        if prefix in campaigns:
+            raise CampaignError(f"Кампания {prefix} уже существует")
+        campaign = {
+            "prefix": prefix,
+            "secret": secrets.token_hex(32),
+            "count": count,
+            "reward_type": reward_type,
+            "reward_value": reward_value,
+            "reward_amount": reward_amount,
+            "created_by": created_by,
+            "created_at": time.time(),
+            "expires_at": expires_at,
+            "description": description
+        }
+        campaigns[prefix] = campaign
+        save_json(CAMPAIGNS_FILE, campaigns)
+        _load()
+        logger.info(f"Создана кампания промокодов {prefix}: {count} кодов")
+        return dict(campaign)
+
+def get_campaign(prefix: str) -> Optional[Dict[str, Any]]:
+    """Get a campaign by its prefix."""
+    with _lock:
+        campaign = _load().get(prefix.strip().upper())
+        return dict(campaign) if campaign else None
+
+def find_code(code: str) -> Optional[Tuple[str, int]]:
+    """Verify a campaign code. Returns (prefix, serial), or None if it isn't valid."""
+    prefix, _, body = code.strip().upper().partition("-")
+    body = body.replace("-", "")
+    campaign = get_campaign(prefix) if body else None
+    if campaign is None:
+        return None
+
+    try:
+        raw = base64.b32decode(body)
+    except ValueError:
+        return None
+    if len(raw) != SERIAL_BYTES + MAC_BYTES:
+        return None
+
+    serial = int.from_bytes(raw[:SERIAL_BYTES], "big")
+    if serial >= campaign["count"] or not hmac.compare_digest(raw[SERIAL_BYTES:], _mac(campaign, serial)):
+        return None
+    return prefix, serial
+
+def get_reward(prefix: str, serial: int) -> Promocode:
+    """Get the reward of a campaign code as a Promocode."""
+    campaign = get_campaign(prefix)
+    return Promocode(
+        code=_format_code(prefix, serial, _mac(campaign, serial)),
+        reward_type=campaign["reward_type"],
+        reward_value=campaign["reward_value"],
+        reward_amount=campaign["reward_amount"],
+        created_by=campaign["created_by"],
+        created_at=campaign["created_at"],
+        expires_at=campaign["expires_at"],
+        max_uses=1,
+        description=campaign["description"]
+    )
+
+def claim(prefix: str, serial: int) -> Optional[Promocode]:
+    """Mark a campaign code used. Returns its reward, or None if it was already used or expired."""
+    with _lock:
+        campaign = _load().get(prefix)
+        if campaign is None or (campaign["expires_at"] and time.time() > campaign["expires_at"]):
+            return None
+        bitmap = _get_bitmap(prefix)
+        byte, bit = divmod(serial, 8)
+        if bitmap[byte] & (1 << bit):
+            return None
+        # Код считается использованным только после записи в журнал
+        append_json_line(_log_path(prefix), {"serial": serial})
+        bitmap[byte] |= 1 << bit
+        _redeemed_counts[prefix] += 1
+        _dirty.add(prefix)
+        if time.monotonic() - _last_flush >= FLUSH_INTERVAL:
+            _flush()
+    return get_reward(prefix, serial)
+
+def release(prefix: str, serial: int) -> None:
+    """Make a claimed code usable again after its reward couldn't be applied."""
+    with _lock:
+        bitmap = _get_bitmap(prefix)
+        byte, bit = divmod(serial, 8)
+        if bitmap[byte] & (1 << bit):
+            append_json_line(_log_path(prefix), {"serial": serial, "released": True})
+            bitmap[byte] &= ~(1 << bit)
+            _redeemed_counts[prefix] -= 1
+            _dirty.add(prefix)
+
+def get_redeemed_count(prefix: str) -> int:
+    """Get the number of used codes of a campaign."""
+    with _lock:
+        _get_bitmap(prefix)
+        return _redeemed_counts[prefix]
+
+def iter_codes(prefix: str) -> Iterator[str]:
+    """Yield every code of a campaign in serial order."""
+    campaign = get_campaign(prefix)
+    if campaign is None:
+        raise CampaignError(f"Кампания {prefix} не найдена")
+
+    # Состояние HMAC после ключа и префикса считается один раз
+    base = hmac.new(bytes.fromhex(campaign["secret"]), campaign["prefix"].encode("ascii"), hashlib.sha256)
+    for serial in range(campaign["count"]):
+        mac = base.copy()
+        mac.update(serial.to_bytes(SERIAL_BYTES, "big"))
+        yield _format_code(campaign["prefix"], serial, mac.digest()[:MAC_BYTES])
+
+def export_csv(prefix: str, output: TextIO) -> int:
+    """Stream every code of a campaign to a CSV file. Returns the number of codes."""
+    writer = csv.writer(output)
+    writer.writerow(["serial", "code"])
+    batch = []
+    written = 0
+    for serial, code in enumerate(iter_codes(prefix)):
+        batch.append((serial, code))
+        if len(batch) >= EXPORT_BATCH:
+            writer.writerows(batch)
+            written += len(batch)
+            batch = []
+    writer.writerows(batch)
+    return written + len(batch)
+
+def flush() -> None:
+    """Write pending bitmap changes now."""
+    with _lock:
+        if _dirty:
+            _flush()
+
+def sweep() -> int:
+    """Write pending bitmap changes. Called by session_store.run_sweeper."""
+    flush()
+    return 0
+
+# Модуль сам предоставляет sweep(), его вызывает session_store.run_sweeper
+session_store.register_store(sys.modules[__name__])
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Create and export promocode campaigns.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    create = commands.add_parser("create", help="create a campaign")
+    create.add_argument("prefix")
+    create.add_argument("--count", type=int, required=True)
+    create.add_argument("--reward-type", choices=["coins", "pokemon", "trainer", "custom_pokemon"], required=True)
+    create.add_argument("--reward-value", required=True)
+    create.add_argument("--reward-amount", type=int, default=1)
+    create.add_argument("--expires-days", type=float, help="days until the codes expire")
+    create.add_argument("--description", default="")
+
+    export = commands.add_parser("export", help="write every code of a campaign as CSV")
+    export.add_argument("prefix")
+    export.add_argument("--output", help="CSV file (default: stdout)")
+
+    stats = commands.add_parser("stats", help="show how many codes were used")
+    stats.add_argument("prefix")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == "create":
+        reward_value = int(args.reward_value) if args.reward_type == "coins" else args.reward_value
+        expires_at = time.time() + args.expires_days * 86400 if args.expires_days else None
+        try:
+            campaign = create_campaign(
+                args.prefix, args.count, args.reward_type, reward_value,
+                reward_amount=args.reward_amount, description=args.description, expires_at=expires_at
+            )
+        except CampaignError as e:
+            sys.exit(str(e))
+        print(f"Created campaign {campaign['prefix']} with {campaign['count']} codes")
+    elif args.command == "export":
+        if args.output:
+            with open(args.output, "w", newline="", encoding="utf-8") as f:
+                count = export_csv(args.prefix, f)
+            print(f"Exported {count} codes to {args.output}")
+        else:
+            export_csv(args.prefix, sys.stdout)
+    else:
+        campaign = get_campaign(args.prefix)
+        if campaign is None:
+            sys.exit(f"Campaign {args.prefix} not found")
+        print(f"{campaign['prefix']}: {get_redeemed_count(campaign['prefix'])} of {campaign['count']} codes used")
+
+if __name__ == "__main__":
+    main()
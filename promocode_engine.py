@@ -0,0 +1,277 @@
+"""
+Promocode redemption engine.
+
+Promocodes stay in data/promocodes.json (models.shop.Promocode records). The
+engine keeps them in memory with everything a redemption needs:
+- per code, the set of user IDs that redeemed it, so "already used" is an O(1)
+  hash lookup instead of a scan of user.used_promocodes;
+- a capped use counter checked and incremented under one lock, so a stampede
+  on a popular code can't redeem it past max_uses;
+- an expiry heap, so the periodic sweep retires expired codes and frees their
+  redeemed sets without visiting every code;
+- batched persistence: every reservation is appended to an fsync'd log
+  (data/promocode_redemptions.log) before the user is saved, and the files
+  are rewritten at most once per FLUSH_INTERVAL, on every sweep and on
+  shutdown. The log is folded back in on load, so a restart never loses a
+  use and a capped code can't be redeemed past max_uses.
+
+A redemption is recorded in the user's used_promocodes in the same save that
+applies the reward, and that list is checked as well, so a user still gets a
+code once.
+"""
+
+import heapq
+import logging
+import sys
+import threading
+import time
+from functools import partial
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import custom_pokemon_registry
+import promocode_campaigns
+import session_store
+from bulk_grant import copy_pokemon, resolve_pokemon_names
+from json_store import append_json_line, data_path, load_json, load_json_lines, save_json, truncate_json_lines
+from models.shop import Promocode
+from storage import get_user, save_user
+from user_scan import iter_user_projections
+
+logger = logging.getLogger(__name__)
+
+PROMOCODES_FILE = data_path("promocodes.json")
+REDEMPTIONS_FILE = data_path("promocode_redemptions.json")
+# Активации и их отмены после последней записи файлов: {"code", "user_id", "released"}
+REDEMPTION_LOG_FILE = data_path("promocode_redemptions.log")
+
+# Minimum seconds between two writes of the promocode files
+FLUSH_INTERVAL = 2.0
+
+_lock = threading.RLock()
+# code.lower() -> промокод
+_promocodes: Optional[Dict[str, Promocode]] = None
+# code.lower() -> ID пользователей, активировавших промокод
+_redeemed: Dict[str, Set[int]] = {}
+# (expires_at, code.lower()) для промокодов со сроком действия
+_expiry_heap: List[Tuple[float, str]] = []
+_dirty = False
+_last_flush = 0.0
+
+def _key(code: str) -> str:
+    return code.strip().lower()
+
+def _add(promocode: Promocode) -> None:
+    key = _key(promocode.code)
+    _promocodes[key] = promocode
+    _redeemed.setdefault(key, set())
+    if promocode.expires_at:
+        heapq.heappush(_expiry_heap, (promocode.expires_at, key))
+
+def _load() -> Dict[str, Promocode]:
+    global _promocodes, _dirty
+    if _promocodes is None:
+        _promocodes = {}
+        for data in load_json(PROMOCODES_FILE, {}).values():
+            _add(Promocode.from_dict(data))
+
+        redemptions = load_json(REDEMPTIONS_FILE)
+        if redemptions is None:
+            # Первый запуск: переносим активации из профилей пользователей
+            redemptions = {}
+            for chunk in iter_user_projections(("used_promocodes",)):
+                for projection in chunk:
+                    for code in projection.used_promocodes or []:
+                        redemptions.setdefault(_key(code), []).append(projection.user_id)
+        for key, user_ids in redemptions.items():
+            if key in _redeemed:
+                _redeemed[key].update(user_ids)
+
+        # Активации, не попавшие в файлы до остановки; проверка множества делает повтор безопасным
+        replayed = 0
+        for record in load_json_lines(REDEMPTION_LOG_FILE):
+            key, user_id = record["code"], record["user_id"]
+            promocode = _promocodes.get(key)
+            if promocode is None:
+                continue
+            if record.get("released"):
+                if user_id in _redeemed[key]:
+                    _redeemed[key].discard(user_id)
+                    promocode.use_count -= 1
+            elif user_id not in _redeemed[key]:
+                _redeemed[key].add(user_id)
+                promocode.use_count += 1
+            replayed += 1
+        if replayed:
+            logger.info(f"Восстановлено активаций промокодов из журнала: {replayed}")
+            _dirty = True
+
+        logger.info(f"Загружено промокодов: {len(_promocodes)}")
+    return _promocodes
+
+def _flush() -> None:
+    global _dirty, _last_flush
+    save_json(PROMOCODES_FILE, {p.code: p.to_dict() for p in _promocodes.values()}, durable=True)
+    save_json(REDEMPTIONS_FILE, {key: sorted(ids) for key, ids in _redeemed.items()}, indent=None, durable=True)
+    # Журнал нужен только до следующей записи файлов
+    truncate_json_lines(REDEMPTION_LOG_FILE)
+    _dirty = False
+    _last_flush = time.monotonic()
+
+def _mark_dirty() -> None:
+    global _dirty
+    _dirty = True
+    if time.monotonic() - _last_flush >= FLUSH_INTERVAL:
+        _flush()
+
+def flush() -> None:
+    """Write pending redemptions to disk now."""
+    with _lock:
+        if _promocodes is not None and _dirty:
+            _flush()
+
+def get_promocode(code: str) -> Optional[Promocode]:
+    """Get a promocode by its code (case-insensitive)."""
+    with _lock:
+        return _load().get(_key(code))
+
+def create_promocode(
+    code: str,
+    reward_type: str,
+    reward_value: Any,
+    reward_amount: int = 1,
+    created_by: int = 0,
+    description: str = "",
+    expires_at: Optional[float] = None,
+    max_uses: Optional[int] = None
+) -> Promocode:
+    """Create a promocode, replacing the definition of an existing one with that code."""
+    with _lock:
+        promocodes = _load()
+        existing = promocodes.get(_key(code))
+        promocode = Promocode(
+            code=code.strip(),
+            reward_type=reward_type,
+            reward_value=reward_value,
+            reward_amount=reward_amount,
+            created_by=created_by,
+            expires_at=expires_at,
+            max_uses=max_uses,
+            use_count=existing.use_count if existing else 0,
+            description=description
+        )
+        _add(promocode)
+        _flush()
+        logger.info(f"Создан промокод {promocode.code} ({reward_type})")
+        return promocode
+
+def _reserve(key: str, user_id: int) -> Optional[Promocode]:
+    """Claim one use of a code for a user, or return None if they can't use it."""
+    with _lock:
+        promocode = _load().get(key)
+        if promocode is None or user_id in _redeemed[key]:
+            return None
+        if promocode.expires_at and time.time() > promocode.expires_at:
+            return None
+        if promocode.max_uses and promocode.use_count >= promocode.max_uses:
+            return None
+        # До сохранения пользователя: после перезапуска активация уже учтена
+        append_json_line(REDEMPTION_LOG_FILE, {"code": key, "user_id": user_id})
+        promocode.use_count += 1
+        _redeemed[key].add(user_id)
+        return promocode
+
+def _release(key: str, user_id: int) -> None:
+    """Undo a reservation whose reward couldn't be applied."""
+    with _lock:
+        promocode = _load().get(key)
+        if promocode and user_id in _redeemed[key]:
+            append_json_line(REDEMPTION_LOG_FILE, {"code": key, "user_id": user_id, "released": True})
+            _redeemed[key].discard(user_id)
+            promocode.use_count -= 1
+
+def _apply_reward(user, promocode: Promocode, template) -> bool:
+    if promocode.reward_type == "coins":
+        user.balance += int(promocode.reward_value)
+    elif promocode.reward_type == "trainer":
+        user.trainer = promocode.reward_value
+        user.trainer_level = 1
+    elif promocode.reward_type == "pokemon":
+        if template is None:
+            return False
+        for _ in range(max(1, promocode.reward_amount)):
+            user.pokemons.append(copy_pokemon(template))
+            user.caught_pokemon_count += 1
+    elif promocode.reward_type == "custom_pokemon":
+        definition = custom_pokemon_registry.get(str(promocode.reward_value))
+        if definition is None:
+            return False
+        user.pokemons.append(custom_pokemon_registry.create_pokemon(definition))
+        user.caught_pokemon_count += 1
+    else:
+        return False
+    return True
+
+async def redeem(user_id: int, code: str) -> Tuple[bool, Optional[str], Optional[str]]:
+    """Redeem a promocode or a campaign code for a user, at most once per user.
+
+    Returns (success, reward_type, reward_description).
+    """
+    key = _key(code)
+    promocode = get_promocode(key)
+    if promocode is not None:
+        reserve = partial(_reserve, key, user_id)
+        release = partial(_release, key, user_id)
+    else:
+        found = promocode_campaigns.find_code(code)
+        if found is None:
+            return False, None, None
+        promocode = promocode_campaigns.get_reward(*found)
+        reserve = partial(promocode_campaigns.claim, *found)
+        release = partial(promocode_campaigns.release, *found)
+
+    # Покемона находим заранее: между резервированием и сохранением не должно быть await
+    template = None
+    if promocode.reward_type == "pokemon":
+        template = (await resolve_pokemon_names([promocode.reward_value])).get(promocode.reward_value)
+
+    user = get_user(user_id)
+    if user is None or promocode.code in user.used_promocodes:
+        return False, None, None
+
+    promocode = reserve()
+    if promocode is None:
+        return False, None, None
+
+    if not _apply_reward(user, promocode, template):
+        release()
+        logger.error(f"Не удалось выдать награду промокода {promocode.code} пользователю {user_id}")
+        return False, None, None
+
+    user.used_promocodes.append(promocode.code)
+    save_user(user)
+    with _lock:
+        _mark_dirty()
+    logger.info(f"Пользователь {user_id} активировал промокод {promocode.code}")
+    return True, promocode.reward_type, promocode.get_reward_description()
+
+def sweep() -> int:
+    """Retire expired promocodes and write pending redemptions. Returns the number retired."""
+    with _lock:
+        if _promocodes is None:
+            return 0
+        retired = 0
+        current = time.time()
+        while _expiry_heap and _expiry_heap[0][0] <= current:
+            expires_at, key = heapq.heappop(_expiry_heap)
+            promocode = _promocodes.get(key)
+            # Промокод мог быть пересоздан с другим сроком
+            if promocode and promocode.expires_at == expires_at:
+                # Сам промокод остается в файле, освобождаем только множество активаций
+                _redeemed[key] = set()
+                retired += 1
+        if _dirty:
+            _flush()
+        return retired
+
+# Модуль сам предоставляет sweep(), его вызывает session_store.run_sweeper
+session_store.register_store(sys.modules[__name__])
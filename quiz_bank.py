@@ -0,0 +1,197 @@
+"""
+Pokemon quiz question bank.
+
+Every fact question the local species dataset (pokemon_dataset.py) can answer
+is precomputed once as a row of NumPy arrays: (kind, subject, answer). Asking
+a question picks a row the user hasn't seen recently and samples the wrong
+options from boolean masks with vectorised draws, so the same fact comes with
+different distractors each time. Nothing here touches the network and a
+question takes a few tens of microseconds.
+
+Question kinds:
+    type        - what type is Pokemon X
+    generation  - which generation is Pokemon X from
+    ability     - which ability does Pokemon X have
+    evolution   - what does Pokemon X evolve into
+    type_member - which of these Pokemon has type T
+"""
+
+import logging
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from battle_sim import TYPE_INDEX, TYPES
+from pokemon_dataset import load_species
+
+logger = logging.getLogger(__name__)
+
+TYPE_QUESTION, GENERATION_QUESTION, ABILITY_QUESTION, EVOLUTION_QUESTION, TYPE_MEMBER_QUESTION = range(5)
+
+OPTION_COUNT = 4
+# Number of last questions that a user won't be asked again
+RECENT_QUESTIONS = 200
+# Number of users whose recent questions are remembered
+MAX_TRACKED_USERS = 10000
+# Attempts to find a question the user hasn't seen recently
+PICK_ATTEMPTS = 8
+
+TYPE_LABELS = {
+    "normal": "Нормальный", "fire": "Огненный", "water": "Водный", "electric": "Электрический",
+    "grass": "Травяной", "ice": "Ледяной", "fighting": "Боевой", "poison": "Ядовитый",
+    "ground": "Земляной", "flying": "Летающий", "psychic": "Психический", "bug": "Насекомый",
+    "rock": "Каменный", "ghost": "Призрачный", "dragon": "Драконий", "dark": "Темный",
+    "steel": "Стальной", "fairy": "Волшебный"
+}
+
+GENERATION_LABELS = [
+    "Первое", "Второе", "Третье", "Четвертое", "Пятое",
+    "Шестое", "Седьмое", "Восьмое", "Девятое"
+]
+
+def _display_name(slug: str) -> str:
+    return slug.replace("-", " ").title()
+
+class QuizBank:
+    """Precomputed quiz questions over a list of species records."""
+
+    def __init__(self, species: List[Dict[str, Any]], seed: Optional[int] = None):
+        self.rng = np.random.default_rng(seed)
+        species = [record for record in species if record.get("types")]
+        count = len(species)
+
+        self.names = [_display_name(record["name"]) for record in species]
+        self.abilities = sorted({ability for record in species for ability in record["abilities"]})
+        ability_index = {ability: i for i, ability in enumerate(self.abilities)}
+        species_index = {record["name"]: i for i, record in enumerate(species)}
+
+        # Матрицы принадлежности для масок неправильных вариантов
+        self.type_matrix = np.zeros((count, len(TYPES)), dtype=bool)
+        self.ability_matrix = np.zeros((count, len(self.abilities)), dtype=bool)
+        self.evolution_matrix = np.eye(count, dtype=bool)
+        self.generations = np.zeros(count, dtype=np.int64)
+
+        rows: List[Tuple[int, int, int]] = []
+        for i, record in enumerate(species):
+            self.generations[i] = record.get("generation", 0)
+            if 0 < self.generations[i] <= len(GENERATION_LABELS):
+                rows.append((GENERATION_QUESTION, i, self.generations[i] - 1))
+
+            for type_name in record["types"]:
+                t = TYPE_INDEX.get(type_name)
+                if t is not None:
+                    self.type_matrix[i, t] = True
+                    rows.append((TYPE_QUESTION, i, t))
+                    rows.append((TYPE_MEMBER_QUESTION, t, i))
+
+            for ability in record["abilities"]:
+                self.ability_matrix[i, ability_index[ability]] = True
+                rows.append((ABILITY_QUESTION, i, ability_index[ability]))
+
+            for evolution in record.get("evolves_to", []):
+                target = species_index.get(evolution)
+                if target is not None:
+                    self.evolution_matrix[i, target] = True
+                    rows.append((EVOLUTION_QUESTION, i, target))
+
+        bank = np.array(rows, dtype=np.int64).reshape(-1, 3)
+        self.kinds, self.subjects, self.answers = bank[:, 0], bank[:, 1], bank[:, 2]
+        self.generation_mask = np.zeros(len(GENERATION_LABELS), dtype=bool)
+        self.generation_mask[np.unique(self.answers[self.kinds == GENERATION_QUESTION])] = True
+
+        # user_id -> (последние вопросы по порядку, те же вопросы множеством)
+        self._recent: "OrderedDict[int, Tuple[Deque[int], Set[int]]]" = OrderedDict()
+        logger.info(f"Банк вопросов викторины: {len(self)} вопросов о {count} покемонах")
+
+    def __len__(self) -> int:
+        return int(self.kinds.size)
+
+    def _sample(self, allowed: np.ndarray, k: int) -> np.ndarray:
+        """Pick up to k distinct indices where allowed is True."""
+        draws = self.rng.integers(0, allowed.size, size=k * 4)
+        picked = draws[allowed[draws]]
+        _, first = np.unique(picked, return_index=True)
+        picked = picked[np.sort(first)][:k]
+        if picked.size < k:
+            # Редкий случай: мало подходящих вариантов, выбираем из всех
+            candidates = np.flatnonzero(allowed)
+            picked = self.rng.choice(candidates, size=min(k, candidates.size), replace=False)
+        return picked
+
+    def build_question(self, row: int) -> Dict[str, Any]:
+        """Render a bank row as a question with shuffled options."""
+        kind, subject, answer = int(self.kinds[row]), int(self.subjects[row]), int(self.answers[row])
+        distractor_count = OPTION_COUNT - 1
+
+        if kind == TYPE_QUESTION:
+            question = f"Какого типа покемон {self.names[subject]}?"
+            wrong = self._sample(~self.type_matrix[subject], distractor_count)
+            labels = [TYPE_LABELS[TYPES[t]] for t in wrong]
+            correct = TYPE_LABELS[TYPES[answer]]
+        elif kind == GENERATION_QUESTION:
+            question = f"К какому поколению относится покемон {self.names[subject]}?"
+            allowed = self.generation_mask.copy()
+            allowed[answer] = False
+            labels = [GENERATION_LABELS[g] for g in self._sample(allowed, distractor_count)]
+            correct = GENERATION_LABELS[answer]
+        elif kind == ABILITY_QUESTION:
+            question = f"Какая способность у покемона {self.names[subject]}?"
+            wrong = self._sample(~self.ability_matrix[subject], distractor_count)
+            labels = [_display_name(self.abilities[a]) for a in wrong]
+            correct = _display_name(self.abilities[answer])
+        elif kind == EVOLUTION_QUESTION:
+            question = f"В какого покемона эволюционирует {self.names[subject]}?"
+            labels = [self.names[s] for s in self._sample(~self.evolution_matrix[subject], distractor_count)]
+            correct = self.names[answer]
+        else:
+            question = f"Какой из этих покемонов имеет тип «{TYPE_LABELS[TYPES[subject]]}»?"
+            labels = [self.names[s] for s in self._sample(~self.type_matrix[:, subject], distractor_count)]
+            correct = self.names[answer]
+
+        correct_answer = int(self.rng.integers(0, len(labels) + 1))
+        options = labels[:correct_answer] + [correct] + labels[correct_answer:]
+        return {
+            "question": question,
+            "options": options,
+            "correct_answer": correct_answer
+        }
+
+    def _recent_for(self, user_id: int) -> Tuple[Deque[int], Set[int]]:
+        recent = self._recent.get(user_id)
+        if recent is None:
+            recent = (deque(), set())
+            self._recent[user_id] = recent
+            if len(self._recent) > MAX_TRACKED_USERS:
+                self._recent.popitem(last=False)
+        else:
+            self._recent.move_to_end(user_id)
+        return recent
+
+    def next_question(self, user_id: Optional[int] = None) -> Dict[str, Any]:
+        """Get a random question, avoiding the user's recent questions."""
+        rows = self.rng.integers(0, len(self), size=PICK_ATTEMPTS)
+        if user_id is None:
+            return self.build_question(int(rows[0]))
+
+        order, seen = self._recent_for(user_id)
+        row = next((int(r) for r in rows if int(r) not in seen), int(rows[0]))
+
+        order.append(row)
+        seen.add(row)
+        if len(order) > min(RECENT_QUESTIONS, len(self) // 2):
+            seen.discard(order.popleft())
+        return self.build_question(row)
+
+_bank: Optional[QuizBank] = None
+
+def get_bank() -> QuizBank:
+    """Get the question bank, building it on first use."""
+    global _bank
+    if _bank is None:
+        _bank = QuizBank(load_species())
+    return _bank
+
+def get_question(user_id: Optional[int] = None) -> Dict[str, Any]:
+    """Get a quiz question for a user."""
+    return get_bank().next_question(user_id)
@@ -0,0 +1,218 @@
+"""
+Persistent short-lived sessions with explicit states and expiry.
+
+A SessionStore keeps small JSON-serialisable session dicts (battles, trades)
+in memory and mirrors them to a file in data/, so sessions survive a restart.
+Every state has its own time to live; expired sessions are removed by the
+single sweeper task (run_sweeper) and are never returned by get().
+
+All changes go through the store under a lock and callers only ever receive
+copies, so a check-and-set transition happens exactly once even when two
+updates race.
+"""
+
+import asyncio
+import atexit
+import copy
+import logging
+import secrets
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from json_store import data_path, load_json, save_json
+
+logger = logging.getLogger(__name__)
+
+# Interval between sweeps of expired sessions (seconds)
+SWEEP_INTERVAL = 60
+
+# Все хранилища с методом sweep(), которые очищает run_sweeper
+_stores: List[Any] = []
+
+def register_store(store: Any) -> None:
+    """Add a store with a sweep() method to the periodic sweeper."""
+    _stores.append(store)
+
+class SessionStore:
+    """A persisted table of sessions keyed by short hex IDs."""
+
+    def __init__(
+        self,
+        name: str,
+        ttl_by_state: Dict[str, float],
+        max_sessions: int = 10000,
+        on_expire: Optional[Callable[[Dict[str, Any]], None]] = None
+    ):
+        self.name = name
+        self.path = data_path(f"{name}.json")
+        self.ttl_by_state = ttl_by_state
+        self.max_sessions = max_sessions
+        # Вызывается для каждой истекшей или вытесненной сессии (например, чтобы снять блокировки)
+        self.on_expire = on_expire
+        self._sessions: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = threading.RLock()
+        register_store(self)
+
+    def _get_sessions(self) -> Dict[str, Dict[str, Any]]:
+        if self._sessions is None:
+            self._sessions = load_json(self.path, {})
+            expired = self._remove_expired(time.time())
+            if self._sessions:
+                logger.info(f"Восстановлено сессий {self.name}: {len(self._sessions)}")
+            if expired:
+                self._save()
+        return self._sessions
+
+    def _save(self) -> None:
+        save_json(self.path, self._sessions)
+
+    def _remove_expired(self, now: float) -> int:
+        expired = [
+            session_id for session_id, session in self._sessions.items()
+            if session.get("expires_at", 0) <= now
+        ]
+        for session_id in expired:
+            session = self._sessions.pop(session_id)
+            logger.info(f"Сессия {self.name} {session_id} истекла в состоянии {session.get('state')}")
+            self._expire(session)
+        return len(expired)
+
+    def _expire(self, session: Dict[str, Any]) -> None:
+        if self.on_expire is None:
+            return
+        try:
+            self.on_expire(session)
+        except Exception as e:
+            logger.error(f"Ошибка при завершении сессии {self.name} {session.get('id')}: {e}")
+
+    def _set_state(self, session: Dict[str, Any], state: str, now: float) -> None:
+        session["state"] = state
+        session["updated_at"] = now
+        session["expires_at"] = now + self.ttl_by_state.get(state, 0)
+
+    def create(self, state: str, **fields) -> Dict[str, Any]:
+        """Create a session in the given state and return a copy of it."""
+        with self._lock:
+            sessions = self._get_sessions()
+            now = time.time()
+
+            if len(sessions) >= self.max_sessions:
+                self._remove_expired(now)
+            while len(sessions) >= self.max_sessions:
+                # Вытесняем самую старую сессию, чтобы память оставалась ограниченной
+                oldest_id = min(sessions, key=lambda sid: sessions[sid].get("created_at", 0))
+                logger.warning(f"Превышен лимит сессий {self.name}, удаляем {oldest_id}")
+                self._expire(sessions.pop(oldest_id))
+
+            session_id = secrets.token_hex(4)
+            while session_id in sessions:
+                session_id = secrets.token_hex(4)
+
+            session = dict(fields, id=session_id, created_at=now)
+            self._set_state(session, state, now)
+            sessions[session_id] = session
+            self._save()
+            return copy.deepcopy(session)
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Get a copy of an active session."""
+        with self._lock:
+            session = self._get_sessions().get(session_id)
+            if not session or session.get("expires_at", 0) <= time.time():
+                return None
+            return copy.deepcopy(session)
+
+    def transition(
+        self,
+        session_id: str,
+        from_states: Iterable[str],
+        to_state: str,
+        **fields
+    ) -> Optional[Dict[str, Any]]:
+        """Move a session to a new state if it is in one of from_states.
+
+        Returns the updated copy, or None if the session is missing, expired
+        or in another state.
+        """
+        return self.mutate(session_id, lambda session: (
+            self.advance(session, to_state, **fields) if session["state"] in from_states else None
+        ))
+
+    def advance(self, session: Dict[str, Any], state: str, **fields) -> Dict[str, Any]:
+        """Update a session and move it to a state. Only for use inside mutate().
+
+        Returns a copy of the updated session.
+        """
+        session.update(fields)
+        self._set_state(session, state, time.time())
+        return copy.deepcopy(session)
+
+    def mutate(self, session_id: str, func: Callable[[Dict[str, Any]], Any]) -> Any:
+        """Run func on an active session under the store lock and persist the result.
+
+        func may change the session in place; its return value is passed back.
+        Nothing is saved when it returns None.
+        """
+        with self._lock:
+            session = self._get_sessions().get(session_id)
+            if not session or session.get("expires_at", 0) <= time.time():
+                return None
+            result = func(session)
+            if result is not None:
+                self._save()
+            return result
+
+    def set_state(self, session_id: str, state: str) -> Optional[Dict[str, Any]]:
+        """Move a session to a state unconditionally."""
+        return self.mutate(session_id, lambda session: self.advance(session, state))
+
+    def delete(self, session_id: str) -> bool:
+        """Remove a session."""
+        with self._lock:
+            if self._get_sessions().pop(session_id, None) is None:
+                return False
+            self._save()
+            return True
+
+    def sweep(self) -> int:
+        """Remove expired sessions and return their number."""
+        with self._lock:
+            self._get_sessions()
+            expired = self._remove_expired(time.time())
+            if expired:
+                self._save()
+            return expired
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._get_sessions())
+
+def sweep_all() -> int:
+    """Sweep every registered store."""
+    return sum(store.sweep() for store in _stores)
+
+def flush_all() -> None:
+    """Write the pending changes of every registered store that batches its writes."""
+    for store in _stores:
+        flush = getattr(store, "flush", None)
+        if flush is None:
+            continue
+        try:
+            flush()
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении хранилища {getattr(store, 'name', store)}: {e}")
+
+async def run_sweeper(interval: float = SWEEP_INTERVAL) -> None:
+    """Periodically remove expired sessions from all stores."""
+    while True:
+        try:
+            expired = sweep_all()
+            if expired:
+                logger.info(f"Удалено истекших сессий: {expired}")
+        except Exception as e:
+            logger.error(f"Ошибка при очистке сессий: {e}")
+        await asyncio.sleep(interval)
+
+# Несохраненные изменения записываются и при обычном завершении процесса
+atexit.register(flush_all)
@@ -0,0 +1,87 @@
+"""
+Change notifications for the storage layer.
+
+Derived indexes (leaderboards, lookup tables, caches) need to know when a user
+record changes. install() wraps storage.save_user and storage.delete_user so
+that registered listeners are called after every successful write, and times
+them together with storage.get_user (metrics.STORAGE_SECONDS and a tracing
+span). It has to run
+before the handler modules do `from storage import save_user`, otherwise they
+keep a reference to the unwrapped function.
+"""
+
+import functools
+import logging
+from typing import Any, Callable, List
+
+import metrics
+import storage
+import tracing
+
+logger = logging.getLogger(__name__)
+
+_save_listeners: List[Callable[[Any], None]] = []
+_delete_listeners: List[Callable[[int], None]] = []
+_installed = False
+
+def add_save_listener(listener: Callable[[Any], None]) -> None:
+    """Call listener(user) after every save_user."""
+    _save_listeners.append(listener)
+
+def add_delete_listener(listener: Callable[[int], None]) -> None:
+    """Call listener(user_id) after every successful delete_user."""
+    _delete_listeners.append(listener)
+
+def notify_saved(user: Any) -> None:
+    """Pass a saved user to the listeners. Listener errors never fail the save."""
+    for listener in _save_listeners:
+        try:
+            listener(user)
+        except Exception as e:
+            logger.error(f"Ошибка в обработчике сохранения пользователя {getattr(user, 'user_id', '?')}: {e}")
+
+def notify_deleted(user_id: int) -> None:
+    """Pass a deleted user ID to the listeners."""
+    for listener in _delete_listeners:
+        try:
+            listener(user_id)
+        except Exception as e:
+            logger.error(f"Ошибка в обработчике удаления пользователя {user_id}: {e}")
+
+def install() -> None:
+    """Wrap the storage write functions. Safe to call more than once."""
+    global _installed
+    if _installed:
+        return
+
+    original_get_user = storage.get_user
+    original_save_user = storage.save_user
+    original_delete_user = storage.delete_user
+    get_timer = metrics.STORAGE_SECONDS.labels("get_user")
+    save_timer = metrics.STORAGE_SECONDS.labels("save_user")
+    delete_timer = metrics.STORAGE_SECONDS.labels("delete_user")
+
+    @functools.wraps(original_get_user)
+    def get_user(user_id, *args, **kwargs):
+        with get_timer.time(), tracing.span("storage.get_user"):
+            return original_get_user(user_id, *args, **kwargs)
+
+    @functools.wraps(original_save_user)
+    def save_user(user, *args, **kwargs):
+        with save_timer.time(), tracing.span("storage.save_user"):
+            result = original_save_user(user, *args, **kwargs)
+        notify_saved(user)
+        return result
+
+    @functools.wraps(original_delete_user)
+    def delete_user(user_id, *args, **kwargs):
+        with delete_timer.time(), tracing.span("storage.delete_user"):
+            result = original_delete_user(user_id, *args, **kwargs)
+        if result:
+            notify_deleted(int(user_id))
+        return result
+
+    storage.get_user = get_user
+    storage.save_user = save_user
+    storage.delete_user = delete_user
+    _installed = True
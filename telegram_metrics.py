@@ -0,0 +1,76 @@
+"""
+Metrics for the Telegram side of the bot (see metrics.py).
+
+- instrument_application() wraps every registered handler callback so its
+  latency and errors are recorded per handler;
+- InstrumentedRequest is the Bot API request class of the application. It
+  records the latency of every Bot API method and the number of outbound
+  requests in flight, including those waiting for a free connection.
+Both also record tracing spans for slow update traces (tracing.py).
+"""
+
+import functools
+import time
+from typing import Any
+
+from telegram.ext import Application
+from telegram.request import HTTPXRequest
+
+import metrics
+import tracing
+
+# Размер пула соединений, как у HTTPXRequest по умолчанию в ApplicationBuilder
+CONNECTION_POOL_SIZE = 256
+
+def _handler_name(callback: Any) -> str:
+    module = getattr(callback, "__module__", "") or ""
+    return f"{module.rsplit('.', 1)[-1]}.{getattr(callback, '__qualname__', repr(callback))}"
+
+def _timed(callback: Any, name: str) -> Any:
+    histogram = metrics.HANDLER_SECONDS.labels(name)
+
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        start = time.perf_counter()
+        try:
+            with tracing.span(f"handler {name}"):
+                return await callback(update, context)
+        except Exception:
+            metrics.HANDLER_ERRORS.labels(name).inc()
+            raise
+        finally:
+            histogram.observe(time.perf_counter() - start)
+
+    wrapper.metrics_timed = True
+    return wrapper
+
+def instrument_application(application: Application) -> int:
+    """Time every handler registered so far. Returns the number of wrapped handlers."""
+    wrapped = 0
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            callback = getattr(handler, "callback", None)
+            if callback is None or getattr(callback, "metrics_timed", False):
+                continue
+            handler.callback = _timed(callback, _handler_name(callback))
+            wrapped += 1
+    return wrapped
+
+class InstrumentedRequest(HTTPXRequest):
+    """HTTPXRequest that records Bot API latency and requests in flight."""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("connection_pool_size", CONNECTION_POOL_SIZE)
+        super().__init__(*args, **kwargs)
+
+    async def do_request(self, url: str, method: str, *args, **kwargs):
+        # В URL есть токен бота, в метку попадает только имя метода API
+        api_method = url.rsplit("/", 1)[-1]
+        metrics.TELEGRAM_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            with tracing.span(f"telegram.{api_method}"):
+                return await super().do_request(url, method, *args, **kwargs)
+        finally:
+            metrics.TELEGRAM_IN_FLIGHT.dec()
+            metrics.TELEGRAM_SECONDS.labels(api_method).observe(time.perf_counter() - start)
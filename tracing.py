@@ -0,0 +1,162 @@
+"""
+Per-update tracing of slow updates.
+
+install() adds a TypeHandler in group -1 that opens a trace with its own
+trace ID for every update, and one in the last group that closes it. While
+the update is processed, span() records nested timed spans: handler
+callbacks, storage calls, PokeAPI requests and Bot API requests are wrapped
+in telegram_metrics.py, storage_hooks.py and pokemon_api.py. When an update
+takes longer than config.TRACE_SLOW_UPDATE_MS, its span tree is logged as a
+warning:
+
+    Медленное обновление 1234 (trace 5f0c9a1e2b3d4c6f): 2350.1 мс
+      handler battle.battle_command 2349.0 мс
+        storage.get_user 1.2 мс
+        pokeapi.pokemon 1800.4 мс
+        telegram.sendPhoto 540.3 мс
+
+The current span lives in a ContextVar, so tasks started by a handler
+(asyncio.gather, create_task) add their spans to the right update. Outside a
+trace span() only reads that ContextVar and returns a shared no-op context
+manager. Log records made during a trace carry its trace_id.
+"""
+
+import logging
+import os
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import List, Optional
+
+from telegram import Update
+from telegram.ext import Application, TypeHandler
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Group of the closing handler, after every group the bot uses
+FINISH_GROUP = 1000
+# Spans kept per trace, the rest are counted but not recorded
+MAX_SPANS = 500
+
+_NOOP = nullcontext()
+
+class Span:
+    """A timed operation within a trace."""
+
+    __slots__ = ("name", "trace", "start", "end", "children")
+
+    def __init__(self, name: str, trace: "Trace"):
+        self.name = name
+        self.trace = trace
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.children: List["Span"] = []
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+class Trace:
+    """The spans of one update."""
+
+    def __init__(self, update_id: Optional[int]):
+        self.trace_id = os.urandom(8).hex()
+        self.update_id = update_id
+        self.span_count = 0
+        self.dropped_spans = 0
+        self.finished = False
+        self.root = Span("update", self)
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+class _SpanContext:
+    __slots__ = ("parent", "name", "span", "token")
+
+    def __init__(self, parent: Span, name: str):
+        self.parent = parent
+        self.name = name
+
+    def __enter__(self) -> Span:
+        self.span = Span(self.name, self.parent.trace)
+        self.parent.children.append(self.span)
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, *exc_info) -> None:
+        self.span.end = time.perf_counter()
+        _current_span.reset(self.token)
+
+def span(name: str):
+    """Context manager recording a span in the current trace, if there is one."""
+    parent = _current_span.get()
+    if parent is None or parent.trace.finished:
+        return _NOOP
+    trace = parent.trace
+    if trace.span_count >= MAX_SPANS:
+        trace.dropped_spans += 1
+        return _NOOP
+    trace.span_count += 1
+    return _SpanContext(parent, name)
+
+def current_trace_id() -> Optional[str]:
+    """Get the trace ID of the update being processed."""
+    current = _current_span.get()
+    return current.trace.trace_id if current else None
+
+def format_trace(trace: Trace) -> str:
+    """Render the span tree of a trace."""
+    lines = [f"Медленное обновление {trace.update_id} (trace {trace.trace_id}): {trace.root.duration_ms:.1f} мс"]
+
+    def add(current: Span, depth: int) -> None:
+        for child in current.children:
+            lines.append(f"{'  ' * depth}{child.name} {child.duration_ms:.1f} мс")
+            add(child, depth + 1)
+
+    add(trace.root, 1)
+    if trace.dropped_spans:
+        lines.append(f"  ... и еще {trace.dropped_spans} операций")
+    return "\n".join(lines)
+
+def _finish(trace: Trace) -> None:
+    trace.root.end = time.perf_counter()
+    trace.finished = True
+    if trace.root.duration_ms >= config.TRACE_SLOW_UPDATE_MS:
+        logger.warning("%s", format_trace(trace))
+
+async def _start_trace(update: object, context) -> None:
+    previous = _current_span.get()
+    # Обновление, которое не дошло до закрывающего обработчика
+    if previous is not None and not previous.trace.finished:
+        _finish(previous.trace)
+    update_id = update.update_id if isinstance(update, Update) else None
+    _current_span.set(Trace(update_id).root)
+
+async def _finish_trace(update: object, context) -> None:
+    current = _current_span.get()
+    if current is not None:
+        if not current.trace.finished:
+            _finish(current.trace)
+        _current_span.set(None)
+
+def install(application: Application) -> None:
+    """Trace every update. Does nothing if config.TRACE_SLOW_UPDATE_MS is 0."""
+    if config.TRACE_SLOW_UPDATE_MS <= 0:
+        return
+    application.add_handler(TypeHandler(object, _start_trace), group=-1)
+    application.add_handler(TypeHandler(object, _finish_trace), group=FINISH_GROUP)
+
+    # trace_id в каждой записи лога, сделанной во время обработки обновления
+    make_record = logging.getLogRecordFactory()
+
+    def record_factory(*args, **kwargs):
+        record = make_record(*args, **kwargs)
+        current = _current_span.get()
+        if current is not None:
+            record.trace_id = current.trace.trace_id
+        return record
+
+    logging.setLogRecordFactory(record_factory)
+    logger.info(f"Трассировка обновлений медленнее {config.TRACE_SLOW_UPDATE_MS} мс включена")
@@ -0,0 +1,182 @@
+"""
+Trade execution with escrow and crash-safe transfers.
+
+A Pokemon offered in a trade is put in escrow: it can't be offered in another
+trade or used up by evolution until the trade is completed or cancelled.
+
+Completing a trade verifies the escrow of every offered Pokemon and its
+ownership through the global Pokemon index (pokemon_index.py), then writes
+the planned moves to a journal (data/trade_journal.json) before touching
+either user. If the bot stops between the two user saves,
+recover_trades() finishes the journalled moves on the next start, so a trade
+is either applied completely or not at all and Pokemon are never duplicated
+or lost.
+"""
+
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from json_store import data_path, load_json, save_json
+from pokemon_index import OwnershipError, assert_owner, find_pokemon, find_slot, get_owner
+from storage import get_user, save_user
+
+logger = logging.getLogger(__name__)
+
+ESCROW_FILE = data_path("trade_escrow.json")
+JOURNAL_FILE = data_path("trade_journal.json")
+
+# Формат: {pokemon_id: {"trade_id": trade_id, "user_id": user_id}}
+_escrow: Optional[Dict[str, Dict[str, object]]] = None
+
+class TradeError(Exception):
+    """A trade can't be executed as offered."""
+
+def _get_escrow() -> Dict[str, Dict[str, object]]:
+    global _escrow
+    if _escrow is None:
+        _escrow = load_json(ESCROW_FILE, {})
+    return _escrow
+
+def _save_escrow() -> None:
+    save_json(ESCROW_FILE, _get_escrow())
+
+def get_escrow_trade(pokemon_id: str) -> Optional[str]:
+    """Get the ID of the trade a Pokemon is offered in."""
+    entry = _get_escrow().get(pokemon_id)
+    return entry["trade_id"] if entry else None
+
+def is_escrowed(pokemon_id: str) -> bool:
+    """Check if a Pokemon is locked by a trade."""
+    return pokemon_id in _get_escrow()
+
+def _find_slots(user, pokemon_ids: Sequence[str]) -> List[int]:
+    """Get the collection positions of the given Pokemon, raising if one is missing."""
+    try:
+        return assert_owner(user, pokemon_ids)
+    except OwnershipError as e:
+        raise TradeError(str(e)) from e
+
+def escrow_pokemon(trade_id: str, user_id: int, pokemon_id: str) -> bool:
+    """Lock a Pokemon for a trade. Fails if it isn't owned or is in another trade."""
+    escrow = _get_escrow()
+    entry = escrow.get(pokemon_id)
+    if entry:
+        return entry["trade_id"] == trade_id and entry["user_id"] == user_id
+
+    # Индекс отвечает за O(1); перебор коллекции только если индекс не знает покемона
+    if get_owner(pokemon_id) != user_id and find_slot(get_user(user_id), pokemon_id) is None:
+        logger.warning(f"Отказ в добавлении в обмен {trade_id}: покемон {pokemon_id} не принадлежит {user_id}")
+        return False
+
+    escrow[pokemon_id] = {"trade_id": trade_id, "user_id": user_id}
+    _save_escrow()
+    return True
+
+def release_pokemon(trade_id: str, pokemon_id: str) -> None:
+    """Unlock a Pokemon removed from a trade offer."""
+    escrow = _get_escrow()
+    entry = escrow.get(pokemon_id)
+    if entry and entry["trade_id"] == trade_id:
+        del escrow[pokemon_id]
+        _save_escrow()
+
+def release_trade(trade_id: str) -> int:
+    """Unlock every Pokemon of a cancelled or finished trade."""
+    escrow = _get_escrow()
+    released = [pokemon_id for pokemon_id, entry in escrow.items() if entry["trade_id"] == trade_id]
+    for pokemon_id in released:
+        del escrow[pokemon_id]
+    if released:
+        _save_escrow()
+    return len(released)
+
+def _check_offer(trade_id: str, user_id: int, offer: Sequence[str]) -> None:
+    if len(set(offer)) != len(offer):
+        raise TradeError(f"Duplicate Pokemon in the offer of user {user_id}")
+    for pokemon_id in offer:
+        entry = _get_escrow().get(pokemon_id)
+        if not entry or entry["trade_id"] != trade_id or entry["user_id"] != user_id:
+            raise TradeError(f"Pokemon {pokemon_id} is not escrowed for trade {trade_id}")
+
+def _transfer(source, target, slots: Sequence[int]) -> list:
+    """Move the Pokemon at the given positions from source to target."""
+    slot_set = set(slots)
+    moved = [source.pokemons[slot] for slot in slots]
+    source.pokemons = [pokemon for slot, pokemon in enumerate(source.pokemons) if slot not in slot_set]
+    target.pokemons.extend(moved)
+
+    moved_ids = {pokemon.pokemon_id for pokemon in moved}
+    if source.main_pokemon and source.main_pokemon.pokemon_id in moved_ids:
+        source.main_pokemon = None
+    return moved
+
+def execute_trade(
+    trade_id: str,
+    user1_id: int,
+    user1_offer: Sequence[str],
+    user2_id: int,
+    user2_offer: Sequence[str]
+) -> Tuple[list, list]:
+    """Swap the offered Pokemon of two users atomically.
+
+    Returns the Pokemon given by user 1 and by user 2. Raises TradeError
+    without changing anything if an offer is invalid.
+    """
+    if set(user1_offer) & set(user2_offer):
+        raise TradeError("The same Pokemon is offered by both users")
+    _check_offer(trade_id, user1_id, user1_offer)
+    _check_offer(trade_id, user2_id, user2_offer)
+
+    user1 = get_user(user1_id)
+    user2 = get_user(user2_id)
+    slots1 = _find_slots(user1, user1_offer)
+    slots2 = _find_slots(user2, user2_offer)
+
+    # Журнал записывается до изменения пользователей, чтобы обмен можно было завершить после сбоя
+    journal = load_json(JOURNAL_FILE, {})
+    journal[trade_id] = {
+        "moves": [[pokemon_id, user1_id, user2_id] for pokemon_id in user1_offer]
+               + [[pokemon_id, user2_id, user1_id] for pokemon_id in user2_offer]
+    }
+    save_json(JOURNAL_FILE, journal)
+
+    given1 = _transfer(user1, user2, slots1)
+    given2 = _transfer(user2, user1, slots2)
+    save_user(user1)
+    save_user(user2)
+
+    del journal[trade_id]
+    save_json(JOURNAL_FILE, journal)
+    release_trade(trade_id)
+
+    logger.info(f"Обмен {trade_id} выполнен: {len(given1)} <-> {len(given2)} покемонов")
+    return given1, given2
+
+def recover_trades() -> int:
+    """Finish trades interrupted between journalling and saving. Called at startup."""
+    journal = load_json(JOURNAL_FILE, {})
+    for trade_id, entry in journal.items():
+        users = {}
+        for pokemon_id, source_id, target_id in entry["moves"]:
+            for user_id in (source_id, target_id):
+                if user_id not in users:
+                    users[user_id] = get_user(user_id)
+            source, target = users[source_id], users[target_id]
+
+            # Перемещение идемпотентно: уже перенесенные покемоны пропускаются
+            try:
+                slots = _find_slots(source, [pokemon_id])
+            except TradeError:
+                if find_pokemon(target, pokemon_id) is None:
+                    logger.error(f"Покемон {pokemon_id} из обмена {trade_id} не найден ни у одного участника")
+                continue
+            _transfer(source, target, slots)
+
+        for user in users.values():
+            save_user(user)
+        release_trade(trade_id)
+        logger.warning(f"Обмен {trade_id} завершен после перезапуска")
+
+    if journal:
+        save_json(JOURNAL_FILE, {})
+    return len(journal)
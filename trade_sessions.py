@@ -0,0 +1,212 @@
+"""
+Trade sessions between two players.
+
+State machine:
+    requested -> negotiating -> executing
+A request can also be declined, and any state can be cancelled or expire.
+A session stores user IDs, display names, the offered Pokemon IDs with their
+names and CP and the IDs of the trade interface messages, so it is
+persisted in data/trade_sessions.json and survives a restart. Cancelled,
+finished and expired sessions release their escrowed Pokemon.
+
+Handlers serialise work on one trade with trade_lock(), and the trade
+interface is rendered from the session alone: no user is loaded to show an
+offer, and each side's offer text is cached until that offer changes.
+"""
+
+import asyncio
+import logging
+import weakref
+from typing import Any, Dict, Optional, Tuple
+
+from session_store import SessionStore
+from trade_engine import release_trade
+
+logger = logging.getLogger(__name__)
+
+REQUESTED = "requested"
+NEGOTIATING = "negotiating"
+EXECUTING = "executing"
+
+# Time to live of each state (seconds)
+TRADE_TTL = {
+    REQUESTED: 10 * 60,
+    NEGOTIATING: 30 * 60,
+    EXECUTING: 5 * 60
+}
+
+# Maximum number of Pokemon one side can offer
+MAX_OFFER_SIZE = 6
+
+EMPTY_OFFER_TEXT = "No Pokemon offered yet.\n"
+
+# Отрисованные предложения: (trade_id, side) -> (pokemon_ids, текст)
+_offer_texts: Dict[Tuple[str, str], Tuple[Tuple[str, ...], str]] = {}
+_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+def _on_expire(trade: Dict[str, Any]) -> None:
+    _forget(trade["id"])
+    release_trade(trade["id"])
+
+_store = SessionStore("trade_sessions", TRADE_TTL, on_expire=_on_expire)
+
+def _forget(trade_id: str) -> None:
+    for side in ("user1", "user2"):
+        _offer_texts.pop((trade_id, side), None)
+
+def get_side(trade: Dict[str, Any], user_id: int) -> Optional[str]:
+    """Get "user1" or "user2" for a participant of a trade, or None."""
+    if user_id == trade["user1_id"]:
+        return "user1"
+    if user_id == trade["user2_id"]:
+        return "user2"
+    return None
+
+def get_other_side(side: str) -> str:
+    """Get the side of the other participant."""
+    return "user2" if side == "user1" else "user1"
+
+def trade_lock(trade_id: str) -> asyncio.Lock:
+    """Get the lock that serialises handler work on one trade."""
+    lock = _locks.get(trade_id)
+    if lock is None:
+        lock = asyncio.Lock()
+        _locks[trade_id] = lock
+    return lock
+
+def create_trade(user1_id: int, user1_name: str, user2_id: int, user2_name: str) -> Dict[str, Any]:
+    """Create a trade request from user 1 to user 2."""
+    return _store.create(
+        REQUESTED,
+        user1_id=user1_id,
+        user2_id=user2_id,
+        user1_name=user1_name,
+        user2_name=user2_name,
+        user1_offer=[],
+        user2_offer=[],
+        user1_confirmed=False,
+        user2_confirmed=False,
+        labels={},
+        user1_message_id=None,
+        user2_message_id=None
+    )
+
+def get_trade(trade_id: str) -> Optional[Dict[str, Any]]:
+    """Get an active trade session."""
+    return _store.get(trade_id)
+
+def accept_trade(trade_id: str, user_id: int) -> Optional[Dict[str, Any]]:
+    """Accept a trade request. Only the requested player can do it, and only once."""
+    return _store.mutate(trade_id, lambda trade: (
+        _store.advance(trade, NEGOTIATING)
+        if trade["state"] == REQUESTED and trade["user2_id"] == user_id else None
+    ))
+
+def decline_trade(trade_id: str, user_id: int) -> Optional[Dict[str, Any]]:
+    """Decline a trade request and remove the session."""
+    trade = _store.get(trade_id)
+    if not trade or trade["state"] != REQUESTED or trade["user2_id"] != user_id:
+        return None
+    if not _store.delete(trade_id):
+        return None
+    return trade
+
+def add_offer(trade_id: str, user_id: int, pokemon_id: str, name: str, cp: int) -> Optional[Dict[str, Any]]:
+    """Add a Pokemon to a player's offer.
+
+    Any change of an offer resets both confirmations. Returns the updated
+    session, or None if the Pokemon can't be added.
+    """
+    def apply(trade: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        side = get_side(trade, user_id)
+        if side is None or trade["state"] != NEGOTIATING:
+            return None
+        offer = trade[f"{side}_offer"]
+        if pokemon_id in offer or len(offer) >= MAX_OFFER_SIZE:
+            return None
+
+        offer.append(pokemon_id)
+        trade["labels"][pokemon_id] = [name, cp]
+        return _store.advance(trade, NEGOTIATING, user1_confirmed=False, user2_confirmed=False)
+
+    return _store.mutate(trade_id, apply)
+
+def remove_offer(trade_id: str, user_id: int, pokemon_id: str) -> Optional[Dict[str, Any]]:
+    """Remove a Pokemon from a player's offer. Resets both confirmations."""
+    def apply(trade: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        side = get_side(trade, user_id)
+        if side is None or trade["state"] != NEGOTIATING or pokemon_id not in trade[f"{side}_offer"]:
+            return None
+
+        trade[f"{side}_offer"].remove(pokemon_id)
+        trade["labels"].pop(pokemon_id, None)
+        return _store.advance(trade, NEGOTIATING, user1_confirmed=False, user2_confirmed=False)
+
+    return _store.mutate(trade_id, apply)
+
+def confirm_trade(trade_id: str, user_id: int) -> Optional[Dict[str, Any]]:
+    """Confirm a player's side of the trade.
+
+    Returns the updated session. Its state is "executing" for exactly one
+    caller: the one whose confirmation completed the trade.
+    """
+    def apply(trade: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        side = get_side(trade, user_id)
+        if side is None or trade["state"] != NEGOTIATING or trade[f"{side}_confirmed"]:
+            return None
+
+        trade[f"{side}_confirmed"] = True
+        both_confirmed = trade["user1_confirmed"] and trade["user2_confirmed"]
+        return _store.advance(trade, EXECUTING if both_confirmed else NEGOTIATING)
+
+    return _store.mutate(trade_id, apply)
+
+def set_message_id(trade_id: str, user_id: int, message_id: int) -> None:
+    """Remember the trade interface message of a player, so it is edited in place."""
+    def apply(trade: Dict[str, Any]) -> Optional[bool]:
+        side = get_side(trade, user_id)
+        if side is None or trade[f"{side}_message_id"] == message_id:
+            return None
+        trade[f"{side}_message_id"] = message_id
+        return True
+
+    _store.mutate(trade_id, apply)
+
+def finish_trade(trade_id: str) -> None:
+    """Remove an executed trade."""
+    _forget(trade_id)
+    if _store.delete(trade_id):
+        logger.info(f"Обмен {trade_id} завершен")
+
+def cancel_trade(trade_id: str) -> bool:
+    """Remove a trade and unlock its offered Pokemon."""
+    _forget(trade_id)
+    release_trade(trade_id)
+    return _store.delete(trade_id)
+
+def get_offer_name(trade: Dict[str, Any], pokemon_id: str) -> str:
+    """Get the name of an offered Pokemon."""
+    label = trade["labels"].get(pokemon_id)
+    return label[0] if label else "Pokemon"
+
+def get_offer_label(trade: Dict[str, Any], pokemon_id: str) -> str:
+    """Get the "Name (CP: 123)" label of an offered Pokemon."""
+    label = trade["labels"].get(pokemon_id)
+    return f"{label[0]} (CP: {label[1]})" if label else "Pokemon"
+
+def render_offer(trade: Dict[str, Any], side: str) -> str:
+    """Get the numbered list of a side's offered Pokemon."""
+    offer = tuple(trade[f"{side}_offer"])
+    key = (trade["id"], side)
+    cached = _offer_texts.get(key)
+    if cached and cached[0] == offer:
+        return cached[1]
+
+    if offer:
+        text = "".join(
+            f"{i}. {get_offer_label(trade, pokemon_id)}\n" for i, pokemon_id in enumerate(offer, start=1)
+        )
+    else:
+        text = EMPTY_OFFER_TEXT
+    _offer_texts[key] = (offer, text)
+    return text
@@ -0,0 +1,231 @@
+"""
+Recorder of incoming updates for replay in load tests (loadtest/replay.py).
+
+When config.UPDATE_RECORD_FILE is set, every update the bot receives, by
+polling (install()) or by the webhook (main.py calls record()), is appended
+to that file with its arrival time. The file is a series of gzip members,
+one per flush, so it is only ever appended to and reads as one gzip stream
+of JSON lines: {"t": unix time, "update": {...}}. It is read by
+python -m loadtest.replay.
+
+Updates are anonymised before they are written:
+- only the fields replay needs are kept (an allowlist): messages with their
+  IDs, dates, chat, sender, text, entity positions and the replied-to
+  message, and callback queries with their data. Everything else, such as
+  forwarded-from names, signatures, media and contact data, is dropped, as
+  are updates of other kinds except for their update_id;
+- user and chat IDs are replaced with pseudonyms from a keyed HMAC. The key
+  is random and stays in data/, so a user keeps the same pseudonym across
+  restarts and the recording keeps who talks to whom, but IDs can't be
+  traced back without the server. Names and titles become placeholders;
+- message text is kept whole for commands and summon phrases, Pokemon names
+  and numbers. In other text only the catch and summon words the handlers
+  look for (handlers/chat_triggers.py) are kept in place; everything else
+  is masked with "x" of the same length.
+Callback data is bot-generated and kept as is.
+"""
+
+import atexit
+import gzip
+import hashlib
+import hmac
+import json
+import logging
+import re
+import secrets
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from telegram import Update
+from telegram.ext import Application, TypeHandler
+
+import config
+import pokemon_dataset
+import session_store
+from handlers.chat_triggers import TRIGGER_WORDS, is_summon_phrase
+from json_store import data_path, load_json, save_json
+
+logger = logging.getLogger(__name__)
+
+KEY_FILE = data_path("update_record_key.json")
+
+# Recorded updates are written at most once per FLUSH_INTERVAL, or when the buffer is full
+FLUSH_INTERVAL = 2.0
+MAX_BUFFER = 1000
+
+# Поля, которые сохраняются как есть; остальные поля отбрасываются
+MESSAGE_FIELDS = ("message_id", "date", "edit_date", "message_thread_id", "is_topic_message")
+ENTITY_FIELDS = ("type", "offset", "length")
+CALLBACK_QUERY_FIELDS = ("id", "data")
+# Группы с ID вида -100XXXXXXXXXX остаются в том же диапазоне
+SUPERGROUP_OFFSET = 10 ** 12
+
+_lock = threading.Lock()
+_buffer: List[str] = []
+_last_flush = 0.0
+_key: Optional[bytes] = None
+
+def _get_key() -> bytes:
+    global _key
+    if _key is None:
+        stored = load_json(KEY_FILE)
+        if not stored:
+            stored = {"key": secrets.token_hex(32)}
+            save_json(KEY_FILE, stored)
+        _key = bytes.fromhex(stored["key"])
+    return _key
+
+def pseudonym(original_id: int) -> int:
+    """Get the stable pseudonym of a user or chat ID, keeping its sign and range."""
+    digest = hmac.new(_get_key(), str(original_id).encode("ascii"), hashlib.sha256).digest()
+    value = int.from_bytes(digest[:6], "big")
+    if original_id >= 0:
+        return 1 + value % (2 ** 40)
+    if original_id <= -SUPERGROUP_OFFSET:
+        return -(SUPERGROUP_OFFSET + value % SUPERGROUP_OFFSET)
+    return -(1 + value % 10 ** 9)
+
+def _keep_word(word: str) -> bool:
+    return word.isdigit() or pokemon_dataset.get_species(word) is not None
+
+def _mask(text: str) -> str:
+    return re.sub(r"\S", "x", text)
+
+def _mask_except_triggers(text: str) -> str:
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        return _mask(text)
+    # Слова ловли и призыва остаются на своих местах, поэтому проверки "слово in текст" дают тот же результат
+    kept = [False] * len(text)
+    for word in TRIGGER_WORDS:
+        start = lowered.find(word)
+        while start != -1:
+            kept[start:start + len(word)] = [True] * len(word)
+            start = lowered.find(word, start + 1)
+    return "".join(char if kept[i] or char.isspace() else "x" for i, char in enumerate(text))
+
+def anonymise_text(text: str) -> str:
+    """Keep what the handlers react to and mask the rest."""
+    stripped = text.strip().lower()
+    if is_summon_phrase(stripped) or _keep_word(stripped):
+        return text
+    if text.startswith("/"):
+        # Команда остается, аргументы - только номера и имена покемонов (промокоды и т.п. скрываются)
+        command, *args = text.split(" ")
+        return " ".join([command] + [arg if _keep_word(arg.lower()) else _mask(arg) for arg in args])
+    return _mask_except_triggers(text)
+
+def _pick(value: Dict[str, Any], fields) -> Dict[str, Any]:
+    return {field: value[field] for field in fields if field in value}
+
+def _anonymise_user(user: Dict[str, Any]) -> Dict[str, Any]:
+    # ID бота оставляем, чтобы ответы на его сообщения узнавались при повторе
+    if user.get("is_bot"):
+        return {"id": user["id"], "is_bot": True, "first_name": user.get("first_name", "Bot")}
+    result = {"id": pseudonym(user["id"]), "is_bot": False, "first_name": "User"}
+    if "language_code" in user:
+        result["language_code"] = user["language_code"]
+    return result
+
+def _anonymise_chat(chat: Dict[str, Any]) -> Dict[str, Any]:
+    result = {"id": pseudonym(chat["id"]), "type": chat["type"]}
+    if chat["type"] == "private":
+        result["first_name"] = "User"
+    else:
+        result["title"] = "Chat"
+    return result
+
+def _anonymise_message(message: Dict[str, Any]) -> Dict[str, Any]:
+    result = _pick(message, MESSAGE_FIELDS)
+    if "chat" in message:
+        result["chat"] = _anonymise_chat(message["chat"])
+    if "from" in message:
+        result["from"] = _anonymise_user(message["from"])
+    for key in ("text", "caption"):
+        if isinstance(message.get(key), str):
+            result[key] = anonymise_text(message[key])
+    for key in ("entities", "caption_entities"):
+        if key in message:
+            # Только позиции: ссылки и упомянутые пользователи отбрасываются
+            result[key] = [_pick(entity, ENTITY_FIELDS) for entity in message[key]]
+    if "reply_to_message" in message:
+        result["reply_to_message"] = _anonymise_message(message["reply_to_message"])
+    if "new_chat_members" in message:
+        result["new_chat_members"] = [_anonymise_user(user) for user in message["new_chat_members"]]
+    if "left_chat_member" in message:
+        result["left_chat_member"] = _anonymise_user(message["left_chat_member"])
+    return result
+
+def _anonymise_callback_query(query: Dict[str, Any]) -> Dict[str, Any]:
+    result = _pick(query, CALLBACK_QUERY_FIELDS)
+    result["from"] = _anonymise_user(query["from"])
+    # chat_instance обязателен, но по нему можно узнать чат
+    digest = hmac.new(_get_key(), str(query.get("chat_instance", "")).encode("utf-8"), hashlib.sha256)
+    result["chat_instance"] = str(int.from_bytes(digest.digest()[:8], "big"))
+    if "message" in query:
+        result["message"] = _anonymise_message(query["message"])
+    return result
+
+def anonymise(update: Dict[str, Any]) -> Dict[str, Any]:
+    """Anonymise an update dict (see the module docstring)."""
+    result = _pick(update, ("update_id",))
+    for key in ("message", "edited_message"):
+        if key in update:
+            result[key] = _anonymise_message(update[key])
+    if "callback_query" in update:
+        result["callback_query"] = _anonymise_callback_query(update["callback_query"])
+    return result
+
+def _flush() -> None:
+    global _last_flush
+    if _buffer:
+        data = gzip.compress("".join(_buffer).encode("utf-8"))
+        with open(config.UPDATE_RECORD_FILE, "ab") as f:
+            f.write(data)
+        _buffer.clear()
+    _last_flush = time.monotonic()
+
+def record(update_dict: Dict[str, Any], received_at: Optional[float] = None) -> None:
+    """Append an incoming update to the recording, if recording is on."""
+    if not config.UPDATE_RECORD_FILE:
+        return
+    try:
+        line = json.dumps(
+            {"t": received_at or time.time(), "update": anonymise(update_dict)},
+            ensure_ascii=False, separators=(",", ":")
+        )
+    except Exception as e:
+        logger.error(f"Не удалось записать обновление: {e}")
+        return
+    with _lock:
+        _buffer.append(line + "\n")
+        if len(_buffer) >= MAX_BUFFER or time.monotonic() - _last_flush >= FLUSH_INTERVAL:
+            _flush()
+
+def flush() -> None:
+    """Write buffered updates now."""
+    with _lock:
+        _flush()
+
+def sweep() -> int:
+    """Write buffered updates on the periodic sweep (session_store.run_sweeper)."""
+    flush()
+    return 0
+
+async def _record_update(update: object, context) -> None:
+    if isinstance(update, Update):
+        record(update.to_dict())
+
+def install(application: Application) -> None:
+    """Record updates received by polling. Does nothing if config.UPDATE_RECORD_FILE is empty."""
+    if not config.UPDATE_RECORD_FILE:
+        return
+    # Раньше трассировки (группа -1), чтобы запись не попадала в трассу
+    application.add_handler(TypeHandler(object, _record_update), group=-2)
+    logger.info(f"Запись входящих обновлений в {config.UPDATE_RECORD_FILE}")
+
+if config.UPDATE_RECORD_FILE:
+    session_store.register_store(sys.modules[__name__])
+    atexit.register(flush)
@@ -0,0 +1,224 @@
+"""
+Streaming access to the users file.
+
+Whole-user-base passes (broadcasts, searches, leaderboards) read
+data/users.json one user record at a time instead of loading every user into
+memory. Callers that need user data ask for a projection with only the fields
+they use, so no User or Pokemon objects are created.
+"""
+
+import copy
+import functools
+import itertools
+import json
+import logging
+from collections import namedtuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from json_store import data_path
+
+logger = logging.getLogger(__name__)
+
+USERS_FILE = data_path("users.json")
+
+# Number of projections yielded at once by iter_user_projections
+DEFAULT_CHUNK_SIZE = 500
+
+# Defaults for fields missing in old records (same as in User.from_dict)
+USER_FIELD_DEFAULTS = {
+    "balance": 3000,
+    "pokemons": [],
+    "main_pokemon": None,
+    "caught_pokemon_count": 0,
+    "trainer": None,
+    "trainer_level": 0,
+    "league": 1,
+    "pokeballs": {},
+    "used_promocodes": [],
+    "username": None
+}
+
+def _collection_cp(user_data: Dict[str, Any]) -> int:
+    # Same formula as Pokemon.calculate_cp, without creating Pokemon objects
+    return sum(
+        int((p.get("attack", 0) + p.get("defense", 0)) * (p.get("hp", 0) / 10))
+        for p in user_data.get("pokemons", [])
+    )
+
+# Fields computed from the raw record instead of being stored
+DERIVED_FIELDS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "pokemon_count": lambda user_data: len(user_data.get("pokemons", [])),
+    "pokemon_ids": lambda user_data: [p.get("pokemon_id") for p in user_data.get("pokemons", [])],
+    "collection_cp": _collection_cp
+}
+
+# Size of a single read from the users file (characters)
+READ_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = " \t\n\r"
+
+def iter_user_records(path: str = USERS_FILE) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield (user_id, user_data) pairs from the users file one at a time.
+
+    Only the record being decoded and a read buffer are kept in memory.
+    """
+    decoder = json.JSONDecoder()
+
+    try:
+        f = open(path, "r", encoding="utf-8")
+    except FileNotFoundError:
+        return
+
+    with f:
+        buffer = ""
+        pos = 0
+        eof = False
+
+        def read_more() -> bool:
+            nonlocal buffer, pos, eof
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                eof = True
+                return False
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            return True
+
+        def skip_whitespace() -> bool:
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                    pos += 1
+                if pos < len(buffer):
+                    return True
+                if not read_more():
+                    return False
+
+        def decode_value() -> Any:
+            nonlocal pos
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                    # A value ending exactly at the buffer end may be cut short
+                    if end < len(buffer) or eof:
+                        pos = end
+                        return value
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                read_more()
+
+        if not skip_whitespace() or buffer[pos] != "{":
+            logger.error(f"Файл {path} не содержит объект пользователей")
+            return
+        pos += 1
+
+        while skip_whitespace():
+            char = buffer[pos]
+            if char == "}":
+                return
+            if char == ",":
+                pos += 1
+                continue
+
+            user_id = decode_value()
+            if not skip_whitespace() or buffer[pos] != ":":
+                raise ValueError(f"Неверный формат файла {path} после ключа {user_id}")
+            pos += 1
+            skip_whitespace()
+            user_data = decode_value()
+
+            yield user_id, user_data
+
+def iter_user_ids(path: str = USERS_FILE) -> Iterator[int]:
+    """Yield the IDs of all users in storage order."""
+    for user_id, _ in iter_user_records(path):
+        yield int(user_id)
+
+def iter_user_ids_after(last_user_id: Optional[int], fallback_offset: int = 0, path: str = USERS_FILE) -> Iterator[int]:
+    """Yield the IDs of the users stored after last_user_id, to resume a pass.
+
+    Unlike a position, the cursor stays valid when earlier users are deleted.
+    Without a cursor, or if that user was deleted too, the pass resumes from
+    position fallback_offset.
+    """
+    if last_user_id is not None:
+        found = False
+        for user_id in iter_user_ids(path):
+            if found:
+                yield user_id
+            elif user_id == last_user_id:
+                found = True
+        if found:
+            return
+        logger.warning(f"Пользователь {last_user_id} не найден, продолжаем с позиции {fallback_offset}")
+    yield from itertools.islice(iter_user_ids(path), fallback_offset, None)
+
+def count_users(path: str = USERS_FILE) -> int:
+    """Count the users without keeping them in memory."""
+    return sum(1 for _ in iter_user_records(path))
+
+@functools.lru_cache(maxsize=32)
+def _projection_type(fields: Tuple[str, ...]):
+    return namedtuple("UserProjection", ("user_id",) + fields)
+
+def _project(projection_type, user_id: str, user_data: Dict[str, Any], fields: Tuple[str, ...]):
+    values = []
+    for field in fields:
+        if field in DERIVED_FIELDS:
+            values.append(DERIVED_FIELDS[field](user_data))
+        else:
+            if field in user_data:
+                values.append(user_data[field])
+            else:
+                # Копия, чтобы изменение списка в одной проекции не меняло значение по умолчанию
+                values.append(copy.copy(USER_FIELD_DEFAULTS.get(field)))
+    return projection_type(int(user_id), *values)
+
+def iter_user_projections(
+    fields: Sequence[str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    path: str = USERS_FILE
+) -> Iterator[List[Any]]:
+    """Yield lists of lightweight user projections.
+
+    Each projection is a named tuple with `user_id` and the requested fields,
+    e.g. iter_user_projections(("username", "balance")). Besides the stored
+    user fields, the derived fields from DERIVED_FIELDS can be requested.
+    Memory use depends on chunk_size, not on the number of users.
+    """
+    fields = tuple(fields)
+    projection_type = _projection_type(fields)
+
+    chunk = []
+    for user_id, user_data in iter_user_records(path):
+        chunk.append(_project(projection_type, user_id, user_data, fields))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+def find_user_id_by_username(username: str, path: str = USERS_FILE) -> Optional[int]:
+    """Find a user's ID by Telegram username (case-insensitive, without @)."""
+    return find_user_ids_by_usernames([username], path=path)[username.lstrip("@").lower()]
+
+def find_user_ids_by_usernames(usernames: Iterable[str], path: str = USERS_FILE) -> Dict[str, Optional[int]]:
+    """Find the IDs of several users in one pass over the users file.
+
+    Returns {lowercase username without @: user_id or None}.
+    """
+    found: Dict[str, Optional[int]] = {username.lstrip("@").lower(): None for username in usernames}
+    missing = len(found)
+    for chunk in iter_user_projections(("username",), path=path):
+        for user in chunk:
+            if not user.username:
+                continue
+            username = user.username.lower()
+            if username in found and found[username] is None:
+                found[username] = user.user_id
+                missing -= 1
+                if not missing:
+                    return found
+    return found